@@ -0,0 +1,36 @@
+import datetime
+
+import pytest
+
+from benchmarks import cases, generate, report
+from taskmn import task as TASK
+
+
+class TestBenchmarks:
+    def test_rows_are_tasks(self):
+        rows = list(generate.generate_rows(500, seed=3, priorities=(0, 0, 1), deadlines=1, overdue=0.5, completed=0))
+        assert rows == list(generate.generate_rows(500, seed=3, priorities=(0, 0, 1), deadlines=1, overdue=0.5,
+                                                   completed=0))
+        tasks = [TASK.Task._from_row(row) for row in rows]
+        assert [task.id for task in tasks] == list(range(1, 501))
+        assert all(task.priority.value == 2 and task.deadline is not None and not task.completed for task in tasks)
+        overdue = sum(task.deadline < datetime.datetime.now() for task in tasks)
+        assert 150 < overdue < 350
+
+    def test_run_and_compare(self, tmp_path):
+        selected = {name: case for name, case in cases.CASES.items() if not name.startswith("cli_")}
+        result = report.run_benchmarks([50], selected, repeat=2)
+        assert set(result["results"]) == set(selected)
+        assert all(len(sizes["50"]["runs"]) == 2 for sizes in result["results"].values())
+
+        report.save_report(result, tmp_path / "report.json")
+        baseline = report.load_report(tmp_path / "report.json")
+        assert not any(row["regression"] for row in report.compare(result, baseline))
+        for sizes in baseline["results"].values():
+            sizes["50"]["min"] /= 2
+        assert all(row["regression"] for row in report.compare(result, baseline, threshold=0.5))
+
+    def test_not_a_report(self, tmp_path):
+        (tmp_path / "other.json").write_text("[]")
+        with pytest.raises(ValueError):
+            report.load_report(tmp_path / "other.json")
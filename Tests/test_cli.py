@@ -1,4 +1,6 @@
-﻿import os
+﻿import datetime
+import json
+import os
 import shutil
 from pathlib import Path
 
@@ -109,6 +111,12 @@ class TestCli:
         assert cli.exit_code == 0
         assert self._get_lines_from_file()[0] == 2
 
+    @pytest.mark.parametrize("deadline", ["20251231", "2025", "tomorrow"])
+    def test_add_invalid_deadline_cli(self, test_environment, deadline):
+        cli = runner.invoke(task_manager_cli.app, ["add", "Name", "-dl", deadline])
+        assert "Adding task failed" in cli.stdout
+        assert self._get_lines_from_file()[0] == 0
+
     @pytest.mark.parametrize(
         "argument, value, index",
         [
@@ -236,3 +244,143 @@ class TestCli:
         length, data = self._get_lines_from_file()
         assert length == ending_length
         print(data)
+
+    @pytest.mark.parametrize(
+        "arguments, ids",
+        [
+            pytest.param([], ["1", "2", "3", "4", "5", "6"]),
+            pytest.param(["-n", "2"], ["1", "2"]),
+            pytest.param(["-n", "2", "--page", "3"], ["5", "6"]),
+            pytest.param(["-s", "deadline", "-r", "--offset", "1", "-n", "2"], ["5", "4"]),
+            pytest.param(["--offset", "6"], []),
+            pytest.param(["-w", "not completed"], ["1", "3", "5"]),
+            pytest.param(["-s", "deadline", "-r", "-w", "deadline<2025-01-01"], ["4", "3", "2"]),
+            pytest.param(["-w", "name~e5 or deadline=none", "-n", "1", "--offset", "1"], ["5"]),
+            pytest.param(["-w", "priority>normal"], []),
+            pytest.param(["-s", "completed,-deadline"], ["5", "3", "1", "6", "4", "2"]),
+            pytest.param(["-s", "-completed, deadline", "-r", "-n", "4"], ["5", "3", "1", "6"]),
+        ],
+    )
+    def test_list_plain_cli(self, test_environment, arguments, ids):
+        """
+        Will list pages of tasks as tab separated rows
+        :param test_environment:
+        :return:
+        """
+        cli = test_environment
+        assert cli.exit_code == 0
+        _add_tasks_via_cli_and_test_success(self.ADD_ARGUMENTS)
+
+        cli = runner.invoke(task_manager_cli.app, ["list", "--plain"] + arguments)
+        assert cli.exit_code == 0
+        lines = cli.stdout.splitlines()
+        if ids:
+            assert lines[0].split("\t")[0] == "ID"
+            lines = lines[1:]
+        assert [line.split("\t")[0] for line in lines] == ids
+
+    def test_list_invalid_filter_cli(self, test_environment):
+        cli = runner.invoke(task_manager_cli.app, ["list", "--where", "priority>=urgent"])
+        assert cli.exit_code == 1
+        assert "urgent" in cli.stdout
+
+    @pytest.mark.parametrize(
+        "arguments, ids",
+        [
+            pytest.param([], ["1", "5"]),
+            pytest.param(["--within", "3d"], ["1"]),
+            pytest.param(["-o", "-n", "2"], ["3", "1"]),
+            pytest.param(["-w", "30d"], ["1", "5"]),
+        ],
+    )
+    def test_due_cli(self, test_environment, arguments, ids):
+        """
+        Will list the tasks which are not completed by deadline, every second task being completed
+        :param test_environment:
+        :return:
+        """
+        cli = test_environment
+        assert cli.exit_code == 0
+        today = datetime.date.today()
+        _add_tasks_via_cli_and_test_success([["Name", "-dl", str(today + datetime.timedelta(days=days))]
+                                             if days is not None else ["Name"] for days in (1, 2, -5, None, 20, 0)])
+
+        cli = runner.invoke(task_manager_cli.app, ["due", "--plain"] + arguments)
+        assert cli.exit_code == 0
+        assert [line.split("\t")[0] for line in cli.stdout.splitlines()[1:]] == ids
+        cli = runner.invoke(task_manager_cli.app, ["due", "--within", "3 days"])
+        assert cli.exit_code == 1
+
+    def test_list_invalid_sort_cli(self, test_environment):
+        cli = runner.invoke(task_manager_cli.app, ["list", "--sort", "priority,urgency"])
+        assert cli.exit_code == 1
+        assert "urgency" in cli.stdout
+
+    @pytest.mark.parametrize(
+        "arguments, ids",
+        [
+            pytest.param(["name5"], ["5"]),
+            pytest.param(["name*", "-n", "2"], ["1", "2"]),
+            pytest.param(["Name4", "Name6"], []),
+            pytest.param(["missing"], []),
+        ],
+    )
+    def test_search_cli(self, test_environment, arguments, ids):
+        """
+        Will list the tasks matching a search as tab separated rows
+        :param test_environment:
+        :return:
+        """
+        cli = test_environment
+        assert cli.exit_code == 0
+        _add_tasks_via_cli_and_test_success(self.ADD_ARGUMENTS)
+
+        cli = runner.invoke(task_manager_cli.app, ["search", "--plain"] + arguments)
+        assert cli.exit_code == 0
+        assert [line.split("\t")[0] for line in cli.stdout.splitlines()[1:]] == ids
+        cli = runner.invoke(task_manager_cli.app, ["search", '"name'])
+        assert cli.exit_code == 1
+        assert "quote" in cli.stdout
+
+    @pytest.mark.parametrize(
+        "command, stdin, ending_length, completed",
+        [
+            pytest.param(["complete", "1", "3-5"], None, 6, ["1", "1", "1", "0", "1", "1"]),
+            pytest.param(["complete", "-"], "1 3-5\n6", 6, ["1", "1", "1", "0", "1", "0"]),
+            pytest.param(["delete", "-f", "2-4", "6"], None, 2, ["0", "0"]),
+            pytest.param(["delete", "-f", "2", "9"], None, 6, ["0", "1", "0", "1", "0", "1"]),
+            pytest.param(["edit", "-f", "5-2", "-n", "Batch"], None, 6, ["0", "1", "0", "1", "0", "1"]),
+        ],
+    )
+    def test_batch_cli(self, test_environment, command, stdin, ending_length, completed):
+        """
+        Will apply a command to several ids, ranges and ids read from stdin
+        :param test_environment:
+        :return:
+        """
+        cli = test_environment
+        assert cli.exit_code == 0
+        _add_tasks_via_cli_and_test_success(self.ADD_ARGUMENTS)
+
+        cli = runner.invoke(task_manager_cli.app, command, input=stdin)
+        length, data = self._get_lines_from_file()
+        assert length == ending_length
+        assert [row.split(",")[6] for row in data] == completed
+
+    def test_profile_cli(self, test_environment, tmp_path):
+        """
+        Will write a Chrome trace of the phases of a command
+        :param test_environment:
+        :return:
+        """
+        cli = test_environment
+        assert cli.exit_code == 0
+        _add_tasks_via_cli_and_test_success(self.ADD_ARGUMENTS)
+
+        cli = runner.invoke(task_manager_cli.app, ["--profile-output", str(tmp_path / "trace.json"), "list", "--plain"])
+        assert cli.exit_code == 0
+        with open(tmp_path / "trace.json") as file:
+            events = json.load(file)["traceEvents"]
+        rows = {event["name"]: event["args"]["rows"] for event in events}
+        assert {"config", "parse", "sort", "materialize", "render"} <= set(rows)
+        assert rows["parse"] == rows["render"] == 6
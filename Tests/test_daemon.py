@@ -0,0 +1,96 @@
+import csv
+import datetime
+import threading
+
+import pytest
+
+from taskmn import task as TASK, task_manager, exceptions, task_store, daemon, daemon_client
+
+
+class TestDaemon:
+    TASK_LIST = [
+        TASK.Task.load_from_data("Name", "Description", "2064-03-03", 0, 1, "2011-01-26 21:21:47.813295", True),
+        TASK.Task.load_from_data("Name2", "Description2", "2032-03-03", 1, 2, "2015-01-26 21:21:47.813295", False),
+        TASK.Task.load_from_data("Name3", "Description3", "2016-03-03", 2, 3, "2004-01-26 21:21:47.813295", False),
+    ]
+
+    @pytest.fixture()
+    def mock_csv(self, tmp_path):
+        store_path = tmp_path / "todo.csv"
+        with store_path.open("w", newline='') as store:
+            writer = csv.writer(store)
+            writer.writerow(task_store.TaskStore.DEFAULT_CSV_HEADER)
+            writer.writerows([task.to_list() for task in self.TASK_LIST])
+        return store_path
+
+    @pytest.fixture()
+    def remote(self, mock_csv, tmp_path):
+        socket_path = tmp_path / "taskmn.sock"
+        server = daemon.TaskDaemon(socket_path, mock_csv)
+        thread = threading.Thread(target=server.serve)
+        thread.start()
+        remote = daemon_client.connect(socket_path, mock_csv)
+        yield remote
+        remote.shutdown()
+        thread.join(5)
+        assert not socket_path.exists()
+
+    def test_connect(self, remote, mock_csv, tmp_path):
+        assert remote is not None
+        assert remote.loadfile == str(mock_csv)
+        assert daemon_client.connect(remote.socket_path, tmp_path / "other.csv") is None
+        assert daemon_client.connect(tmp_path / "missing.sock") is None
+
+    def test_requests(self, remote, mock_csv):
+        assert remote.get_task(2) == self.TASK_LIST[1]
+        assert [task.id for task in remote.get_tasks(task_manager.SortType.PRIORITY)] == [3, 2, 1]
+        assert [task.id for task in remote.iter_tasks(task_manager.SortType.PRIORITY, True, 1, 1)] == [2]
+        assert [task.id for task in remote.get_tasks(where="priority>=normal and not completed")] == [2, 3]
+        assert [task.id for task in remote.iter_tasks("completed,priority", limit=2)] == [3, 2]
+        searched = task_manager.TaskManager(loadfile=str(mock_csv)).search("name*", 2)
+        assert [task.id for task in remote.search("name*", 2)] == [task.id for task in searched]
+        assert [task.id for task in remote.due(datetime.timedelta(days=365 * 50), overdue=True)] == [3, 2]
+        assert remote.due(limit=1)[0].id == 2
+        assert remote.toggle_completion(2).completed
+        assert remote.edit_task(3, "Edited").name == "Edited"
+        remote.delete_task(1)
+        added = remote.add_task("Added", deadline="2040-01-01", priority=2)
+
+        manager = task_manager.TaskManager(loadfile=str(mock_csv))
+        manager.load_from_file()
+        assert manager.get_task(2).completed
+        assert manager.get_task(3).name == "Edited"
+        assert manager.get_task(added.id).name == "Added"
+        assert [task.id for task in remote.get_tasks()] == [task.id for task in manager.get_tasks()]
+
+    def test_errors(self, remote):
+        with pytest.raises(exceptions.TaskIDError):
+            remote.get_task(42)
+        with pytest.raises(exceptions.TaskNameError):
+            remote.edit_task(1, " ")
+        with pytest.raises(exceptions.DateException):
+            remote.add_task("Name", deadline="tomorrow")
+        with pytest.raises(exceptions.FilterError):
+            list(remote.iter_tasks(where="priority>=urgent"))
+        with pytest.raises(exceptions.SortError):
+            remote.get_tasks("urgency")
+        with pytest.raises(exceptions.SearchError):
+            remote.search('"unclosed')
+
+    def test_reloads_changed_store(self, remote, mock_csv):
+        manager = task_manager.TaskManager(loadfile=str(mock_csv))  # Edited by another process
+        manager.load_from_file()
+        manager.delete_task(1)
+        with pytest.raises(exceptions.TaskIDError):
+            remote.get_task(1)
+        assert len(remote.get_tasks()) == len(self.TASK_LIST) - 1
+
+    def test_store_errors(self, remote, mock_csv, monkeypatch):
+        def append(self, rows):
+            raise exceptions.StoreWriteException(mock_csv)
+
+        monkeypatch.setattr(task_store.TaskStore, "append", append)  # The daemon serves from a thread of this process
+        with pytest.raises(exceptions.StoreWriteException) as error:
+            remote.add_task("Name")
+        assert error.value.path == mock_csv
+        assert str(error.value) == str(exceptions.StoreWriteException(mock_csv))
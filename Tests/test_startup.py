@@ -0,0 +1,160 @@
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from taskmn import config, fast_path, profiling, task_manager, task_manager_cli, task_store
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+HEAVY_PACKAGES = ("typer", "click", "rich", "pygments", "commonmark")
+IMPORT_BUDGET_US = 150_000  # Cumulative import time of the fast path, generous to avoid flaky failures
+
+
+def _import_times(module):
+    """
+    Imports a module in a new interpreter with -X importtime
+    :param str module: The module to import
+    :return dict[str, int]: The cumulative import time of each imported module in microseconds
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=PACKAGE_ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+    def test_fast_path_skips_heavy_imports(self):
+        imported = _import_times("taskmn.__main__, taskmn.fast_path")
+        assert "taskmn.fast_path" in imported
+        assert [name for name in imported if name.split(".")[0] in HEAVY_PACKAGES] == []
+
+    def test_import_time_budget(self):
+        best = min(_import_times("taskmn.fast_path")["taskmn.fast_path"] for _ in range(3))
+        assert best < IMPORT_BUDGET_US
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            pytest.param([]),
+            pytest.param(["list"]),
+            pytest.param(["add", "--help"]),
+            pytest.param(["add", "Name", "-p", "5"]),
+            pytest.param(["complete", "1", "2"]),
+            pytest.param(["delete", "1"]),
+        ],
+    )
+    def test_falls_back(self, args):
+        assert fast_path.run(args) is None
+
+    def test_commands(self, tmp_path, monkeypatch, capsys):
+        store_path = tmp_path / "todo.csv"
+        task_store.init_storage(store_path)
+        config_path = tmp_path / "config.ini"
+        with config_path.open("w") as file:
+            file.write(f"[General]\nStorage = {store_path}\n")
+        monkeypatch.setattr(config, "CONFIG_FILE_PATH", config_path)
+
+        assert fast_path.run(["add", "Fast", "-dl", "2030-01-01", "-p", "2"]) == 0
+        assert fast_path.run(["add", "Second"]) == 0
+        assert fast_path.run(["complete", "1"]) == 0
+        assert fast_path.run(["rm", "-f", "2"]) == 0
+        assert fast_path.run(["complete", "2"]) == 1
+        assert "Task #1 - Fast marked as complete" in capsys.readouterr().out
+
+        manager = task_manager.TaskManager(loadfile=str(store_path))
+        manager.load_from_file()
+        assert [row[1] for row in manager.to_list()] == ["Fast"]
+        assert manager.get_task(1).completed
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            pytest.param(["add", "Same", "-desc", "Output", "-p", "0"]),
+            pytest.param(["complete", "1"]),
+            pytest.param(["complete", "9"]),
+            pytest.param(["rm", "-f", "1"]),
+            pytest.param(["delete", "--force", "9"]),
+        ],
+    )
+    def test_same_output_as_cli(self, tmp_path, monkeypatch, capsys, args):
+        outputs = []
+        for name in ("fast", "full"):
+            store_path = tmp_path / f"{name}.csv"
+            task_store.init_storage(store_path)
+            task_manager.TaskManager(loadfile=str(store_path)).add_task("First")
+            config_path = tmp_path / f"{name}.ini"
+            with config_path.open("w") as file:
+                file.write(f"[General]\nStorage = {store_path}\n")
+            monkeypatch.setattr(config, "CONFIG_FILE_PATH", config_path)
+            if name == "fast":
+                exit_code = fast_path.run(args)
+                outputs.append((exit_code, capsys.readouterr().out))
+            else:
+                result = CliRunner().invoke(task_manager_cli.app, args)
+                outputs.append((result.exit_code, result.stdout))
+        assert outputs[0] == outputs[1]
+
+    def test_indexed_store_not_loaded(self, tmp_path, monkeypatch):
+        store_path = tmp_path / "todo.db"
+        task_store.init_storage(store_path)
+        task_manager.TaskManager(loadfile=str(store_path)).add_task("First")
+        config_path = tmp_path / "config.ini"
+        with config_path.open("w") as file:
+            file.write(f"[General]\nStorage = {store_path}\n")
+        monkeypatch.setattr(config, "CONFIG_FILE_PATH", config_path)
+        monkeypatch.setattr(task_manager.TaskManager, "load_from_file", None)  # Fails if called
+
+        assert fast_path.run(["complete", "1"]) == 0
+        assert fast_path.run(["rm", "-f", "1"]) == 0
+        assert fast_path.run(["rm", "-f", "1"]) == 1
+
+    @pytest.mark.parametrize(
+        "args, environment, remaining, summary, output",
+        [
+            pytest.param(["list"], {}, ["list"], None, None),
+            pytest.param(["--profile", "list", "--profile"], {}, ["list", "--profile"], True, None),
+            pytest.param(["--profile-output", "t.json", "add", "A"], {}, ["add", "A"], False, "t.json"),
+            pytest.param(["--profile-output=t.prof", "list"], {}, ["list"], False, "t.prof"),
+            pytest.param(["list"], {"TASKMN_TRACE": "1"}, ["list"], True, None),
+            pytest.param(["list"], {"TASKMN_TRACE": "0"}, ["list"], None, None),
+            pytest.param(["list"], {"TASKMN_TRACE": "t.json"}, ["list"], False, "t.json"),
+        ],
+    )
+    def test_profile_options(self, args, environment, remaining, summary, output):
+        try:
+            assert profiling.start_from(args, environment) == remaining
+            recorder = profiling._recorder
+            assert (recorder is None) == (summary is None)
+            if recorder is not None:
+                assert (recorder.summary, recorder.output) == (summary, output)
+                recorder.output = None  # Nothing is written when it finishes
+        finally:
+            profiling._recorder = None
+
+    def test_profile_trace(self, tmp_path, capsys):
+        with profiling.phase("unrecorded") as phase:
+            phase.rows = 3
+        assert phase.rows is None
+        profiling.start(True, tmp_path / "trace.json")
+        with profiling.phase("outer") as phase:
+            phase.rows = 2
+            with profiling.phase("inner"):
+                pass
+        profiling.finish()
+        assert not profiling.active()
+        with open(tmp_path / "trace.json") as file:
+            events = json.load(file)["traceEvents"]
+        assert [(event["name"], event["ph"], event["args"]["rows"]) for event in events] == \
+               [("outer", "X", 2), ("inner", "X", None)]
+        assert events[0]["ts"] <= events[1]["ts"] and events[1]["dur"] <= events[0]["dur"]
+        summary = capsys.readouterr().err.splitlines()
+        assert [line.split()[0] for line in summary] == ["phase", "outer", "inner", "total"]
@@ -1,8 +1,15 @@
 ﻿import csv
+import multiprocessing
+import os
+import stat
 
 import pytest
 
-from taskmn import task as TASK, task_manager, exceptions, task_store
+import datetime
+
+from taskmn import task as TASK, task_manager, exceptions, task_store, sqlite_store, offset_index, task_columns, \
+    high_water_mark, store_lock, store_snapshot, binary_store, timestamps, parse_cache, task_filter, search_index, \
+    sort_spec, sorted_view
 
 
 class TestManager:
@@ -45,6 +52,18 @@ class TestManager:
             writer.writerows([task.to_list() for task in self.TASK_LIST])
         return store_path
 
+    @pytest.fixture()
+    def mock_db(self, tmp_path):
+        store_path = tmp_path / "todo.db"
+        sqlite_store.SQLiteTaskStore(str(store_path)).save([task.to_list() for task in self.TASK_LIST])
+        return store_path
+
+    @pytest.fixture()
+    def mock_tmb(self, tmp_path):
+        store_path = tmp_path / "todo.tmb"
+        binary_store.BinaryTaskStore(str(store_path)).save([task.to_list() for task in self.TASK_LIST])
+        return store_path
+
     @pytest.mark.parametrize("sort, result_set",
                              [
                                  pytest.param(task_manager.SortType.KEY, TASK_SORT_RESULT_DICT["key"]),
@@ -104,6 +123,20 @@ class TestManager:
             read = manager.to_list()
             assert len(read) == len(TestManager.TASK_LIST)
 
+        def test_add_failed_append(self, mock_csv, name, description, monkeypatch):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file()
+            manager.get_tasks(task_manager.SortType.PRIORITY)  # Builds a sorted view the task would be added to
+
+            def append(self, rows):
+                raise exceptions.StoreWriteException(mock_csv)
+
+            monkeypatch.setattr(task_store.TaskStore, "append", append)
+            with pytest.raises(exceptions.StoreWriteException):
+                manager.add_task(name, description)
+            assert len(manager.to_list()) == len(TestManager.TASK_LIST)
+            assert len(manager.get_tasks(task_manager.SortType.PRIORITY)) == len(TestManager.TASK_LIST)
+
         @pytest.mark.parametrize(
             "iname",
             [
@@ -203,6 +236,37 @@ class TestManager:
         assert final_from_file == len(self.TASK_LIST) - 1 == final_from_list
         assert initial_len == len(self.TASK_LIST)
 
+    def test_new_store_permissions(self, mock_csv, tmp_path):
+        umask = os.umask(0o027)  # Set after import, the umask at the time of writing applies
+        try:
+            task_store.TaskStore(str(tmp_path / "new.csv")).save([task.to_list() for task in self.TASK_LIST])
+        finally:
+            os.umask(umask)
+        assert stat.S_IMODE(os.stat(tmp_path / "new.csv").st_mode) == 0o640
+        os.chmod(mock_csv, 0o604)
+        task_store.TaskStore(str(mock_csv)).save([task.to_list() for task in self.TASK_LIST])
+        assert stat.S_IMODE(os.stat(mock_csv).st_mode) == 0o604
+
+    def test_task_from_row(self):
+        no_deadline = TASK.Task.load_from_data("Name7", "Desc", None, 1, 7, "2001-01-26 21:21:47.813295", False)
+        for task in TestManager.TASK_LIST + [no_deadline]:
+            loaded = task_manager.TaskManager._task_from_row(task.to_list())
+            assert loaded == task
+            assert loaded.completed == task.completed
+            assert loaded.to_list() == task.to_list()
+            with pytest.raises(AttributeError):
+                loaded.extra = None  # Tasks are slotted
+
+    def test_id_lookup_keeps_order(self, mock_csv):
+        manager = task_manager.TaskManager(loadfile=str(mock_csv))
+        manager.load_from_file(str(mock_csv))
+
+        manager.delete_task(2)
+        added = manager.add_task("Added")
+        assert manager.get_task(added.id) is added
+        assert [int(row[0]) for row in manager.to_list()] == [1, 3, 4, 5, 6, added.id]
+        assert manager.get_tasks() == [manager.get_task(int(row[0])) for row in manager.to_list()]
+
     def test_delete_old(self, mock_csv):
         """
         Tests if past due tasks are deleted
@@ -243,3 +307,950 @@ class TestManager:
             manager.toggle_completion(task_id)
             final = manager.get_task(task_id).completed
             assert initial != final
+
+    class TestJournal:
+        def test_edits_replayed(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), journaled=True)
+            manager.load_from_file()
+            with open(mock_csv, 'rb') as file:
+                snapshot = file.read()
+
+            manager.edit_task(1, "Journaled")
+            manager.toggle_completion(3)
+            manager.delete_task(2)
+            added = manager.add_task("Appended")
+
+            with open(mock_csv, 'rb') as file:  # The snapshot is never rewritten by journaled edits
+                assert file.read() == snapshot
+            manager.load_from_file()
+            assert manager.get_task(1).name == "Journaled"
+            assert manager.get_task(3).completed
+            assert manager.get_task(added.id).name == "Appended"
+            with pytest.raises(exceptions.TaskIDError):
+                manager.get_task(2)
+            assert len(manager.to_list()) == len(TestManager.TASK_LIST)
+
+        def test_deleted_id_reused(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), journaled=True)
+            manager.load_from_file()
+            manager.delete_task(6)
+            manager.load_from_file()
+            added = manager.add_task("Reused")  # The highest id was deleted, so it is handed out again
+            manager.load_from_file()
+            assert added.id == 6
+            assert manager.get_task(6).name == "Reused"
+
+        def test_compact(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), journaled=True)
+            manager.load_from_file()
+            manager.edit_task(4, "Compacted")
+            manager.delete_task(5)
+            journaled = manager.to_list()
+
+            store = task_store.TaskStore(str(mock_csv))
+            store.compact()
+            assert not (mock_csv.parent / (mock_csv.name + task_store.TaskStore.JOURNAL_SUFFIX)).exists()
+            assert store.load_from_csv()[1] == journaled
+
+        def test_unjournaled_edit_applies_journal(self, mock_csv):
+            journaled = task_manager.TaskManager(loadfile=str(mock_csv), journaled=True)
+            journaled.load_from_file()
+            journaled.edit_task(1, "First")
+
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file()
+            manager.edit_task(1, description="Second")
+            manager.load_from_file()
+            assert manager.get_task(1).name == "First"
+            assert manager.get_task(1).description == "Second"
+
+    class TestSQLite:
+        def test_get_task_without_load(self, mock_db):
+            manager = task_manager.TaskManager(loadfile=mock_db)
+            assert manager.indexed
+            assert manager.get_task(3) == TestManager.TASK_LIST[2]
+            with pytest.raises(exceptions.TaskIDError):
+                manager.get_task(len(TestManager.TASK_LIST) + 1)
+
+        @pytest.mark.parametrize("sort", list(task_manager.SortType))
+        @pytest.mark.parametrize("reverse", [False, True])
+        def test_sorted_query_matches_memory(self, mock_db, sort, reverse):
+            queried = task_manager.TaskManager(loadfile=mock_db).get_tasks(sort, reverse)
+            loaded = task_manager.TaskManager(loadfile=mock_db)
+            loaded.load_from_file()
+            assert [task.id for task in queried] == [task.id for task in loaded.get_tasks(sort, reverse)]
+
+        def test_edits(self, mock_db):
+            manager = task_manager.TaskManager(loadfile=mock_db)
+            manager.toggle_completion(3)
+            manager.edit_task(4, "Edited", deadline="2030-01-01")
+            manager.delete_task(5)
+            manager.load_from_file()  # Sets the last id used before adding
+            added = manager.add_task("Added")
+
+            manager = task_manager.TaskManager(loadfile=mock_db)
+            manager.load_from_file()
+            assert manager.get_task(3).completed
+            assert manager.get_task(4).name == "Edited"
+            assert manager.get_task(added.id).name == "Added"
+            with pytest.raises(exceptions.TaskIDError):
+                manager.get_task(5)
+
+        def test_copy_between_formats(self, mock_csv, tmp_path):
+            rows = task_store.TaskStore(str(mock_csv)).load_from_csv()[1]
+            db_path = str(tmp_path / "copy.db")
+            task_store.open_store(str(mock_csv)).copy(str(mock_csv), db_path)
+            csv_path = str(tmp_path / "copy.csv")
+            task_store.open_store(db_path).copy(db_path, csv_path)
+            assert task_store.open_store(db_path).load()[1] == rows
+            assert task_store.TaskStore(csv_path).load_from_csv()[1] == rows
+
+        def test_incomplete_backend(self, mock_csv):
+            class Unsaved(task_store.StoreBackend):  # Misses save
+                def append(self, data, filename=None):
+                    pass
+
+                def edit(self, task_id, data=None, filename=None):
+                    pass
+
+                def load(self, filename=None):
+                    return 0, []
+
+            with pytest.raises(TypeError):  # Fails when created, not once save is called
+                Unsaved(str(mock_csv))
+
+    class TestBinary:
+        def test_get_task_without_load(self, mock_tmb):
+            manager = task_manager.TaskManager(loadfile=mock_tmb)
+            assert manager.indexed
+            assert manager.get_task(3) == TestManager.TASK_LIST[2]
+            with pytest.raises(exceptions.TaskIDError):
+                manager.get_task(len(TestManager.TASK_LIST) + 1)
+
+        @pytest.mark.parametrize("sort", list(task_manager.SortType))
+        @pytest.mark.parametrize("reverse", [False, True])
+        @pytest.mark.parametrize("offset, limit", [(0, None), (1, 3)])
+        def test_sorted_query_matches_db(self, mock_tmb, mock_db, sort, reverse, offset, limit):
+            queried = task_manager.TaskManager(loadfile=mock_tmb).iter_tasks(sort, reverse, offset, limit)
+            expected = task_manager.TaskManager(loadfile=mock_db).iter_tasks(sort, reverse, offset, limit)
+            assert [task.id for task in queried] == [task.id for task in expected]
+
+        def test_edits(self, mock_tmb):
+            manager = task_manager.TaskManager(loadfile=mock_tmb)
+            manager.toggle_completion(3)
+            manager.edit_task(4, "Édité", deadline="2030-01-01")
+            manager.delete_task(5)
+            added = manager.add_task("Added", "Ünïcode description")
+
+            manager = task_manager.TaskManager(loadfile=mock_tmb)
+            manager.load_from_file()
+            assert manager.get_task(3).completed
+            assert manager.get_task(4).name == "Édité"
+            assert manager.get_task(4).deadline == datetime.datetime(2030, 1, 1)
+            assert manager.get_task(added.id).description == "Ünïcode description"
+            assert manager.get_task(6) == TestManager.TASK_LIST[5]
+            with pytest.raises(exceptions.TaskIDError):
+                manager.get_task(5)
+
+        def test_heap_compacted(self, mock_tmb):
+            store = binary_store.BinaryTaskStore(str(mock_tmb))
+            rows = store.load()[1]
+            size = os.path.getsize(mock_tmb)
+            for number in range(20):
+                store.edit(1, [rows[0][:1] + [f"Renamed {number}"] + rows[0][2:]])
+            assert os.path.getsize(mock_tmb) < size + 200
+            assert store.load()[1] == [rows[0][:1] + ["Renamed 19"] + rows[0][2:]] + rows[1:]
+
+        def test_not_a_store(self, mock_csv, tmp_path):
+            store_path = tmp_path / "todo.tmb"
+            store_path.write_bytes(mock_csv.read_bytes())
+            with pytest.raises(exceptions.StoreReadException):
+                binary_store.BinaryTaskStore(str(store_path)).load()
+
+        def test_convert(self, mock_csv, tmp_path):
+            rows = task_store.TaskStore(str(mock_csv)).load_from_csv()[1]
+            tmb_path = str(tmp_path / "copy.tmb")
+            task_store.TaskStore(str(mock_csv)).copy_csv(str(mock_csv), tmb_path)
+            csv_path = str(tmp_path / "copy.csv")
+            task_store.open_store(tmb_path).copy(tmb_path, csv_path)
+            assert task_store.open_store(tmb_path).load()[1] == rows
+            assert task_store.TaskStore(csv_path).load_from_csv()[1] == rows
+
+    class TestLazyLoad:
+        def test_lazy_matches_eager(self, mock_csv):
+            lazy = task_manager.TaskManager(loadfile=str(mock_csv))
+            lazy.load_from_file(lazy=True)
+            eager = task_manager.TaskManager(loadfile=str(mock_csv))
+            eager.load_from_file()
+
+            assert lazy.to_list() == eager.to_list()
+            assert lazy.get_task(3) == eager.get_task(3)
+            for sort in task_manager.SortType:
+                assert lazy.get_tasks(sort) == eager.get_tasks(sort)
+
+        def test_lazy_edits(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file(lazy=True)
+            manager.toggle_completion(4)
+            manager.delete_task(5)
+            added = manager.add_task("Lazy")
+            assert added.id == len(TestManager.TASK_LIST) + 1
+
+            manager.load_from_file()
+            assert manager.get_task(4).completed
+            assert manager.get_task(added.id).name == "Lazy"
+            with pytest.raises(exceptions.TaskIDError):
+                manager.get_task(5)
+
+    @pytest.mark.parametrize("sort", list(task_manager.SortType))
+    @pytest.mark.parametrize("reverse", [False, True])
+    class TestPages:
+        @pytest.mark.parametrize("offset, limit", [(0, None), (0, 2), (2, 3), (4, 10), (10, 2)])
+        def test_pages_match_list(self, mock_csv, sort, reverse, offset, limit):
+            loaded = task_manager.TaskManager(loadfile=str(mock_csv))
+            loaded.load_from_file()
+            expected = loaded.get_tasks(sort, reverse)[offset:None if limit is None else offset + limit]
+
+            assert list(loaded.iter_tasks(sort, reverse, offset, limit)) == expected
+            unloaded = task_manager.TaskManager(loadfile=str(mock_csv))
+            assert list(unloaded.iter_tasks(sort, reverse, offset, limit)) == expected
+
+        def test_sqlite_pages(self, mock_db, sort, reverse):
+            manager = task_manager.TaskManager(loadfile=mock_db)
+            pages = [task.id for offset in range(0, 6, 4) for task in manager.iter_tasks(sort, reverse, offset, 4)]
+            assert pages == [task.id for task in manager.get_tasks(sort, reverse)]
+
+    class TestBatch:
+        @pytest.fixture(params=[{}, {"journaled": True}, {"offset_index": True}, "db", "tmb"])
+        def manager(self, request, mock_csv, mock_db, mock_tmb):
+            if request.param in ("db", "tmb"):
+                return task_manager.TaskManager(loadfile=mock_db if request.param == "db" else mock_tmb)
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), **request.param)
+            manager.load_from_file(lazy=True)
+            return manager
+
+        def _reload(self, manager):
+            reloaded = task_manager.TaskManager(loadfile=manager.loadfile)
+            reloaded.load_from_file()
+            return reloaded
+
+        def test_toggle_completions(self, manager):
+            tasks = manager.toggle_completions([1, 3, 4, 3])
+            assert [task.id for task in tasks] == [1, 3, 4]
+            reloaded = self._reload(manager)
+            assert [reloaded.get_task(task_id).completed for task_id in (1, 2, 3, 4)] == [False, True, True, True]
+
+        def test_edit_tasks(self, manager):
+            manager.edit_tasks([2, 5], description="Batch", priority=2)
+            reloaded = self._reload(manager)
+            for task_id in (2, 5):
+                assert reloaded.get_task(task_id).description == "Batch"
+                assert reloaded.get_task(task_id).priority.value == 2
+            assert reloaded.get_task(3).description == "Description3"
+
+        def test_delete_tasks(self, manager):
+            manager.delete_tasks(range(2, 5))
+            assert [task.id for task in self._reload(manager).get_tasks()] == [1, 5, 6]
+
+        def test_missing_ids(self, manager):
+            with pytest.raises(exceptions.TaskIDError) as error:
+                manager.delete_tasks([1, 42, 43])
+            assert error.value.attempted == [42, 43]
+            assert len(self._reload(manager).get_tasks()) == len(TestManager.TASK_LIST)
+
+    class TestAllocateId:
+        def test_store_not_read(self, mock_csv, monkeypatch):
+            store = task_store.TaskStore(str(mock_csv))
+            assert store.allocate_id() == len(TestManager.TASK_LIST) + 1
+            monkeypatch.setattr(task_store.TaskStore, "load_from_csv", None)  # Any read would fail now
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            assert manager.add_task("First").id == len(TestManager.TASK_LIST) + 2  # The first id stays reserved
+            assert manager.add_task("Second").id == len(TestManager.TASK_LIST) + 3
+            manager.delete_task(len(TestManager.TASK_LIST) + 3)
+            assert store.allocate_id() == len(TestManager.TASK_LIST) + 4
+
+        def test_outdated_mark_rebuilt(self, mock_csv):
+            store = task_store.TaskStore(str(mock_csv))
+            store.allocate_id()
+            with mock_csv.open("a", newline='') as file:  # Changed by something other than the store
+                csv.writer(file).writerow(["42"] + TestManager.TASK_LIST[0].to_list()[1:])
+            assert store.allocate_id() == 43
+
+        @pytest.mark.parametrize("options", [{"journaled": True}, {"offset_index": True}])
+        def test_kept_across_writes(self, mock_csv, options):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), **options)
+            manager.add_task("Added")
+            manager.load_from_file()
+            manager.toggle_completion(2)
+            manager.edit_tasks([3, 4], name="Edited")
+            mark = high_water_mark.HighWaterMark(mock_csv, task_store.TaskStore.journal_path(mock_csv))
+            assert mark.read() == len(TestManager.TASK_LIST) + 1
+
+        def test_sqlite(self, mock_db):
+            store = sqlite_store.SQLiteTaskStore(str(mock_db))
+            assert store.allocate_id() == len(TestManager.TASK_LIST) + 1
+            assert store.allocate_id() == len(TestManager.TASK_LIST) + 2
+            store.save([TestManager.TASK_LIST[0].to_list()])
+            assert store.allocate_id() == 2
+
+        @pytest.mark.parametrize("fixture", ["mock_csv", "mock_db", "mock_tmb"])
+        def test_many(self, request, fixture):
+            store = task_store.open_store(request.getfixturevalue(fixture))
+            assert store.allocate_id(count=3) == len(TestManager.TASK_LIST) + 1
+            assert store.allocate_id() == len(TestManager.TASK_LIST) + 4
+            assert store.allocate_id(count=2) == len(TestManager.TASK_LIST) + 5
+
+    class TestColumns:
+        def test_rows_match_tasks(self):
+            from_tasks = task_columns.TaskColumns(TestManager.TASK_LIST)
+            from_rows = task_columns.TaskColumns([task.to_list() for task in TestManager.TASK_LIST])
+            for name in ("ID", "Deadline", "Created", "Priority", "Completed"):
+                assert from_tasks.column(name) == from_rows.column(name)
+
+        def test_filters(self):
+            no_deadline = TASK.Task.load_from_data("Name7", None, None, 1, 7, "2001-01-26 21:21:47.813295", False)
+            columns = task_columns.TaskColumns(TestManager.TASK_LIST + [no_deadline])
+            assert columns.completed_positions() == [0, 1, 5]
+
+        def test_select_matches_argsort(self):
+            columns = task_columns.TaskColumns(TestManager.TASK_LIST)
+            for reverse in (False, True):
+                assert columns.select("Priority", reverse, 4) == columns.argsort("Priority", reverse)[:4]
+
+        def test_lazy_delete_completed(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file(lazy=True)
+            manager.delete_completed_tasks()
+            manager.load_from_file()
+            assert [task.id for task in manager.get_tasks()] == [3, 4, 5]
+
+    class TestTimestamps:
+        @pytest.mark.parametrize("text,result", [
+            ("2016-03-02 05:03:06.445500", datetime.datetime(2016, 3, 2, 5, 3, 6, 445500)),
+            ("2016-03-02 05:03:06", datetime.datetime(2016, 3, 2, 5, 3, 6)),
+            ("2016-3-2 5:03:06.5", datetime.datetime(2016, 3, 2, 5, 3, 6, 500000)),
+            ("1456895046445500", datetime.datetime(2016, 3, 2, 5, 4, 6, 445500)),
+            ("-1000000", datetime.datetime(1969, 12, 31, 23, 59, 59))])
+        def test_parse_time(self, text, result):
+            assert timestamps.parse_time(text) == result
+            assert timestamps.from_microseconds(timestamps.time_microseconds(text)) == result
+
+        @pytest.mark.parametrize("text", ["2016-03-02", "2016-3-2", "2016-03-02 05:03:06", "1456895046445500"])
+        def test_parse_date(self, text):
+            assert timestamps.parse_date(text) == datetime.datetime(2016, 3, 2)
+            assert timestamps.date_microseconds(text) == timestamps.to_microseconds(datetime.datetime(2016, 3, 2))
+
+        def test_invalid(self):
+            with pytest.raises(ValueError):
+                timestamps.parse_time("yesterday")
+            with pytest.raises(ValueError):
+                timestamps.parse_date("2016-13-02")
+
+        @pytest.mark.parametrize("text", ["20251231", "2025", "12", "1456895046445500", "-1000000"])
+        def test_input_not_epoch(self, text):
+            with pytest.raises(ValueError):
+                timestamps.parse_input_date(text)
+            with pytest.raises(ValueError):
+                timestamps.parse_input_time(text)
+            with pytest.raises(exceptions.DateException):
+                TASK.Task("Name", deadline=text)
+            assert timestamps.parse_input_date("2016-03-02 05:03:06") == timestamps.parse_date("2016-03-02")
+            assert timestamps.parse_input_time("2016-03-02 05:03:06") == timestamps.parse_time("2016-03-02 05:03:06")
+
+        def test_round_trip(self):
+            for task in TestManager.TASK_LIST:
+                row = task.to_list()
+                for field in (row[3], row[5]):
+                    assert timestamps.to_text(timestamps.to_epoch(field)) == field
+            assert timestamps.to_epoch('None') == timestamps.to_text('None') == 'None'
+
+        def test_epoch_store(self, mock_csv, tmp_path):
+            epoch_path = str(tmp_path / "epoch.csv")
+            store = task_store.TaskStore(epoch_path, epoch_times=True)
+            store.save_to_csv([task.to_list() for task in TestManager.TASK_LIST])
+            with open(epoch_path, newline='') as file:
+                rows = list(csv.reader(file))[1:]
+            assert all(row[5].isdigit() and (row[3] == 'None' or row[3].isdigit()) for row in rows)
+
+            manager = task_manager.TaskManager(loadfile=epoch_path, epoch_times=True)
+            manager.load_from_file()
+            assert [task.to_list() for task in manager.get_tasks()] == \
+                   [task.to_list() for task in TestManager.TASK_LIST]
+            assert manager.get_tasks(task_manager.SortType.DEADLINE) == \
+                   task_manager.TaskManager(TestManager.TASK_LIST).get_tasks(task_manager.SortType.DEADLINE)
+
+        def test_mixed_store(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), epoch_times=True)
+            manager.load_from_file()
+            manager.edit_task(2, deadline="2020-05-05")  # Rewritten with epoch times, other rows keep their text
+            manager.add_task("Added", deadline="2021-01-01")
+            reloaded = task_manager.TaskManager(loadfile=str(mock_csv))
+            reloaded.load_from_file()
+            assert reloaded.get_task(2).deadline == datetime.datetime(2020, 5, 5)
+            assert reloaded.get_task(1).to_list() == TestManager.TASK_LIST[0].to_list()
+            assert [task.id for task in reloaded.get_tasks(task_manager.SortType.DEADLINE)] == [6, 5, 4, 3, 2, 7, 1]
+
+    class TestParseCache:
+        @staticmethod
+        def _loaded(store_path, lazy=False, **options):
+            manager = task_manager.TaskManager(loadfile=str(store_path), parse_cache=True, **options)
+            manager.load_from_file(lazy=lazy)
+            return manager
+
+        def test_store_not_parsed(self, mock_csv, monkeypatch):
+            self._loaded(mock_csv)
+            assert (mock_csv.parent / (mock_csv.name + parse_cache.ParseCache.SUFFIX)).exists()
+            monkeypatch.setattr(task_store.TaskStore, "load_from_csv", None)  # Any parse would fail now
+            for lazy in (False, True):
+                manager = self._loaded(mock_csv, lazy)
+                assert [task.to_list() for task in manager.get_tasks(task_manager.SortType.DEADLINE)] == \
+                       [task.to_list() for task in
+                        task_manager.TaskManager(TestManager.TASK_LIST).get_tasks(task_manager.SortType.DEADLINE)]
+                assert TASK.Task.last_id == len(TestManager.TASK_LIST)
+
+        @pytest.mark.parametrize("options", [{}, {"journaled": True}, {"offset_index": True}])
+        def test_invalidated_by_writes(self, mock_csv, options):
+            manager = self._loaded(mock_csv, **options)
+            manager.add_task("Added")
+            assert self._loaded(mock_csv).get_task(len(TestManager.TASK_LIST) + 1).name == "Added"
+            manager.toggle_completion(3)  # Patched in place with an offset index, the size stays the same
+            assert self._loaded(mock_csv).get_task(3).completed
+            manager.delete_task(4)
+            manager.edit_task(5, name="Edited")
+            reloaded = self._loaded(mock_csv, lazy=True)
+            assert reloaded.get_task(5).name == "Edited"
+            assert [task.id for task in reloaded.get_tasks()] == [1, 2, 3, 5, 6, 7]
+
+        def test_invalidated_by_hand_edits(self, mock_csv):
+            self._loaded(mock_csv)
+            with mock_csv.open("a", newline='') as file:  # Changed by something other than the store
+                csv.writer(file).writerow(["42"] + TestManager.TASK_LIST[0].to_list()[1:])
+            assert self._loaded(mock_csv).get_task(42).name == TestManager.TASK_LIST[0].name
+            with open(parse_cache.ParseCache.path(mock_csv), 'r+b') as file:  # A cache left incomplete
+                file.truncate(40)
+            assert len(self._loaded(mock_csv).get_tasks()) == len(TestManager.TASK_LIST) + 1
+
+        def test_off_by_default(self, mock_csv, tmp_path):
+            config_path = tmp_path / "config.ini"
+            config_path.write_text(f"[General]\nStorage = {mock_csv}\n")
+            options = task_store.get_store_options(config_path)
+            assert not options["parse_cache"] and not task_store.open_store(mock_csv, **options).parse_cache
+            config_path.write_text(f"[General]\nStorage = {mock_csv}\nParseCache = True\n")
+            assert task_store.get_store_options(config_path)["parse_cache"]
+
+        def test_conflicts_detected(self, mock_csv):
+            self._loaded(mock_csv)
+            cached = task_store.TaskStore(str(mock_csv), parse_cache=True)
+            cached.load_table()
+            task_store.TaskStore(str(mock_csv)).edit_csv(3)
+            with pytest.raises(exceptions.StoreConflictException):
+                cached.edit(4)
+
+    class TestFilter:
+        NO_DEADLINE = TASK.Task.load_from_data("Name7", None, None, 2, 7, "2001-01-26 21:21:47.813295", False)
+        FILTERS = [
+            ("priority>=high", lambda task: task.priority.value >= 2),
+            ("not completed and deadline<2020-01-01", lambda task: not task.completed and task.deadline is not None
+             and task.deadline < datetime.datetime(2020, 1, 1)),
+            ("deadline=none or deadline>=2064-03-03", lambda task: task.deadline is None
+             or task.deadline >= datetime.datetime(2064, 3, 3)),
+            ("deadline!=2016-03-03 and deadline!=none", lambda task: task.deadline not in
+             (None, datetime.datetime(2016, 3, 3))),
+            ("deadline!=2016-03-03", lambda task: task.deadline not in (None, datetime.datetime(2016, 3, 3))),
+            ("created<=2004-01-26", lambda task: task.created < datetime.datetime(2004, 1, 27)),
+            ("created=2004-01-26 or created='2002-01-26 21:21:47.813295'",
+             lambda task: task.created.date() in (datetime.date(2004, 1, 26), datetime.date(2002, 1, 26))),
+            ("name~AME5 or (description~tion2 and completed)", lambda task: task.id in (2, 5)),
+            ("name=name3 or not (id>2 and id<=6)", lambda task: task.id in (1, 2, 3, 7)),
+            ("completed=no and priority!=low", lambda task: not task.completed and task.priority.value != 0),
+        ]
+
+        @pytest.mark.parametrize("expression,predicate", FILTERS)
+        def test_matches_predicate(self, mock_csv, expression, predicate):
+            task_store.TaskStore(str(mock_csv)).append_to_csv([self.NO_DEADLINE.to_list()])
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            expected = [task.id for task in TestManager.TASK_LIST + [self.NO_DEADLINE] if predicate(task)]
+            assert [task.id for task in manager.get_tasks(where=expression)] == expected
+            compiled = task_filter.TaskFilter(expression)
+            assert [task.id for task in manager.iter_tasks(where=compiled)] == expected
+            assert [int(row[0]) for row in task_store.TaskStore(str(mock_csv)).load_from_csv()[1]
+                    if compiled.matches(row)] == expected
+
+        @pytest.mark.parametrize("sort", list(task_manager.SortType))
+        @pytest.mark.parametrize("reverse", [False, True])
+        def test_sorted_pages(self, mock_csv, sort, reverse):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file()
+            matching = [task for task in manager.get_tasks(sort, reverse) if not task.completed]
+            assert manager.get_tasks(sort, reverse, "not completed") == matching
+            assert list(manager.iter_tasks(sort, reverse, 1, 1, "not completed")) == matching[1:2]
+
+        def test_indexed_stores(self, mock_db, mock_tmb):
+            for store_path in (mock_db, mock_tmb):
+                manager = task_manager.TaskManager(loadfile=str(store_path))
+                assert [task.id for task in manager.get_tasks(task_manager.SortType.DEADLINE, where="priority<=normal "
+                                                              "and deadline>2005-01-01")] == [4, 2, 1]
+
+        def test_index_follows_appends(self):
+            columns = task_columns.TaskColumns(TestManager.TASK_LIST)
+            assert columns.range_positions("Priority", 1, 3) == [1, 3, 5, 2]
+            columns.append(self.NO_DEADLINE)
+            assert columns.range_positions("Priority", 2, 3) == [2, 6]
+            assert columns.count_range("Deadline", timestamps.NO_DEADLINE, timestamps.NO_DEADLINE + 1) == 1
+
+        @pytest.mark.parametrize("expression", ["", "priority", "priority>=urgent", "(completed", "completed and",
+                                                "name<3", "colour=red", "deadline<none", "deadline<2024-13-01",
+                                                "completed>yes", "id=1 id=2", "name!x", "deadline<20261101",
+                                                "created>=2026", "created='1456895046445500'"])
+        def test_invalid(self, mock_csv, expression):
+            with pytest.raises(exceptions.FilterError):
+                task_filter.TaskFilter(expression)
+            with pytest.raises(exceptions.FilterError):
+                task_manager.TaskManager(loadfile=str(mock_csv)).get_tasks(where=expression)
+
+    class TestSortSpec:
+        NO_DEADLINE = TASK.Task.load_from_data("Name7", None, None, 1, 7, "2001-01-26 21:21:47.813295", False)
+
+        @pytest.mark.parametrize("spec,reverse,ids", [
+            ("priority,deadline,-created", False, [3, 7, 6, 4, 2, 5, 1]),
+            ("priority, deadline, -created", True, [1, 5, 2, 4, 6, 7, 3]),
+            ("completed,-priority,ID", False, [5, 4, 7, 3, 1, 2, 6]),
+            ("-completed,created", False, [6, 1, 2, 7, 5, 4, 3]),
+        ])
+        def test_sorts_in_turn(self, mock_csv, spec, reverse, ids):
+            task_store.TaskStore(str(mock_csv)).append_to_csv([self.NO_DEADLINE.to_list()])
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file()
+            assert [task.id for task in manager.get_tasks(spec, reverse)] == ids
+            assert [task.id for task in manager.iter_tasks(sort_spec.SortSpec(spec), reverse, 2, 3)] == ids[2:5]
+            matching = [task_id for task_id in ids if task_id != 3]
+            assert [task.id for task in manager.get_tasks(spec, reverse, "id!=3")] == matching
+            assert [task.id for task in manager.iter_tasks(spec, reverse, 1, 2, "id!=3")] == matching[1:3]
+
+        @pytest.mark.parametrize("sort", list(task_manager.SortType))
+        @pytest.mark.parametrize("reverse", [False, True])
+        def test_single_field(self, mock_csv, sort, reverse):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file()
+            spec = {"DATE": "created"}.get(sort.name, sort.name.lower())
+            assert manager.get_tasks(spec, reverse) == manager.get_tasks(sort, reverse)
+            assert manager.get_tasks("-" + spec, reverse) == manager.get_tasks(sort, not reverse)
+
+        def test_indexed_stores(self, mock_csv, mock_db, mock_tmb):
+            expected = [task.id for task in task_manager.TaskManager(TestManager.TASK_LIST).get_tasks("-completed,"
+                                                                                                     "deadline")]
+            for store_path in (mock_csv, mock_db, mock_tmb):
+                assert [task.id for task in task_manager.TaskManager(loadfile=str(store_path), offset_index=True)
+                        .get_tasks("-completed,deadline")] == expected
+                assert [task.id for task in task_manager.TaskManager(loadfile=str(store_path))
+                        .iter_tasks("-completed,deadline", limit=2)] == expected[:2]
+
+        def test_order_kept_until_changed(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file()
+            keys = sort_spec.SortSpec("priority,-created").keys
+            columns = task_columns.TaskColumns(TestManager.TASK_LIST)
+            assert columns.argsort_keys(keys) is columns.argsort_keys(keys)
+            assert columns.select_keys(keys, 2) == columns.argsort_keys(keys)[:2]
+            columns.append(self.NO_DEADLINE)
+            assert columns.argsort_keys(keys) == [2, 1, 3, 5, 6, 0, 4]
+            assert [task.id for task in manager.get_tasks("priority,-created")] == [3, 2, 4, 6, 1, 5]
+            manager.add_task("Added", priority=1)
+            manager.edit_task(3, priority=0)
+            assert [task.id for task in manager.get_tasks("priority,-created")] == [7, 2, 4, 6, 1, 3, 5]
+
+        @pytest.mark.parametrize("spec", ["", " ", "urgency", "priority,", "-", "priority,-priority", "key,id",
+                                          "deadline created"])
+        def test_invalid(self, mock_csv, spec):
+            with pytest.raises(exceptions.SortError):
+                sort_spec.SortSpec(spec)
+            with pytest.raises(exceptions.SortError):
+                task_manager.TaskManager(loadfile=str(mock_csv)).get_tasks(spec)
+
+    class TestSortedViews:
+        SORTS = list(task_manager.SortType) + ["priority,deadline,-created", "-completed,-id"]
+
+        @staticmethod
+        def _check(manager, store_path):
+            fresh = task_manager.TaskManager(loadfile=str(store_path))
+            fresh.load_from_file()
+            for sort in TestManager.TestSortedViews.SORTS:
+                for reverse in (False, True):
+                    expected = [task.id for task in fresh.get_tasks(sort, reverse)]
+                    assert [task.id for task in manager.get_tasks(sort, reverse)] == expected
+                    assert [task.id for task in manager.iter_tasks(sort, reverse, 1, 3)] == expected[1:4]
+
+        @pytest.mark.parametrize("lazy", [False, True])
+        def test_follow_changes(self, mock_csv, lazy, monkeypatch):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), sorted_views=True)
+            manager.load_from_file(lazy=lazy)
+            self._check(manager, mock_csv)
+            changes = [
+                lambda: manager.add_task("Added", deadline="2030-01-01", priority=2),
+                lambda: manager.add_task("Added2"),
+                lambda: manager.edit_task(3, deadline="2070-05-05", priority=0),
+                lambda: manager.edit_task(8, name="Renamed"),
+                lambda: manager.toggle_completion(4),
+                lambda: manager.delete_task(1),
+                lambda: manager.edit_tasks([2, 5, 7], priority=1),
+                lambda: manager.toggle_completions([5, 6]),
+                lambda: manager.delete_tasks([2, 8]),
+                manager.delete_completed_tasks,
+                lambda: manager.add_task("Added3", deadline="2001-01-01"),
+                manager.delete_old_tasks,
+            ]
+            for change in changes:
+                monkeypatch.setattr(task_columns.TaskColumns, "argsort_keys", None)  # Any sort would fail now
+                monkeypatch.setattr(task_columns.TaskColumns, "select_keys", None)
+                change()
+                assert [task.id for task in manager.get_tasks("priority,deadline,-created")]
+                assert list(manager.iter_tasks(task_manager.SortType.DATE, True, 0, 2))
+                monkeypatch.undo()
+                self._check(manager, mock_csv)
+
+        def test_rebuilt_when_reloaded(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), sorted_views=True)
+            manager.load_from_file()
+            self._check(manager, mock_csv)
+            other = task_manager.TaskManager(loadfile=str(mock_csv))
+            other.load_from_file()
+            other.edit_task(6, priority=2)
+            manager.edit_task(5, priority=2)  # Redone on the reloaded tasks after the conflict
+            self._check(manager, mock_csv)
+            other.delete_task(4)
+            manager.load_from_file()
+            self._check(manager, mock_csv)
+            manager.clear_tasks()
+            assert manager.get_tasks(task_manager.SortType.PRIORITY) == []
+            manager.add_task("Added")
+            self._check(manager, mock_csv)
+
+        def test_remove_many(self):
+            tasks = [TASK.Task.load_from_data(f"Name{number}", None, None, number % 3, number,
+                                              "2011-01-26 21:21:47.813295", number % 2 == 0)
+                     for number in range(1, 201)]
+            keys = sort_spec.SortSpec("completed,-priority").keys
+            view = sorted_view.SortedView(keys, task_columns.TaskColumns(tasks))
+            view.remove_many([3, 50])  # Single entries are deleted
+            view.remove_many(range(100, 150))  # The view is filtered
+            kept = [task for task in tasks if task.id not in {3, 50} | set(range(100, 150))]
+            assert view.ids == sorted_view.SortedView(keys, task_columns.TaskColumns(kept)).ids
+            assert len(view) == len(kept)
+
+    class TestDeadlines:
+        @pytest.fixture()
+        def due_csv(self, tmp_path):
+            today = datetime.date.today()
+            store_path = tmp_path / "due.csv"
+            rows = []
+            for task_id, days in enumerate([3, -2, None, 0, 40, 1, -400, 3, 1], 1):
+                deadline = None if days is None else str(today + datetime.timedelta(days=days))
+                rows.append(TASK.Task.load_from_data(f"Name{task_id}", None, deadline, 1, task_id,
+                                                     "2011-01-26 21:21:47.813295", task_id == 8).to_list())
+            task_store.TaskStore(str(store_path)).save_to_csv(rows)
+            return store_path
+
+        @pytest.mark.parametrize("options", [{}, {"sorted_views": True}])
+        def test_due(self, due_csv, options):
+            manager = task_manager.TaskManager(loadfile=str(due_csv), **options)
+            assert [task.id for task in manager.due()] == [4, 6, 9, 1, 5]
+            assert [task.id for task in manager.due(datetime.timedelta(days=2))] == [4, 6, 9]
+            assert [task.id for task in manager.due(datetime.timedelta(days=50), 4)] == [4, 6, 9, 1]
+            assert [task.id for task in manager.due(overdue=True, limit=3)] == [7, 2, 4]
+            manager.edit_task(5, deadline=str(datetime.date.today()))
+            manager.toggle_completion(6)
+            manager.delete_task(4)
+            manager.add_task("Added", deadline=str(datetime.date.today() + datetime.timedelta(days=2)))
+            assert [task.id for task in manager.due(datetime.timedelta(days=2))] == [5, 9, 10]
+
+        @pytest.mark.parametrize("options", [{}, {"journaled": True}, {"offset_index": True}, {"sorted_views": True}])
+        def test_delete_old_tasks(self, due_csv, options):
+            manager = task_manager.TaskManager(loadfile=str(due_csv), **options)
+            manager.load_from_file(lazy=True)
+            manager.get_tasks(task_manager.SortType.DEADLINE)
+            expected = [task.id for task in manager.get_tasks() if task.deadline is None
+                        or task.deadline >= datetime.datetime.now()]
+            manager.delete_old_tasks()
+            assert [task.id for task in manager.get_tasks()] == expected == [1, 3, 5, 6, 8, 9]
+            assert [task.id for task in manager.get_tasks(task_manager.SortType.DEADLINE)] == [3, 6, 9, 1, 8, 5]
+            reloaded = task_manager.TaskManager(loadfile=str(due_csv))
+            reloaded.load_from_file()
+            assert [task.id for task in reloaded.get_tasks()] == expected
+            version = store_lock.StoreLock(str(due_csv)).version()
+            manager.delete_old_tasks()  # Nothing is past due, the store is not written
+            assert store_lock.StoreLock(str(due_csv)).version() == version
+
+        def test_indexed_stores(self, due_csv, tmp_path):
+            rows = task_store.TaskStore(str(due_csv)).load_from_csv()[1]
+            for store in (sqlite_store.SQLiteTaskStore(str(tmp_path / "due.db")),
+                          binary_store.BinaryTaskStore(str(tmp_path / "due.tmb"))):
+                store.save(rows)
+                manager = task_manager.TaskManager(loadfile=store.store_filename)
+                assert [task.id for task in manager.due(overdue=True)] == [7, 2, 4, 6, 9, 1, 5]
+                manager.delete_old_tasks()
+                assert [int(row[0]) for row in store.load()[1]] == [1, 3, 5, 6, 8, 9]
+
+    class TestSearch:
+        TASKS = [
+            TASK.Task.load_from_data("Write quarterly report", "Draft the quarterly report for finance", "2064-03-03",
+                                     0, 1, "2011-01-26 21:21:47.813295", True),
+            TASK.Task.load_from_data("Repair bike", "The report says the chain is broken", None, 1, 2,
+                                     "2015-01-26 21:21:47.813295", False),
+            TASK.Task.load_from_data("Report taxes", None, "2016-03-03", 2, 3, "2004-01-26 21:21:47.813295", False),
+            TASK.Task.load_from_data("Reply to Email", "About the report-card", None, 1, 4,
+                                     "2003-01-26 21:21:47.813295", False),
+        ]
+        QUERIES = ["report", "rep*", "the", "Email about", "\"quarterly report\"", "\"report card\" about", "quarter*",
+                   "none", "taxes report"]
+
+        @pytest.fixture()
+        def search_csv(self, tmp_path):
+            store_path = tmp_path / "search.csv"
+            task_store.TaskStore(str(store_path)).save_to_csv([task.to_list() for task in self.TASKS])
+            return store_path
+
+        @staticmethod
+        def _fresh(store_path, query):
+            """
+            Searches an index built from the store as it is now
+            """
+            index = search_index.SearchIndex(str(store_path))
+            index.build(task_store.open_store(store_path).load()[1])
+            return index.search(query)
+
+        @pytest.mark.parametrize("query,ids", [
+            ("report", [3, 1, 2, 4]),  # In the name before in the description, and in short tasks first
+            ("REPORT Taxes", [3]),
+            ("rep*", [3, 2, 4, 1]),
+            ("quarter", []),
+            ("quarter*", [1]),
+            ('"quarterly report"', [1]),
+            ('"report quarterly"', []),
+            ('"report card"', [4]),
+            ('"bike the"', []),  # Phrases do not run on from the name into the description
+            ("none", []),  # Tasks without a description are stored with None
+        ])
+        def test_ranked(self, search_csv, query, ids):
+            manager = task_manager.TaskManager(loadfile=str(search_csv))
+            assert [task.id for task in manager.search(query)] == ids
+            assert [task.id for task in manager.search(query, 1)] == ids[:1]
+            manager.load_from_file()
+            assert [task.id for task in manager.search(query)] == ids
+
+        @pytest.mark.parametrize("options", [{}, {"journaled": True}, {"offset_index": True}, {"parse_cache": True}])
+        def test_follows_writes(self, search_csv, options, monkeypatch):
+            manager = task_manager.TaskManager(loadfile=str(search_csv), **options)
+            manager.load_from_file()
+            manager.search("report")
+            assert (search_csv.parent / (search_csv.name + search_index.SearchIndex.SUFFIX)).exists()
+            monkeypatch.setattr(search_index.SearchIndex, "build", None)  # Any rebuild would fail now
+            manager.add_task("Quarterly review", "Review the report")
+            manager.edit_task(3, name="Pay taxes")
+            manager.delete_task(1)
+            manager.toggle_completion(2)
+            manager.edit_tasks([2, 4], description="Nothing to report")
+            for query in self.QUERIES + ["review", "pay*"]:
+                monkeypatch.undo()
+                expected = self._fresh(search_csv, query)
+                monkeypatch.setattr(search_index.SearchIndex, "build", None)
+                reopened = task_manager.TaskManager(loadfile=str(search_csv), **options)
+                assert [(task.id, score) for task, (_, score) in zip(reopened.search(query), expected)] == expected
+                assert [task.id for task in manager.search(query)] == [task_id for task_id, _ in expected]
+
+        def test_rebuilt_when_stale(self, search_csv):
+            manager = task_manager.TaskManager(loadfile=str(search_csv))
+            manager.search("report")
+            with search_csv.open("a", newline='') as file:  # Changed by something other than the store
+                csv.writer(file).writerow(["42", "Hand written report", "None", "None", "1",
+                                           "2001-01-26 21:21:47.813295", "0"])
+            assert [task.id for task in manager.search("hand")] == [42]
+            with open(search_index.SearchIndex.path(search_csv), 'r+b') as file:  # An index left incomplete
+                file.truncate(100)
+            assert [task.id for task in manager.search("report")] == [3, 42, 1, 2, 4]
+            manager.clear_tasks()
+            assert not os.path.exists(search_index.SearchIndex.path(search_csv))
+            assert manager.search("report") == []
+
+        def test_told_apart_from_other_sidecars(self, search_csv):
+            manager = task_manager.TaskManager(loadfile=str(search_csv))
+            manager.search("report")
+            magics = set()
+            for path in (search_index.SearchIndex.path(search_csv), store_snapshot.StoreSnapshot.path(str(search_csv)),
+                         high_water_mark.HighWaterMark.path(search_csv)):
+                with open(path, 'rb') as file:
+                    magics.add(file.read(4))
+            assert len(magics) == 3
+
+        def test_other_stores(self, mock_db, mock_tmb):
+            for store_path in (mock_db, mock_tmb):
+                manager = task_manager.TaskManager(loadfile=str(store_path))
+                assert [task.id for task in manager.search("name3 description*")] == [3]
+                manager.edit_task(3, name="Renamed")
+                assert [task.id for task in manager.search("renamed")] == [3]
+                assert manager.search("name3") == []
+
+        @pytest.mark.parametrize("query", ["", "   ", "!?", '"unclosed phrase', 'report "'])
+        def test_invalid(self, search_csv, query):
+            with pytest.raises(exceptions.SearchError):
+                search_index.parse_query(query)
+            with pytest.raises(exceptions.SearchError):
+                task_manager.TaskManager(loadfile=str(search_csv)).search(query)
+
+    class TestOffsetIndex:
+        def test_load_row(self, mock_csv):
+            store = task_store.TaskStore(str(mock_csv), offset_index=True)
+            rows = store.load_from_csv()[1]
+            for row in rows:
+                assert store.load_row(int(row[0])) == row
+            assert store.load_row(len(rows) + 1) is None
+            assert (mock_csv.parent / (mock_csv.name + offset_index.OffsetIndex.SUFFIX)).exists()
+
+        def test_edits_in_place(self, mock_csv):
+            manager = task_manager.TaskManager(loadfile=str(mock_csv), offset_index=True)
+            size = mock_csv.stat().st_size
+            manager.toggle_completion(2)  # Same length, patched without moving the row
+            assert mock_csv.stat().st_size == size
+            manager.edit_task(3, "A longer name than before")
+            manager.delete_task(4)
+            manager.load_from_file()
+            added = manager.add_task("Added")
+
+            reloaded = task_manager.TaskManager(loadfile=str(mock_csv))
+            reloaded.load_from_file()
+            assert [task.to_list() for task in reloaded.get_tasks()] == [task.to_list() for task in manager.get_tasks()]
+            assert not reloaded.get_task(2).completed
+            assert reloaded.get_task(3).name == "A longer name than before"
+            assert reloaded.get_task(added.id).name == "Added"
+            with pytest.raises(exceptions.TaskIDError):
+                reloaded.get_task(4)
+
+        def test_stale_index_rebuilt(self, mock_csv):
+            store = task_store.TaskStore(str(mock_csv), offset_index=True)
+            store.load_row(1)
+            rows = store.load_from_csv()[1]
+            task_store.TaskStore(str(mock_csv)).edit_csv(1)  # Changes the store behind the index' back
+            assert store.load_row(1) is None
+            assert store.load_row(2) == rows[1]
+
+        def test_append_written_once(self, mock_csv, monkeypatch):
+            store = task_store.TaskStore(str(mock_csv), offset_index=True)
+            rows = store.load_from_csv()[1]
+            writes = []
+            monkeypatch.setattr(offset_index.OffsetIndex, "record_many",
+                                lambda index, entries, original=offset_index.OffsetIndex.record_many:
+                                writes.append(len(entries)) or original(index, entries))
+            added = [[str(task_id), f"Added {task_id}", "", "", "1", "2026-10-17 10:00:00.000000", "False"]
+                     for task_id in range(10, 15)]
+            store.append_to_csv(added)
+            assert writes == [len(added)]
+            for row in rows + added:
+                assert task_store.TaskStore(str(mock_csv), offset_index=True).load_row(int(row[0])) == row
+
+        def test_index_survives_copy(self, mock_csv, tmp_path):
+            store = task_store.TaskStore(str(mock_csv), offset_index=True)
+            store.edit_csv(2)  # Leaves a blank row behind, so the copy has different offsets
+            new_path = str(tmp_path / "moved.csv")
+            store.copy_csv(str(mock_csv), new_path)
+            index = offset_index.OffsetIndex(new_path)
+            assert index._read()
+            for row in task_store.TaskStore(new_path).load_from_csv()[1]:
+                assert task_store.TaskStore(new_path, offset_index=True).load_row(int(row[0])) == row
+
+    class TestConcurrency:
+        def test_conflicting_write(self, mock_csv):
+            first, second = task_store.TaskStore(str(mock_csv)), task_store.TaskStore(str(mock_csv))
+            first.load_from_csv()
+            second.load_from_csv()
+            second.edit_csv(3)
+            second.edit(4)
+            with pytest.raises(exceptions.StoreConflictException):
+                first.edit(5)
+            first.load_from_csv()
+            first.edit(5)
+            assert [row[0] for row in second.load_from_csv()[1]] == ['1', '2', '6']
+
+        def test_appends_not_checked(self, mock_csv):
+            first, second = task_store.TaskStore(str(mock_csv)), task_store.TaskStore(str(mock_csv))
+            first.load_from_csv()
+            second.edit(3)
+            task_id = str(first.allocate_id())
+            first.append([[task_id] + TestManager.TASK_LIST[0].to_list()[1:]])  # A new id cannot lose the other write
+            with pytest.raises(exceptions.StoreConflictException):  # The rows read by the first are still outdated
+                first.edit(4)
+            assert [row[0] for row in second.load_from_csv()[1]] == ['1', '2', '4', '5', '6', task_id]
+
+        def test_manager_redoes_write(self, mock_csv):
+            first = task_manager.TaskManager(loadfile=str(mock_csv))
+            second = task_manager.TaskManager(loadfile=str(mock_csv), offset_index=True)
+            first.load_from_file()
+            second.toggle_completion(3)
+            second.add_task("Added")
+            first.edit_task(3, name="Edited")  # Redone on the toggled task instead of overwriting it
+            first.add_task("Also added")
+            reloaded = task_manager.TaskManager(loadfile=str(mock_csv))
+            reloaded.load_from_file()
+            assert reloaded.get_task(3).name == "Edited" and reloaded.get_task(3).completed
+            assert [task.name for task in reloaded.get_tasks()][-2:] == ["Added", "Also added"]
+
+        def test_lock_timeout(self, mock_csv):
+            fcntl = pytest.importorskip("fcntl")
+            with open(store_lock.StoreLock.path(mock_csv), 'wb') as other:  # A lock held by another writer
+                fcntl.flock(other, fcntl.LOCK_EX)
+                with pytest.raises(exceptions.StoreLockException):
+                    task_store.TaskStore(str(mock_csv), lock_timeout=0.05).edit(1)
+            task_store.TaskStore(str(mock_csv), lock_timeout=0.05).edit(1)
+
+        @pytest.mark.parametrize("options", [{}, {"journaled": True}, {"offset_index": True}])
+        def test_reads_committed_generation(self, mock_csv, options):
+            fcntl = pytest.importorskip("fcntl")
+            store = task_store.TaskStore(str(mock_csv), **options)
+            store.edit(1)
+            committed = store.load_from_csv()[1]
+            with open(store_lock.StoreLock.path(mock_csv), 'rb+') as other:  # Another process is writing
+                fcntl.flock(other, fcntl.LOCK_EX)
+                with mock_csv.open("a", newline='') as file:
+                    file.write("7,Half writ")
+                with open(task_store.TaskStore.journal_path(mock_csv), "a", newline='') as file:
+                    file.write("D,2\n")
+                reader = task_store.TaskStore(str(mock_csv), lock_timeout=0.05, **options)
+                assert reader.load_from_csv()[1] == committed  # Neither waits for the lock nor sees the write
+                assert list(reader.iter_rows()) == committed
+                assert reader.load_row(3) == committed[1]
+
+        def test_patch_in_progress(self, mock_csv):
+            fcntl = pytest.importorskip("fcntl")
+            store = task_store.TaskStore(str(mock_csv), offset_index=True)
+            store.edit(1)
+            with open(store_lock.StoreLock.path(mock_csv), 'rb+') as other:
+                fcntl.flock(other, fcntl.LOCK_EX)
+                store_snapshot.StoreSnapshot.begin_patch(str(mock_csv))  # Rows may be torn until it is committed
+                with pytest.raises(exceptions.StoreLockException):
+                    task_store.TaskStore(str(mock_csv), lock_timeout=0.05).load_from_csv()
+            store_snapshot.StoreSnapshot.publish(str(mock_csv), task_store.TaskStore.journal_path(mock_csv), 2)
+            assert len(task_store.TaskStore(str(mock_csv), lock_timeout=0.05).load_from_csv()[1]) == 5
+
+        @pytest.mark.parametrize("options", [{}, {"journaled": True}, {"offset_index": True}])
+        def test_parallel_writers(self, mock_csv, options):
+            pytest.importorskip("fcntl")
+            context = multiprocessing.get_context("fork")
+            writers = [context.Process(target=_add_and_toggle, args=(str(mock_csv), options, 10)) for _ in range(4)]
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+            assert all(writer.exitcode == 0 for writer in writers)
+            manager = task_manager.TaskManager(loadfile=str(mock_csv))
+            manager.load_from_file()
+            tasks = manager.get_tasks()
+            assert len(tasks) == len(TestManager.TASK_LIST) + 40
+            assert len({task.id for task in tasks}) == len(tasks)
+            assert manager.get_task(1).completed  # Toggled an even number of times
+            assert not [name for name in os.listdir(mock_csv.parent) if name.endswith(".new")]  # No temp file left
+
+
+def _add_and_toggle(store_path, options, count):
+    manager = task_manager.TaskManager(loadfile=store_path, **options)
+    for number in range(count):
+        manager.load_from_file()
+        manager.add_task(f"Parallel {number}")
+        manager.toggle_completion(1)
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+
+import pytest
+
+from taskmn import task as TASK, task_manager, exceptions, task_store, task_transfer
+
+
+class TestTransfer:
+    TASK_LIST = [
+        TASK.Task.load_from_data("Name", "Description", "2064-03-03", 0, 1, "2011-01-26 21:21:47.813295", True),
+        TASK.Task.load_from_data("Name2", "Description2", None, 1, 2, "2015-01-26 21:21:47.813295", False),
+        TASK.Task.load_from_data("Name3", "Description3", "2016-03-03", 2, 5, "2004-01-26 21:21:47.813295", False),
+    ]
+
+    @pytest.fixture()
+    def mock_csv(self, tmp_path):
+        store_path = tmp_path / "todo.csv"
+        with store_path.open("w", newline='') as store:
+            writer = csv.writer(store)
+            writer.writerow(task_store.TaskStore.DEFAULT_CSV_HEADER)
+            writer.writerows([task.to_list() for task in self.TASK_LIST])
+        return store_path
+
+    @pytest.mark.parametrize("file_format", task_transfer.FORMATS)
+    def test_round_trip(self, mock_csv, tmp_path, file_format):
+        exported = io.StringIO()
+        assert task_transfer.export_tasks(task_store.TaskStore(str(mock_csv)), exported, file_format) == 3
+
+        copy_path = tmp_path / "copy.csv"
+        task_store.init_storage(copy_path)
+        exported.seek(0)
+        assert sum(task_transfer.import_tasks(task_store.TaskStore(str(copy_path)), exported, file_format)) == 3
+
+        manager = task_manager.TaskManager(loadfile=str(copy_path))
+        manager.load_from_file()
+        for task_id, task in enumerate(self.TASK_LIST, 1):  # Imported tasks get new ids
+            imported = manager.get_task(task_id)
+            assert imported.to_list()[1:] == task.to_list()[1:]
+
+    def test_epoch_store_csv(self, tmp_path):
+        epoch_path = str(tmp_path / "epoch.csv")
+        task_store.TaskStore(epoch_path, epoch_times=True).save_to_csv([task.to_list() for task in self.TASK_LIST])
+        exported = io.StringIO()
+        task_transfer.export_tasks(task_store.TaskStore(epoch_path, epoch_times=True), exported, "csv")
+        rows = list(csv.reader(io.StringIO(exported.getvalue())))[1:]
+        assert rows == [task.to_list() for task in self.TASK_LIST]  # Times as text, as in csv stores
+
+        copy_path = tmp_path / "copy.csv"
+        task_store.init_storage(copy_path)
+        exported.seek(0)
+        assert sum(task_transfer.import_tasks(task_store.TaskStore(str(copy_path)), exported, "csv")) == 3
+        manager = task_manager.TaskManager(loadfile=str(copy_path))
+        manager.load_from_file()
+        assert [task.to_list()[1:] for task in manager.get_tasks()] == [task.to_list()[1:] for task in self.TASK_LIST]
+
+    def test_json_records(self, mock_csv):
+        exported = io.StringIO()
+        task_transfer.export_tasks(task_store.TaskStore(str(mock_csv)), exported, "jsonl")
+        records = [json.loads(line) for line in exported.getvalue().splitlines()]
+        assert records[1] == {"id": 2, "name": "Name2", "description": "Description2", "deadline": None,
+                              "priority": 1, "created": "2015-01-26 21:21:47.813295", "completed": False}
+
+    def test_ids_after_highest(self, mock_csv):
+        records = io.StringIO('{"name": "New"}\n\n{"Name": "Newer", "completed": "yes", "deadline": "2030-01-01"}\n')
+        store = task_store.TaskStore(str(mock_csv))
+        assert list(task_transfer.import_tasks(store, records, "ndjson")) == [2]
+        rows = store.load_from_csv()[1]
+        assert [row[:2] for row in rows[-2:]] == [["6", "New"], ["7", "Newer"]]
+        assert rows[-1][3] == "2030-01-01 00:00:00" and rows[-1][6] == "1"
+
+    def test_deleted_ids_not_reused(self, mock_csv):
+        manager = task_manager.TaskManager(loadfile=str(mock_csv))
+        added = manager.add_task("Deleted")
+        manager.delete_task(added.id)
+        store = task_store.TaskStore(str(mock_csv))
+        assert list(task_transfer.import_tasks(store, io.StringIO('{"name": "New"}\n'), "jsonl")) == [1]
+        assert store.load_from_csv()[1][-1][:2] == [str(added.id + 1), "New"]
+
+    def test_tasks_added_while_importing(self, mock_csv):
+        store = task_store.TaskStore(str(mock_csv))
+        records = io.StringIO('{"name": "A"}\n{"name": "B"}\n{"name": "C"}\n')
+        chunks = task_transfer.import_tasks(store, records, "jsonl", chunk_size=2)
+        assert next(chunks) == 2
+        added = task_manager.TaskManager(loadfile=str(mock_csv)).add_task("Added meanwhile")
+        assert list(chunks) == [1]
+        rows = store.load_from_csv()[1]
+        assert [row[1] for row in rows[-4:]] == ["A", "B", "Added meanwhile", "C"]
+        assert len({row[0] for row in rows}) == len(rows) and int(rows[-1][0]) == added.id + 1
+
+    @pytest.mark.parametrize(
+        "records, line",
+        [
+            pytest.param("Name,Priority\nGood,1\n,1\n", 3),
+            pytest.param("Name,Priority\nGood,1\nBad,7\n", 3),
+            pytest.param("Name,Deadline\nBad,tomorrow\n", 2),
+        ],
+    )
+    def test_invalid_records(self, mock_csv, records, line):
+        store = task_store.TaskStore(str(mock_csv))
+        with pytest.raises(exceptions.TaskImportError) as error:
+            list(task_transfer.import_tasks(store, io.StringIO(records), "csv"))
+        assert error.value.line == line
+        assert len(store.load_from_csv()[1]) == len(self.TASK_LIST)  # The invalid chunk is not written
+
+    def test_chunks_written_before_error(self, mock_csv):
+        store = task_store.TaskStore(str(mock_csv))
+        records = io.StringIO('{"name": "A"}\n{"name": "B"}\n{"name": "C"}\n[]\n')
+        imported = []
+        with pytest.raises(exceptions.TaskImportError):
+            for count in task_transfer.import_tasks(store, records, "jsonl", chunk_size=2):
+                imported.append(count)
+        assert imported == [2]
+        assert len(store.load_from_csv()[1]) == len(self.TASK_LIST) + 2
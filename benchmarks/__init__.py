@@ -0,0 +1,11 @@
+"""
+Benchmarks of the task stores, the TaskManager and the command line against synthetic stores.
+
+Run them from the root of the repository, writing a json report:
+
+    python -m benchmarks --sizes 10000,100000,1000000 --output report.json
+
+and compare a later run with that report, which exits with 1 if a case got slower than the threshold allows:
+
+    python -m benchmarks --baseline report.json --output new_report.json
+"""
@@ -0,0 +1,96 @@
+import sys
+from pathlib import Path
+from typing import Optional
+
+import typer
+from rich import print
+from rich.markup import escape
+from rich.table import Table
+
+from benchmarks import cases as benchmark_cases
+from benchmarks.generate import DEFAULT_PRIORITIES
+from benchmarks.report import DEFAULT_THRESHOLD, compare, load_report, run_benchmarks, save_report
+
+"""
+Runs the benchmarks from the command line, "python -m benchmarks --help" lists the options
+"""
+app = typer.Typer(add_completion=False)
+
+
+def _numbers(value, convert):
+    return [convert(number) for number in value.split(",") if number.strip() != ""]
+
+
+@app.command()
+def main(
+        sizes: str = typer.Option("10000,100000", "--sizes", "-s", help="Comma separated numbers of tasks per store"),
+        repeat: int = typer.Option(5, "--repeat", "-r", min=1, help="Timed runs of each case"),
+        only: Optional[str] = typer.Option(None, "--cases", "-c",
+                                           help="Comma separated cases to run, all if not given. "
+                                                f"Cases: {', '.join(benchmark_cases.CASES)}"),
+        output: Path = typer.Option(Path("benchmark_report.json"), "--output", "-o", help="The json report to write"),
+        baseline: Optional[Path] = typer.Option(None, "--baseline", "-b", exists=True, dir_okay=False,
+                                                help="An earlier report to compare with"),
+        threshold: float = typer.Option(DEFAULT_THRESHOLD, "--threshold", "-t", min=0,
+                                        help="Slowdown against the baseline which counts as a regression, 0.2 = 20%"),
+        seed: int = typer.Option(0, "--seed", help="Seed of the synthetic stores"),
+        priorities: str = typer.Option(",".join(map(str, DEFAULT_PRIORITIES)), "--priorities",
+                                       help="Relative share of priority 0, 1 and 2 tasks"),
+        deadlines: float = typer.Option(0.6, "--deadlines", min=0, max=1, help="Share of tasks with a deadline"),
+        overdue: float = typer.Option(0.2, "--overdue", min=0, max=1, help="Share of deadlines already passed"),
+        completed: float = typer.Option(0.3, "--completed", min=0, max=1, help="Share of completed tasks")
+):
+    """
+    Times the task stores, the TaskManager and the command line against synthetic stores and writes a json report.
+    Exits with 1 if a case got slower than the baseline by more than the threshold
+    """
+    try:
+        size_list = _numbers(sizes, int)
+        weights = tuple(_numbers(priorities, float))
+    except ValueError:
+        print("[bold red]Sizes must be integers and priorities numbers[/bold red]")
+        raise typer.Exit(2)
+    if len(weights) != 3:
+        print("[bold red]Give the share of each of the 3 priorities[/bold red]")
+        raise typer.Exit(2)
+    selected = benchmark_cases.CASES
+    if only is not None:
+        unknown = [name for name in _numbers(only, str) if name not in benchmark_cases.CASES]
+        if unknown:
+            print(f"[bold red]Unknown cases: {', '.join(unknown)}[/bold red]")
+            raise typer.Exit(2)
+        selected = {name: benchmark_cases.CASES[name] for name in _numbers(only, str)}
+    previous = load_report(baseline) if baseline is not None else None
+
+    report = run_benchmarks(size_list, selected, repeat,
+                            {"seed": seed, "priorities": weights, "deadlines": deadlines, "overdue": overdue,
+                             "completed": completed},
+                            progress=lambda name, size: print(f"[dim]{escape(name)} @ {size}[/dim]", file=sys.stderr))
+    save_report(report, output)
+
+    table = Table("Case", "Tasks", "Min (s)", "Median (s)", title=f"Report written to {output}")
+    changes = {}
+    if previous is not None:
+        table.add_column("Baseline (s)")
+        table.add_column("Change")
+        changes = {(row["case"], row["size"]): row for row in compare(report, previous, threshold)}
+    for name, results in report["results"].items():
+        for size, summary in results.items():
+            cells = [escape(name), size, f"{summary['min']:.4f}", f"{summary['median']:.4f}"]
+            if previous is not None:
+                row = changes.get((name, int(size)))
+                if row is None:
+                    cells += ["", ""]
+                else:
+                    colour = "red" if row["regression"] else "green" if row["change"] < 0 else "default"
+                    cells += [f"{row['baseline']:.4f}", f"[{colour}]{row['change']:+.1%}[/{colour}]"]
+            table.add_row(*cells)
+    print(table)
+    regressions = [row for row in changes.values() if row["regression"]]
+    if regressions:
+        print(f"[bold red]{len(regressions)} regression(s) over {threshold:.0%}[/bold red]")
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,146 @@
+import datetime
+import os
+import subprocess
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+from taskmn.task_manager import SortType, TaskManager
+from taskmn.task_store import TaskStore
+
+"""
+This module contains the operations the benchmarks time. Each case prepares its operation on a fresh copy of a
+synthetic store, so only the operation itself is timed and every run starts from the same store
+
+Constants
+
+PACKAGE_ROOT : Path
+CASES : dict[str, Case]
+    Every case keyed by its name
+
+Classes
+
+Case(namedtuple)
+
+Functions
+
+cli_environment(Path, Path) -> dict[str, str]
+"""
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+Case = namedtuple("Case", ["name", "prepare"])
+Case.__doc__ = """
+A timed operation. prepare(Path, int) receives the store and its number of tasks, does any untimed setup and
+returns the operation to time as a callable without arguments
+"""
+
+
+def cli_environment(config_dir, store_path):
+    """
+    Returns the environment of a taskmn process using a config which points to a store
+    :param Path config_dir: An empty directory to keep the config in, used as the home directory
+    :param Path store_path: The store the config points to
+    :return dict[str, str]: The environment
+    """
+    config_dir = Path(config_dir)
+    app_dir = config_dir / "taskmn"
+    app_dir.mkdir(parents=True, exist_ok=True)
+    (app_dir / "config.ini").write_text(f"[General]\nStorage = {Path(store_path).absolute()}\n")
+    return dict(os.environ, HOME=str(config_dir), XDG_CONFIG_HOME=str(config_dir), APPDATA=str(config_dir),
+                PYTHONPATH=str(PACKAGE_ROOT))
+
+
+def _load_from_csv(path, count):
+    return TaskStore(str(path)).load_from_csv
+
+
+def _load_from_file(path, count):
+    return TaskManager(loadfile=path).load_from_file
+
+
+def _load_from_cache(path, count):
+    TaskManager(loadfile=path, parse_cache=True).load_from_file()  # Writes the cache the timed load reads
+    return TaskManager(loadfile=path, parse_cache=True).load_from_file
+
+
+def _get_tasks(sort):
+    def prepare(path, count):
+        manager = TaskManager(loadfile=path)
+        manager.load_from_file()
+        return lambda: manager.get_tasks(sort)
+    return prepare
+
+
+def _sorted_after_edit(path, count):
+    manager = TaskManager(loadfile=path, sorted_views=True)
+    manager.load_from_file(lazy=True)
+    manager.get_tasks(SortType.DEADLINE)
+    manager.edit_task(count // 2, deadline="2030-01-01")  # Moves the task in the view instead of sorting again
+    return lambda: manager.get_tasks(SortType.DEADLINE)
+
+
+def _filtered(path, count):
+    manager = TaskManager(loadfile=path)
+    manager.load_from_file(lazy=True)
+    return lambda: manager.get_tasks(SortType.DEADLINE, where="priority>=high and not completed and deadline<today")
+
+
+def _search(path, count):
+    manager = TaskManager(loadfile=path)
+    manager.search("task")  # Builds the index the timed searches read
+    return lambda: manager.search(f"synthetic {count // 2}", 20)
+
+
+def _edit_csv(path, count):
+    store = TaskStore(str(path))
+    task_id = count // 2
+    row = store.load_row(task_id)
+    row[1] = "Edited"
+    return lambda: store.edit_csv(task_id, [row])
+
+
+def _append_to_csv(path, count):
+    store = TaskStore(str(path))
+    row = [str(count + 1), "Appended", "None", "None", "1", "2024-01-01 00:00:00.000001", "0"]
+    return lambda: store.append_to_csv([row])
+
+
+def _delete_old_tasks(path, count):
+    manager = TaskManager(loadfile=path)
+    manager.load_from_file()
+    return manager.delete_old_tasks
+
+
+def _due(path, count):
+    manager = TaskManager(loadfile=path)
+    manager.load_from_file(lazy=True)
+    return lambda: manager.due(datetime.timedelta(days=3))
+
+
+def _cli(*arguments):
+    def prepare(path, count):
+        command = [sys.executable, "-m", "taskmn"] + [argument.format(middle=count // 2) for argument in arguments]
+        environment = cli_environment(Path(path).parent / "home", path)
+        return lambda: subprocess.run(command, env=environment, cwd=PACKAGE_ROOT, check=True,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return prepare
+
+
+CASES = {case.name: case for case in [
+    Case("load_from_csv", _load_from_csv),
+    Case("load_from_file", _load_from_file),
+    Case("load_from_cache", _load_from_cache),
+    *(Case(f"get_tasks[{sort.name.lower()}]", _get_tasks(sort)) for sort in SortType),
+    Case("get_tasks[priority,deadline,-created]", _get_tasks("priority,deadline,-created")),
+    Case("get_tasks[where]", _filtered),
+    Case("get_tasks[after_edit]", _sorted_after_edit),
+    Case("search", _search),
+    Case("edit_csv", _edit_csv),
+    Case("append_to_csv", _append_to_csv),
+    Case("delete_old_tasks", _delete_old_tasks),
+    Case("due", _due),
+    Case("cli_list", _cli("list")),
+    Case("cli_add", _cli("add", "Benchmark task")),
+    Case("cli_complete", _cli("complete", "{middle}")),
+    Case("cli_search", _cli("search", "synthetic", "{middle}")),
+]}
@@ -0,0 +1,62 @@
+import csv
+import datetime
+import random
+from pathlib import Path
+
+from taskmn.task_store import TaskStore
+
+"""
+This module generates synthetic task stores for the benchmarks. Stores are reproducible, the same seed and options
+always produce the same rows
+
+Constants
+
+DEFAULT_PRIORITIES : tuple[float, float, float]
+    The share of tasks with priority 0, 1 and 2
+
+Functions
+
+generate_rows(int, int, tuple[float, float, float], float, float, float) -> Iterator[list[str]]
+write_store(Path, int, int, tuple[float, float, float], float, float, float) -> Path
+"""
+DEFAULT_PRIORITIES = (0.25, 0.5, 0.25)
+_START = datetime.datetime(2020, 1, 1)
+_NOW = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def generate_rows(count, seed=0, priorities=DEFAULT_PRIORITIES, deadlines=0.6, overdue=0.2, completed=0.3):
+    """
+    Yields the rows of a synthetic store, in the form of Task.to_list()
+    :param int count: The number of tasks
+    :param int seed: The seed of the random generator
+    :param tuple[float, float, float] priorities: The relative share of tasks with priority 0, 1 and 2
+    :param float deadlines: The share of tasks which have a deadline
+    :param float overdue: The share of deadlines which have already passed
+    :param float completed: The share of completed tasks
+    :return Iterator[list[str]]: The rows, with ids 1 to count
+    """
+    generator = random.Random(seed)
+    created_span = (_NOW - _START).total_seconds()
+    for task_id in range(1, count + 1):
+        created = _START + datetime.timedelta(seconds=generator.uniform(0, created_span))
+        if generator.random() < deadlines:
+            days = generator.randint(-365, -1) if generator.random() < overdue else generator.randint(1, 3650)
+            deadline = str(_NOW + datetime.timedelta(days=days))
+        else:
+            deadline = "None"
+        priority = generator.choices((0, 1, 2), priorities)[0]
+        yield [str(task_id), f"Task {task_id}", f"Synthetic task number {task_id}", deadline, str(priority),
+               str(created), str(int(generator.random() < completed))]
+
+
+def write_store(path, count, seed=0, priorities=DEFAULT_PRIORITIES, deadlines=0.6, overdue=0.2, completed=0.3):
+    """
+    Writes a synthetic csv store, see generate_rows for the options
+    :param Path path: The store to write, overwritten if it exists
+    :return Path: The path of the store
+    """
+    with Path(path).open("w", newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(TaskStore.DEFAULT_CSV_HEADER)
+        writer.writerows(generate_rows(count, seed, priorities, deadlines, overdue, completed))
+    return Path(path)
@@ -0,0 +1,124 @@
+import datetime
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.generate import write_store
+from taskmn import __version__
+
+"""
+This module runs the benchmark cases and keeps their timings in a json report, which can be compared with the report
+of an earlier run
+
+Constants
+
+REPORT_FORMAT : int
+    The version of the report layout
+DEFAULT_THRESHOLD : float
+    The slowdown, as a fraction of the baseline, above which a case counts as a regression
+
+Functions
+
+run_benchmarks(list[int], dict[str, Case], int, dict, Callable) -> dict
+save_report(dict, Path)
+load_report(Path) -> dict
+compare(dict, dict, float) -> list[dict]
+"""
+REPORT_FORMAT = 1
+DEFAULT_THRESHOLD = 0.2
+
+
+def run_benchmarks(sizes, cases, repeat=5, store_options=None, progress=None):
+    """
+    Times every case against synthetic stores of every size
+    :param list[int] sizes: The numbers of tasks of the stores
+    :param dict[str, Case] cases: The cases to run, keyed by name
+    :param int repeat: The number of timed runs of each case
+    :param dict or None store_options: The keyword arguments of generate.write_store describing the stores
+    :param Callable[[str, int], None] or None progress: Called with the case and size before each case is run
+    :return dict: The report
+    """
+    store_options = dict(store_options or {})
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="taskmn-bench-") as directory:
+        directory = Path(directory)
+        for size in sizes:
+            base = write_store(directory / f"base-{size}.csv", size, **store_options)
+            for case in cases.values():
+                if progress is not None:
+                    progress(case.name, size)
+                results.setdefault(case.name, {})[str(size)] = _summary(_time_case(case, base, directory, size,
+                                                                                   repeat))
+    return {"format": REPORT_FORMAT, "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "taskmn": __version__, "python": platform.python_version(), "platform": platform.platform(),
+            "repeat": repeat, "sizes": list(sizes), "store": store_options, "results": results}
+
+
+def save_report(report, path):
+    """
+    Writes a report as json
+    :param dict report: The report made by run_benchmarks
+    :param Path path: The file to write
+    """
+    Path(path).write_text(json.dumps(report, indent=2) + "\n")
+
+
+def load_report(path):
+    """
+    Reads a report written by save_report
+    :param Path path: The file to read
+    :return dict: The report
+    :exception ValueError: The file is not a report of this format
+    """
+    report = json.loads(Path(path).read_text())
+    if not isinstance(report, dict) or report.get("format") != REPORT_FORMAT:
+        raise ValueError(f'"{path}" is not a benchmark report of format {REPORT_FORMAT}')
+    return report
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares the fastest run of every case and size found in both reports
+    :param dict report: The new report
+    :param dict baseline: The report to compare with
+    :param float threshold: The slowdown, as a fraction of the baseline time, which counts as a regression
+    :return list[dict]: One entry per case and size, with the case, size, baseline and current seconds, the change
+        as a fraction of the baseline and whether it is a regression
+    """
+    comparison = []
+    for name, sizes in report["results"].items():
+        for size, summary in sizes.items():
+            before = baseline["results"].get(name, {}).get(size)
+            if before is None:
+                continue
+            change = summary["min"] / before["min"] - 1 if before["min"] > 0 else 0.0
+            comparison.append({"case": name, "size": int(size), "baseline": before["min"], "current": summary["min"],
+                               "change": change, "regression": change > threshold})
+    return comparison
+
+
+def _time_case(case, base, directory, size, repeat):
+    """
+    Times the runs of a case, each on a fresh copy of the base store
+    :return list[float]: The seconds taken by each run
+    """
+    timings = []
+    for _ in range(repeat):
+        work = directory / "work"
+        shutil.rmtree(work, ignore_errors=True)
+        work.mkdir()
+        store = work / "tasks.csv"
+        shutil.copyfile(base, store)
+        operation = case.prepare(store, size)
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _summary(timings):
+    return {"min": min(timings), "median": statistics.median(timings), "max": max(timings), "runs": timings}
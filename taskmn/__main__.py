@@ -1,6 +1,7 @@
-from rich.traceback import install
+import os
+import sys
 
-from taskmn import __app_name__, task_manager_cli
+from taskmn import __app_name__
 
 """
 Entry point for Tasks Manager Cli
@@ -8,8 +9,29 @@ Entry point for Tasks Manager Cli
 
 
 def main():
+    sys.excepthook = _rich_excepthook
+    from taskmn import profiling
+    args = profiling.start_from(sys.argv[1:], os.environ)  # Started before the imports, so they are timed too
+    try:
+        with profiling.phase("import"):
+            from taskmn import fast_path
+        exit_code = fast_path.run(args)
+        if exit_code is not None:
+            sys.exit(exit_code)
+        with profiling.phase("import"):
+            from taskmn import task_manager_cli  # Importing typer costs more than most commands take to run
+        task_manager_cli.app(prog_name=__app_name__)
+    finally:
+        profiling.finish()
+
+
+def _rich_excepthook(exc_type, exc_value, traceback):
+    """
+    Shows uncaught exceptions with rich's traceback, only importing it once one happens
+    """
+    from rich.traceback import install
     install(show_locals=True)
-    task_manager_cli.app(prog_name=__app_name__)
+    sys.excepthook(exc_type, exc_value, traceback)
 
 
 if __name__ == "__main__":
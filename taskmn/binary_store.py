@@ -0,0 +1,473 @@
+import bisect
+import datetime
+import errno
+import heapq
+import itertools
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from taskmn.exceptions import StoreWriteException, StoreReadException, StoreLockException
+from taskmn.store_lock import StoreLock
+from taskmn.timestamps import EPOCH, NO_DEADLINE, from_microseconds, time_microseconds
+from taskmn.task_store import StoreBackend, _replacing
+
+"""
+This Module contains a StoreBackend which keeps Tasks in a compact binary file read through mmap.
+Dates are stored as integers and every field is kept in its own column, so single tasks and sorted lists are found
+by reading only the columns they need, without parsing the rest of the store
+
+Classes
+BinaryTaskStore
+"""
+
+
+class BinaryTaskStore(StoreBackend):
+    """
+    Class which manages the storage and loading of Tasks into a binary file.
+    Rows are exchanged in the same list[string] form as TaskStore.
+
+    The file holds a header, then a fixed width column for each of id, deadline, created, priority and completed, and
+    the offset and length of each name and description in a heap of utf-8 strings which follows the columns. Times are
+    microseconds since 1970-01-01, NO_DEADLINE marking tasks without a deadline. Writers hold the StoreLock of the
+    store and replace the file, so readers keep reading the file they mapped. Edited strings are appended to the heap,
+    which is compacted once more than half of it is unused
+
+    --------------
+
+    Static Properties
+
+    SORT_COLUMNS : dict[string, string]
+        Maps the names in TaskStore.DEFAULT_CSV_HEADER which load_sorted can order by to their columns
+
+    ---------------
+
+    Attributes
+
+    store_filename : str
+    lock_timeout : float or None
+        Seconds to wait for another process writing to the store, StoreLock.DEFAULT_TIMEOUT if None
+
+    ---------------
+
+    Methods
+
+    save(list[list[string]], string)
+
+    append(list[list[string]], string)
+
+    edit(int, list[list[string]], string)
+
+    edit_many(dict[int, list[string] || None], string)
+
+    load(string) -> (int, list[list[string]])
+
+    allocate_id(string, int) -> int
+
+    iter_rows(string) -> Iterator[list[string]]
+
+    load_row(int, string) -> list[string] || None
+
+    load_sorted(string, bool, string, int, int) -> list[list[string]] || None
+    """
+    indexed = True
+    SORT_COLUMNS = {'ID': 'ids', 'Deadline': 'deadlines', 'Created': 'created', 'Priority': 'priorities',
+                    'Completed': 'completed'}
+
+    def __init__(self, filename: str, lock_timeout=None):
+        super().__init__(filename)
+        self.lock_timeout = lock_timeout
+
+    def save(self, data, filename=None):
+        filename = self._filename(filename)
+        table = _Table()
+        for row in data:
+            table.append(row)
+        self._write(filename, table)
+
+    def append(self, data, filename=None):
+        def append(table):
+            for row in data:
+                table.append(row)
+
+        self._rewrite(self._existing_filename(filename), append)
+
+    def edit(self, task_id, data=None, filename=None):
+        self.edit_many({task_id: None if data is None else data[0]}, filename)
+
+    def edit_many(self, changes, filename=None):
+        def edit(table):
+            positions = table.positions(changes)
+            for task_id, position in positions.items():
+                if changes[task_id] is not None:
+                    table.replace(position, changes[task_id])
+            table.delete([position for task_id, position in positions.items() if changes[task_id] is None])
+
+        filename = self._existing_filename(filename)
+        if changes:
+            self._rewrite(filename, edit)
+
+    def load(self, filename=None):
+        with _Mapping(self._existing_filename(filename)) as mapping:
+            return max(mapping.column('ids'), default=0), mapping.rows(range(mapping.count))
+
+    def iter_rows(self, filename=None):
+        with _Mapping(self._existing_filename(filename)) as mapping:
+            for start in range(0, mapping.count, _ROWS_PER_READ):  # Rows are decoded a batch at a time
+                yield from mapping.rows(range(start, min(start + _ROWS_PER_READ, mapping.count)))
+
+    def allocate_id(self, filename=None, count=1):
+        """
+        Returns the first of count ids after the highest id allocated or stored, which the header of the store keeps.
+        Only the header is read and written
+        """
+        filename = self._existing_filename(filename)
+        try:
+            with StoreLock(filename, self.lock_timeout), open(filename, 'r+b') as file:
+                header = _Header.read(file.read(_Header.FORMAT.size), filename)
+                header.last_id += count
+                file.seek(0)
+                file.write(header.pack())  # Reserve the ids, so they are not handed out twice before they are appended
+        except (StoreReadException, StoreLockException):
+            raise
+        except OSError:
+            raise StoreWriteException(Path(filename))
+        return header.last_id - count + 1
+
+    def load_row(self, task_id, filename=None):
+        with _Mapping(self._existing_filename(filename)) as mapping:
+            position = mapping.position(int(task_id))
+            return None if position is None else mapping.rows([position])[0]
+
+    def load_sorted(self, column, reverse=False, filename=None, limit=None, offset=0):
+        """
+        Loads rows ordered by a column, reading only the column and the ids until the page is known.
+        Missing deadlines sort first, as in TaskManager
+        :param string column: The name of the column in TaskStore.DEFAULT_CSV_HEADER to order by
+        :param bool reverse: Order from largest to smallest, ties are still ordered by increasing id
+        :param string filename: The store to load from
+        :param int or None limit: (optional) The most rows to return
+        :param int offset: (optional) The number of ordered rows to skip
+        :return list[list[string]] or None: The ordered rows, None for columns which are not kept as integers
+        """
+        if column not in BinaryTaskStore.SORT_COLUMNS:
+            return None
+        with _Mapping(self._existing_filename(filename)) as mapping:
+            ids = mapping.column('ids')
+            values = mapping.column(BinaryTaskStore.SORT_COLUMNS[column])
+            if reverse:
+                values = map(int.__neg__, values)
+            keys = zip(values, ids, range(mapping.count))  # Compared as tuples in C, ties ordered by id
+            if limit is None:
+                page = sorted(keys)[offset:]
+            else:
+                page = heapq.nsmallest(offset + limit, keys)[offset:]
+            return mapping.rows([position for _, _, position in page])
+
+    def _write(self, filename, table):
+        """
+        Replaces the store with a table under its StoreLock
+        """
+        try:
+            with StoreLock(filename, self.lock_timeout), _replacing(filename, 'wb') as file:
+                table.write(file)
+        except (StoreReadException, StoreLockException):
+            raise
+        except OSError:
+            raise StoreWriteException(Path(filename))
+
+    def _rewrite(self, filename, change):
+        """
+        Reads the table of the store, changes it and replaces the store with it, holding the StoreLock throughout
+        :param string filename: The existing store
+        :param Callable[[_Table], None] change: Changes the table
+        """
+        try:
+            with StoreLock(filename, self.lock_timeout):
+                with open(filename, 'rb') as file:
+                    table = _Table.read(file.read(), filename)
+                change(table)
+                with _replacing(filename, 'wb') as file:
+                    table.write(file)
+        except (StoreReadException, StoreLockException):
+            raise
+        except OSError:
+            raise StoreWriteException(Path(filename))
+
+    def _filename(self, filename):
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        return str(filename)
+
+    def _existing_filename(self, filename):
+        filename = self._filename(filename)
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        return filename
+
+
+_ROWS_PER_READ = 4096
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+_DIGITS = ('0', '1', '2')
+_MICROSECOND = datetime.timedelta(microseconds=1)
+# The columns in file order, widest first so every column is aligned
+_COLUMNS = (('ids', 'q'), ('deadlines', 'q'), ('created', 'q'), ('name_offsets', 'q'), ('description_offsets', 'q'),
+            ('name_lengths', 'i'), ('description_lengths', 'i'), ('priorities', 'b'), ('completed', 'b'))
+
+
+class _Header:
+    """
+    The header of a binary store
+    """
+    FORMAT = struct.Struct('<4sIqqqqq16x')  # magic, format, rows, highest id allocated, heap size, unused heap, flags
+    MAGIC = b'TMB1'
+    VERSION = 1
+    IDS_ASCENDING = 1  # Flag set when the ids are in increasing order, so ids are found with a binary search
+
+    def __init__(self, count=0, last_id=0, heap_size=0, unused=0, flags=0):
+        self.count = count
+        self.last_id = last_id
+        self.heap_size = heap_size
+        self.unused = unused
+        self.flags = flags
+
+    @classmethod
+    def read(cls, data, filename):
+        if len(data) < cls.FORMAT.size:
+            raise StoreReadException(Path(filename))
+        magic, version, *fields = cls.FORMAT.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise StoreReadException(Path(filename))
+        return cls(*fields)
+
+    def pack(self):
+        return self.FORMAT.pack(self.MAGIC, self.VERSION, self.count, self.last_id, self.heap_size, self.unused,
+                                self.flags)
+
+    def layout(self):
+        """
+        Returns where each column and the heap start in the file
+        :return (dict[str, (int, int)], int): The start and end of each column, and the start of the heap
+        """
+        sections, position = {}, self.FORMAT.size
+        for name, typecode in _COLUMNS:
+            end = position + self.count * array(typecode).itemsize
+            sections[name] = position, end
+            position = end
+        return sections, position
+
+
+class _Mapping:
+    """
+    A binary store mapped into memory for reading. The columns are memoryviews of the mapping, read without copying
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.__views = []
+        with open(filename, 'rb') as file:
+            try:
+                self.__map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty files can not be mapped
+                raise StoreReadException(Path(filename))
+        try:
+            self.header = _Header.read(self.__map, filename)
+            self.__sections, heap_start = self.header.layout()
+            if heap_start + self.header.heap_size > len(self.__map):
+                raise StoreReadException(Path(filename))
+            self.heap = self.__view(heap_start, heap_start + self.header.heap_size, 'B')
+        except BaseException:
+            self.close()
+            raise
+        self.count = self.header.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def column(self, name):
+        """
+        Returns a column
+        :param str name: The name of the column in _COLUMNS
+        :return Sequence[int]: The values of the column
+        """
+        start, end = self.__sections[name]
+        return self.__view(start, end, dict(_COLUMNS)[name])
+
+    def position(self, task_id):
+        """
+        Returns the position of a task
+        :param int task_id: The id of the task
+        :return int or None: The position, None if no task has the id
+        """
+        ids = self.column('ids')
+        if self.header.flags & _Header.IDS_ASCENDING:
+            position = bisect.bisect_left(ids, task_id)
+            return position if position < self.count and ids[position] == task_id else None
+        return next((position for position, value in enumerate(ids) if value == task_id), None)
+
+    def rows(self, positions):
+        """
+        Decodes the rows at some positions. Each field is converted for all the rows at once, by builtins
+        :param Iterable[int] positions: The positions of the rows
+        :return list[list[string]]: The rows in the form of Task.to_list()
+        """
+        columns = [self.column(name) for name, _ in _COLUMNS]
+        if isinstance(positions, range) and positions.step == 1:  # A run of rows, convert the columns at once
+            columns = [column[positions.start:positions.stop].tolist() for column in columns]
+        else:
+            columns = [list(map(column.__getitem__, positions)) for column in columns]
+        ids, deadlines, created, name_offsets, description_offsets, name_lengths, description_lengths, priorities, \
+            completed = columns
+        heap = self.heap.tobytes() if len(ids) > _ROWS_PER_READ else self.heap  # Copied when most of it is read
+        deadline_texts = {deadline: 'None' if deadline == NO_DEADLINE else _format_time(deadline)
+                          for deadline in set(deadlines)}  # Tasks share few deadlines
+        return list(map(list, zip(map(str, ids), _strings(heap, name_offsets, name_lengths),
+                                  _strings(heap, description_offsets, description_lengths),
+                                  map(deadline_texts.__getitem__, deadlines), map(_DIGITS.__getitem__, priorities),
+                                  _format_times(created), map(_DIGITS.__getitem__, completed))))
+
+    def close(self):
+        for view in self.__views:
+            view.release()  # The mapping can only be closed once no view of it is left
+        self.__views.clear()
+        self.__map.close()
+
+    def __view(self, start, end, typecode):
+        view = memoryview(self.__map)
+        self.__views.append(view)
+        view = view[start:end]
+        self.__views.append(view)
+        if not _LITTLE_ENDIAN and typecode != 'B':
+            values = array(typecode, view)
+            values.byteswap()
+            return values
+        view = view.cast(typecode)
+        self.__views.append(view)
+        return view
+
+
+class _Table:
+    """
+    The columns and heap of a binary store as arrays, for writers to change and write back
+    """
+
+    def __init__(self, header=None):
+        self.header = _Header() if header is None else header
+        self.columns = {name: array(typecode) for name, typecode in _COLUMNS}
+        self.heap = bytearray()
+
+    @classmethod
+    def read(cls, data, filename):
+        table = cls(_Header.read(data, filename))
+        sections, heap_start = table.header.layout()
+        if heap_start + table.header.heap_size > len(data):
+            raise StoreReadException(Path(filename))
+        for name, typecode in _COLUMNS:
+            table.columns[name].frombytes(data[sections[name][0]:sections[name][1]])
+            if not _LITTLE_ENDIAN:
+                table.columns[name].byteswap()
+        table.heap[:] = data[heap_start:heap_start + table.header.heap_size]
+        return table
+
+    def positions(self, task_ids):
+        """
+        Returns the positions of the tasks which exist among some ids
+        :param Iterable[int] task_ids: The ids
+        :return dict[int, int]: The position of each id found
+        """
+        wanted = {int(task_id): task_id for task_id in task_ids}
+        return {wanted[task_id]: position for position, task_id in enumerate(self.columns['ids']) if task_id in wanted}
+
+    def append(self, row):
+        for name, value in self.__values(row).items():
+            self.columns[name].append(value)
+        self.header.last_id = max(self.header.last_id, int(row[0]))
+
+    def replace(self, position, row):
+        columns = self.columns
+        self.header.unused += columns['name_lengths'][position] + columns['description_lengths'][position]
+        for name, value in self.__values(row).items():
+            columns[name][position] = value
+        self.header.last_id = max(self.header.last_id, int(row[0]))
+
+    def delete(self, positions):
+        if not positions:
+            return
+        keep = [True] * len(self.columns['ids'])
+        for position in positions:
+            keep[position] = False
+            self.header.unused += self.columns['name_lengths'][position] + \
+                self.columns['description_lengths'][position]
+        for name, typecode in _COLUMNS:
+            self.columns[name] = array(typecode, itertools.compress(self.columns[name], keep))
+
+    def write(self, file):
+        """
+        Writes the table in the binary store format, compacting the heap first if most of it is unused
+        :param BinaryIO file: The file to write to
+        """
+        if self.header.unused * 2 > len(self.heap):
+            self.__compact()
+        ids = self.columns['ids']
+        self.header.count = len(ids)
+        self.header.heap_size = len(self.heap)
+        self.header.flags = _Header.IDS_ASCENDING if ids.tolist() == sorted(ids) else 0
+        file.write(self.header.pack())
+        for name, _ in _COLUMNS:
+            column = self.columns[name]
+            if not _LITTLE_ENDIAN:
+                column = array(column.typecode, column)
+                column.byteswap()
+            file.write(column.tobytes())
+        file.write(self.heap)
+
+    def __values(self, row):
+        """
+        Converts a row in the form of Task.to_list() to the values of its columns, adding its strings to the heap
+        """
+        name, description = row[1].encode('utf-8'), row[2].encode('utf-8')
+        values = {'ids': int(row[0]), 'name_offsets': len(self.heap), 'name_lengths': len(name),
+                  'description_offsets': len(self.heap) + len(name), 'description_lengths': len(description),
+                  'deadlines': NO_DEADLINE if row[3] == 'None' else time_microseconds(row[3]),
+                  'priorities': int(row[4]), 'created': time_microseconds(row[5]), 'completed': int(row[6])}
+        self.heap += name
+        self.heap += description
+        return values
+
+    def __compact(self):
+        heap, self.heap = self.heap, bytearray()
+        columns = self.columns
+        for offsets, lengths in ('name_offsets', 'name_lengths'), ('description_offsets', 'description_lengths'):
+            for position, (offset, length) in enumerate(zip(columns[offsets], columns[lengths])):
+                columns[offsets][position] = len(self.heap)
+                self.heap += heap[offset:offset + length]
+        self.header.unused = 0
+
+
+def _format_time(microseconds):
+    """
+    Formats microseconds since 1970-01-01 as str() formats the datetime
+    """
+    return str(from_microseconds(microseconds))
+
+
+def _format_times(microseconds):
+    """
+    Formats many times as _format_time does, without calling a Python function for each
+    """
+    return map(str, map(EPOCH.__add__, map(_MICROSECOND.__mul__, microseconds)))
+
+
+def _strings(heap, offsets, lengths):
+    """
+    Decodes strings of the heap
+    :return Iterator[str]: The string at each offset and length
+    """
+    return map(str, map(heap.__getitem__, map(slice, offsets, map(int.__add__, offsets, lengths))),
+               itertools.repeat('utf-8'))
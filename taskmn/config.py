@@ -1,10 +1,9 @@
 ﻿import configparser
 import errno
 import os
+import sys
 from pathlib import Path
 
-import typer
-
 from taskmn import __app_name__
 from taskmn.exceptions import ConfigDirectoryError, ConfigFileError
 
@@ -22,9 +21,27 @@ init_app(Path)
 _init_config_file()
 _create_store(Path)
 def modify_config_file(Path):
+def set_store_option(str, bool):
 
 """
-CONFIG_DIR_PATH = Path(typer.get_app_dir(__app_name__))
+
+
+def _get_app_dir(app_name):
+    """
+    Returns the configuration directory of an app, the same as typer.get_app_dir(app_name).
+    Kept here so reading the config does not import typer
+    :param str app_name: The name of the app
+    :return str: The path of the directory
+    """
+    if sys.platform.startswith("win"):
+        return os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), app_name)
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~/Library/Application Support"), app_name)
+    return os.path.join(os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config")),
+                        "-".join(app_name.split()).lower())
+
+
+CONFIG_DIR_PATH = Path(_get_app_dir(__app_name__))
 CONFIG_FILE_PATH = CONFIG_DIR_PATH / "config.ini"
 
 
@@ -93,7 +110,8 @@ def modify_config_file(store_path):
         config_parser.read(CONFIG_FILE_PATH)
         xstore = config_parser["General"]["Storage"]
 
-        config_parser["General"] = {"Storage": store_path, "XStorage": xstore}
+        config_parser["General"]["Storage"] = store_path
+        config_parser["General"]["XStorage"] = xstore
         try:
             with CONFIG_FILE_PATH.open("w") as config_file:
                 config_parser.write(config_file)
@@ -101,3 +119,24 @@ def modify_config_file(store_path):
             exp = ConfigFileError(CONFIG_FILE_PATH)
             exp.message = f'Writing to config file at "{exp.path}" has failed'
             raise exp
+
+
+def set_store_option(option, enabled):
+    """
+    Turns an option the store is opened with on or off, or sets its value
+    :param str option: The name of the option, "Journal", "Index", "EpochTimes", "ParseCache" or "LockTimeout"
+    :param bool or float enabled: The new value of the option
+    :raises ConfigFileError: Error writing to the configuration file
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(CONFIG_FILE_PATH)
+    if not config_parser.has_section("General"):
+        raise ConfigFileError(CONFIG_FILE_PATH)
+    config_parser["General"][option] = ("yes" if enabled else "no") if isinstance(enabled, bool) else str(enabled)
+    try:
+        with CONFIG_FILE_PATH.open("w") as config_file:
+            config_parser.write(config_file)
+    except OSError:
+        exp = ConfigFileError(CONFIG_FILE_PATH)
+        exp.message = f'Writing to config file at "{exp.path}" has failed'
+        raise exp
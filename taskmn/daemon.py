@@ -0,0 +1,130 @@
+import datetime
+import json
+import os
+import socket
+import socketserver
+
+from taskmn.task_manager import TaskManager, SortType
+from taskmn.task_store import TaskStore
+
+"""
+This module contains the taskmn daemon, which keeps a TaskManager loaded in memory and answers requests from
+RemoteTaskManager over a unix socket. Requests and responses are single lines of json
+
+Classes
+
+TaskDaemon
+"""
+
+
+class TaskDaemon(socketserver.UnixStreamServer):
+    """
+    A unix socket server holding a warm TaskManager. Requests are handled one at a time, so the manager is never
+    used by two clients at once. Before each request the store is checked for changes made by other processes,
+    reloading it if needed. The manager keeps the sorted views of the lists it was asked for
+
+    Properties:
+        manager : TaskManager The manager requests are applied to
+        store_path : str The path of the served store
+
+    Methods:
+
+        serve() -> None
+    """
+    METHODS = {"get_task", "get_tasks", "iter_tasks", "add_task", "edit_task", "delete_task", "toggle_completion",
+               "edit_tasks", "delete_tasks", "toggle_completions", "delete_old_tasks", "delete_completed_tasks",
+               "clear_tasks", "search", "due"}
+
+    def __init__(self, socket_path, store_path, **store_options):
+        """
+        :param Path or str socket_path: The socket to listen on
+        :param Path or str store_path: The store to serve
+        :param store_options: The options the store is opened with, see task_store.open_store
+        :exception OSError: The socket is in use by a running daemon, or could not be created
+        """
+        socket_path = str(socket_path)
+        if os.path.exists(socket_path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                if probe.connect_ex(socket_path) == 0:
+                    raise OSError(f"A daemon is already listening on {socket_path}")
+            os.remove(socket_path)  # Left behind by a daemon which did not shut down cleanly
+        self.store_path = str(store_path)
+        self.manager = TaskManager(loadfile=store_path, sorted_views=True, **store_options)
+        self.manager.load_from_file(lazy=True)
+        self.__stamp = self.__store_stamp()
+        self.__stopping = False
+        super().__init__(socket_path, _RequestHandler)
+
+    def serve(self):
+        """
+        Handles requests until a shutdown request is received, then removes the socket
+        """
+        try:
+            while not self.__stopping:
+                self.handle_request()
+        finally:
+            self.server_close()
+            if os.path.exists(self.server_address):
+                os.remove(self.server_address)
+
+    def dispatch(self, request):
+        """
+        Applies a request to the manager
+        :param dict request: The method to call and its arguments
+        :return dict: The result of the call, or the error it raised
+        """
+        method, args = request.get("method"), request.get("args", [])
+        try:
+            if method == "ping":
+                return {"result": {"store": self.store_path, "pid": os.getpid()}}
+            if method == "shutdown":
+                self.__stopping = True
+                return {"result": None}
+            if method not in TaskDaemon.METHODS:
+                raise ValueError(f'"{method}" is not a method of the daemon')
+            if self.__store_stamp() != self.__stamp:  # Changed by another process
+                self.manager.load_from_file(lazy=True)
+            if method in ("get_tasks", "iter_tasks"):
+                args = [args[0] if isinstance(args[0], str) else SortType(args[0])] + list(args[1:])  # Or a spec
+            if method == "due" and args and args[0] is not None:
+                args = [datetime.timedelta(seconds=args[0])] + list(args[1:])
+            result = getattr(self.manager, method)(*args)
+            if method == "iter_tasks":
+                result = list(result)
+            self.__stamp = self.__store_stamp()
+        except Exception as e:
+            error = {"type": type(e).__name__, "message": str(e), "attempted": getattr(e, "attempted", None)}
+            for name in ("path", "path_2", "timeout"):  # What the store exceptions are recreated from
+                if getattr(e, name, None) is not None:
+                    error[name] = e.timeout if name == "timeout" else str(getattr(e, name))
+            return {"error": error}
+        if isinstance(result, list):
+            return {"result": [task.to_list() for task in result]}
+        return {"result": None if result is None else result.to_list()}
+
+    def __store_stamp(self):
+        """
+        Returns the modification times and sizes of the store and its journal
+        """
+        stamp = []
+        for path in self.store_path, TaskStore.journal_path(self.store_path):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the single request sent on a connection
+    """
+    timeout = 5  # Don't let a stalled client block the daemon
+
+    def handle(self):
+        try:
+            response = self.server.dispatch(json.loads(self.rfile.readline()))
+        except ValueError:
+            response = {"error": {"type": "ValueError", "message": "Malformed request", "attempted": None}}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
@@ -0,0 +1,208 @@
+import json
+import os
+import socket
+from pathlib import Path
+
+from taskmn import config, exceptions
+from taskmn.task_manager import TaskManager
+
+"""
+This module contains the client side of the taskmn daemon. RemoteTaskManager offers the methods of TaskManager used by
+the cli, forwarding each call to a running "taskmn serve" over its unix socket
+
+Constants
+
+SOCKET_PATH : Path
+    Can be changed with the TASKMN_SOCKET environment variable
+
+Classes
+
+RemoteTaskManager
+
+Functions
+
+connect(Path, Path) -> RemoteTaskManager || None
+"""
+SOCKET_PATH = Path(os.environ.get("TASKMN_SOCKET", config.CONFIG_DIR_PATH / "taskmn.sock"))
+
+
+def connect(socket_path=SOCKET_PATH, store_path=None):
+    """
+    Connects to a running daemon
+    :param Path or str socket_path: The socket the daemon listens on
+    :param Path or str store_path: (optional) Only connect if the daemon serves this store
+    :return RemoteTaskManager or None: A manager using the daemon, None if no daemon is running for the store
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    manager = RemoteTaskManager(socket_path)
+    try:
+        served = manager.ping()["store"]
+    except OSError:  # Stale socket file left by a daemon which did not shut down cleanly
+        return None
+    if store_path is not None and os.path.abspath(served) != os.path.abspath(store_path):
+        return None
+    return manager
+
+
+class RemoteTaskManager:
+    """
+    A TaskManager stand in which forwards calls to the daemon. Each call uses a new connection, so a client waiting
+    on a confirmation prompt does not hold up other clients
+
+    Properties:
+        socket_path : str The socket the daemon listens on
+        indexed : bool Always True, the daemon answers single task queries without a load
+        loadfile : str The store served by the daemon
+
+    Methods:
+
+        ping() -> dict
+        shutdown() -> None
+        load_from_file(str, bool) -> None
+        get_task(int) -> Task
+        get_tasks(SortType || str || SortSpec, bool, str || TaskFilter) -> list
+        iter_tasks(SortType || str || SortSpec, bool, int, int, str || TaskFilter) -> Iterator[Task]
+        search(str, int) -> list[Task]
+        due(timedelta, int, bool) -> list[Task]
+        add_task(str, str, str, int) -> Task
+        edit_task(int, str, str, str, int) -> Task
+        delete_task(int) -> None
+        toggle_completion(int) -> Task
+        edit_tasks(list[int], str, str, str, int) -> list[Task]
+        delete_tasks(list[int]) -> None
+        toggle_completions(list[int]) -> list[Task]
+        delete_old_tasks() -> None
+        delete_completed_tasks() -> None
+        clear_tasks() -> None
+    """
+    indexed = True
+
+    def __init__(self, socket_path=SOCKET_PATH):
+        self.socket_path = str(socket_path)
+
+    @property
+    def loadfile(self):
+        return self.ping()["store"]
+
+    def ping(self):
+        """
+        Checks the daemon is alive
+        :return dict: The store served and the process id of the daemon
+        """
+        return self._call("ping")
+
+    def shutdown(self):
+        """
+        Stops the daemon once the current request is answered
+        """
+        self._call("shutdown")
+
+    def load_from_file(self, filename=None, lazy=False):
+        """
+        Does nothing, the daemon keeps its store loaded and reloads it when it changes
+        """
+        return
+
+    def get_task(self, task_id):
+        return self._to_task(self._call("get_task", task_id))
+
+    def get_tasks(self, sort=0, reverse=False, where=None):
+        return [self._to_task(row) for row in self._call("get_tasks", _sort_argument(sort), reverse,
+                                                          getattr(where, "expression", where))]
+
+    def iter_tasks(self, sort=0, reverse=False, offset=0, limit=None, where=None):
+        rows = self._call("iter_tasks", _sort_argument(sort), reverse, offset, limit,
+                          getattr(where, "expression", where))
+        return (self._to_task(row) for row in rows)
+
+    def search(self, query, limit=None):
+        return [self._to_task(row) for row in self._call("search", query, limit)]
+
+    def due(self, within=None, limit=None, overdue=False):
+        return [self._to_task(row) for row in self._call("due", None if within is None else within.total_seconds(),
+                                                          limit, overdue)]
+
+    def add_task(self, name, description=None, deadline=None, priority=None):
+        return self._to_task(self._call("add_task", name, description, deadline, priority))
+
+    def edit_task(self, task_id, name=None, description=None, deadline=None, priority=None):
+        return self._to_task(self._call("edit_task", task_id, name, description, deadline, priority))
+
+    def delete_task(self, task_id):
+        self._call("delete_task", task_id)
+
+    def toggle_completion(self, task_id):
+        return self._to_task(self._call("toggle_completion", task_id))
+
+    def edit_tasks(self, task_ids, name=None, description=None, deadline=None, priority=None):
+        return [self._to_task(row) for row in
+                self._call("edit_tasks", list(task_ids), name, description, deadline, priority)]
+
+    def delete_tasks(self, task_ids):
+        self._call("delete_tasks", list(task_ids))
+
+    def toggle_completions(self, task_ids):
+        return [self._to_task(row) for row in self._call("toggle_completions", list(task_ids))]
+
+    def delete_old_tasks(self):
+        self._call("delete_old_tasks")
+
+    def delete_completed_tasks(self):
+        self._call("delete_completed_tasks")
+
+    def clear_tasks(self):
+        self._call("clear_tasks")
+
+    def _call(self, method, *args):
+        """
+        Sends a request to the daemon and waits for its response
+        :param str method: The name of the TaskManager method to call
+        :param args: The arguments of the method, which must be serializable to json
+        :return: The result of the method
+        :exception OSError: The daemon could not be reached
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.socket_path)
+            client.sendall(json.dumps({"method": method, "args": args}).encode() + b"\n")
+            with client.makefile("rb") as reader:
+                line = reader.readline()
+        if not line:
+            raise ConnectionError(f"The daemon at {self.socket_path} closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise self._to_exception(response["error"])
+        return response["result"]
+
+    @staticmethod
+    def _to_task(row):
+        return TaskManager._task_from_row(row)
+
+    @staticmethod
+    def _to_exception(error):
+        """
+        Recreates an exception raised in the daemon
+        :param dict error: The type, message and attempted value of the exception, and the paths and timeout of
+            store exceptions
+        :return Exception: The exception to raise
+        """
+        if error["type"] in ("TaskNameError", "DateException"):
+            return getattr(exceptions, error["type"])(error["attempted"])
+        if error["type"] in ("FilterError", "SearchError", "SortError"):
+            return getattr(exceptions, error["type"])(error["attempted"], error["message"].partition(" failed. ")[2])
+        if error["type"] == "TaskIDError":
+            return exceptions.TaskIDError(error["message"], error["attempted"])
+        if error["type"] in ("StoreWriteException", "StoreReadException", "StoreConflictException") and "path" in error:
+            return getattr(exceptions, error["type"])(Path(error["path"]))
+        if error["type"] == "StoreLockException" and "path" in error and "timeout" in error:
+            return exceptions.StoreLockException(Path(error["path"]), error["timeout"])
+        if error["type"] == "StoreCopyException" and "path" in error and "path_2" in error:
+            return exceptions.StoreCopyException(Path(error["path"]), Path(error["path_2"]))
+        return exceptions.DaemonError(error["message"])
+
+
+def _sort_argument(sort):
+    """
+    Returns a sort in the form sent to the daemon, the value of a SortType or the text of a sort spec
+    """
+    return getattr(sort, "spec", getattr(sort, "value", sort))
@@ -17,8 +17,22 @@ This module contains all user defined exceptions used in Tasks Manager
 
         StoreCopyException
 
+        StoreLockException
+
+        StoreConflictException
+
         TaskIDError
 
+        DaemonError
+
+        TaskImportError
+
+        FilterError
+
+        SearchError
+
+        SortError
+
 """
 
 
@@ -124,10 +138,99 @@ class StoreCopyException(StoreException):
     pass
 
 
+class StoreLockException(StoreException):
+    """
+    Another process held the lock of a task store for too long
+    """
+    def __init__(self, path, timeout):
+        super().__init__(path)
+        self.timeout = timeout
+        self.message = f'Waiting {timeout:g}s for the lock on the store at "{self.path}" has timed out.'
+
+    def __str__(self):
+        return self.message
+
+
+class StoreConflictException(StoreException):
+    """
+    The task store was written by another process after the data being written was read from it
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        self.message = f'The store at "{self.path}" was changed by another process, reload it and try again.'
+
+    def __str__(self):
+        return self.message
+
+
 class TaskIDError(ValueError):
     """
     An invalid task id was inputted
     """
+    def __init__(self, message, attempted=None):
+        self.attempted = attempted  # The ids which do not exist, if known
+        super().__init__(message)
+
+
+class DaemonError(RuntimeError):
+    """
+    The taskmn daemon could not complete a request
+    """
     def __init__(self, message):
+        self.message = message
         super().__init__(message)
 
+    def __str__(self):
+        return self.message
+
+
+class TaskImportError(ValueError):
+    """
+    A record being imported is not a valid task
+    """
+    def __init__(self, line, reason):
+        self.line = line
+        self.message = f'Importing the record on line {line} failed. {reason}'
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class FilterError(ValueError):
+    """
+    A filter expression could not be parsed
+    """
+    def __init__(self, attempted, reason):
+        self.attempted = attempted
+        self.message = f'Filtering with "{attempted}" failed. {reason}'
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class SearchError(ValueError):
+    """
+    A search query could not be parsed
+    """
+    def __init__(self, attempted, reason):
+        self.attempted = attempted
+        self.message = f'Searching for "{attempted}" failed. {reason}'
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
+
+
+class SortError(ValueError):
+    """
+    A sort spec could not be parsed
+    """
+    def __init__(self, attempted, reason):
+        self.attempted = attempted
+        self.message = f'Sorting by "{attempted}" failed. {reason}'
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
@@ -0,0 +1,151 @@
+import configparser
+import re
+import sys
+
+from taskmn import __app_name__, __version__, config, daemon_client, task_store
+from taskmn.task_manager import TaskManager
+
+"""
+This module runs the most frequently scripted commands without importing typer, click or rich, which take most of the
+startup time of the cli. Only simple, non-interactive forms are handled:
+
+    taskmn -v / --version
+    taskmn add NAME [-desc TEXT] [-dl TEXT] [-p 0-2]
+    taskmn complete TASK_ID
+    taskmn delete -f TASK_ID / taskmn rm -f TASK_ID
+
+Anything else, including any error in reading the configuration, is left to the full cli in task_manager_cli, which
+reports it in its usual way. The commands print the same output as the full cli, so rich is imported once a message
+is printed, and indexed stores are not loaded, as in the full cli
+
+Functions
+
+run(list[str]) -> int || None
+"""
+_ADD_OPTIONS = {"-desc": "description", "--description": "description", "-dl": "deadline", "--deadline": "deadline",
+                "-p": "priority", "--priority": "priority"}
+_MARKUP = re.compile(r"\[/?[a-z ]+]")
+
+
+def run(args):
+    """
+    Runs a command if it has a fast form
+    :param list[str] args: The command line arguments, without the program name
+    :return int or None: The exit code of the command, None if the full cli has to run it
+    """
+    if len(args) == 1 and args[0] in ("-v", "--version"):
+        _print(f"{__app_name__} [green]v[/green]{__version__}")
+        return 0
+    if len(args) < 2:
+        return None
+    command, args = args[0], args[1:]
+    if command == "add":
+        return _add(args)
+    if command == "complete" and len(args) == 1:
+        return _complete(args[0])
+    if command in ("delete", "rm") and len(args) == 2 and ("-f" in args or "--force" in args):
+        return _delete(args[1] if args[0] in ("-f", "--force") else args[0])
+    return None
+
+
+def _add(args):
+    options = {"name": None, "description": None, "deadline": None, "priority": "1"}
+    while args:
+        if args[0] in _ADD_OPTIONS and len(args) > 1:
+            options[_ADD_OPTIONS[args[0]]] = args[1]
+            args = args[2:]
+        elif not args[0].startswith("-") and options["name"] is None:
+            options["name"] = args[0]
+            args = args[1:]
+        else:  # --help, --option=value forms and mistakes
+            return None
+    if options["name"] is None or options["priority"] not in ("0", "1", "2"):
+        return None
+    manager = _get_manager()
+    if manager is None:
+        return None
+    try:
+        task = manager.add_task(options["name"], options["description"], options["deadline"],
+                                int(options["priority"]))
+    except Exception as e:
+        _box(f"[bold red]Adding task failed with {e}[/bold red]", "Exception")
+    else:
+        _box(f"[green]Adding Task #{task.id} - {task.name} Complete![/green]", "Info")
+    return 0
+
+
+def _complete(task_id):
+    if not task_id.isdigit() or int(task_id) < 1:
+        return None
+    task_id = int(task_id)
+    manager = _get_manager()
+    if manager is None:
+        return None
+    _load_unless_indexed(manager)
+    try:
+        task = manager.toggle_completion(task_id)
+    except ValueError:
+        _box(f"[bold red]Task #{task_id} does not exist[/bold red]", "Exception")
+        return 1
+    status = "complete" if task.completed else "incomplete"
+    _box(f"Task #{task_id} - {task.name} [bold green]marked as {status}[/bold green]", "Info")
+    return 0
+
+
+def _delete(task_id):
+    if not task_id.isdigit():
+        return None
+    task_id = int(task_id)
+    manager = _get_manager()
+    if manager is None:
+        return None
+    _load_unless_indexed(manager)
+    try:
+        manager.delete_task(task_id)
+    except ValueError:
+        _box(f"[bold red]Task #{task_id} does not exist[/bold red]", "Exception")
+        return 1
+    _box(f"Task #{task_id} [bold red]deleted[/bold red]", "Info")
+    return 0
+
+
+def _get_manager():
+    """
+    Creates the manager the cli would use, a daemon's if one serves the store
+    :return TaskManager or RemoteTaskManager or None: The manager, None if the configuration or store are missing
+    """
+    try:
+        if not config.CONFIG_FILE_PATH.exists():
+            return None
+        store_path = task_store.get_storage_path(config.CONFIG_FILE_PATH)
+        if not store_path.exists():
+            return None
+        remote = daemon_client.connect(store_path=store_path)
+        if remote is not None:
+            return remote
+        return TaskManager(loadfile=store_path, **task_store.get_store_options(config.CONFIG_FILE_PATH))
+    except (OSError, KeyError, ValueError, configparser.Error):  # Unreadable configuration, the cli explains it
+        return None
+
+
+def _load_unless_indexed(manager):
+    """
+    Loads the store lazily, unless the store can answer queries for single tasks itself
+    :param TaskManager or RemoteTaskManager manager: The manager to load
+    """
+    if not manager.indexed:
+        manager.load_from_file(lazy=True)
+
+
+def _print(message):
+    if sys.stdout.isatty():
+        from rich import print as rich_print
+        rich_print(message)
+    else:
+        print(_MARKUP.sub("", message))
+
+
+def _box(message, title):
+    from rich import print as rich_print  # Drawn like the boxes of the full cli, on a terminal or not
+    from rich.panel import Panel
+    rich_print(Panel.fit(message, title=title))
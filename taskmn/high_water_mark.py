@@ -0,0 +1,99 @@
+import os
+import struct
+
+"""
+This Module contains the sidecar which persists the highest id handed out by a csv store,
+allowing new ids to be allocated without reading the store
+
+Classes
+HighWaterMark
+"""
+
+
+class HighWaterMark:
+    """
+    Class which keeps the highest task id allocated or stored in a csv store in a sidecar file.
+
+    The sidecar holds the mark together with the modification times and sizes of the store and its journal. A mark
+    whose stamp does not match the files was not written after their last change, and is not trusted.
+    New tasks, whether added one at a time or imported, take their ids from TaskStore.allocate_id, which raises the
+    mark. Every write of the store stamps the mark anew, raising it to the ids of rows appended without allocating
+    them, and saving the whole store sets it to the highest id saved
+
+    --------------
+
+    Static Properties
+
+    SUFFIX : str
+
+    ---------------
+
+    Attributes
+
+    store_filename : str
+    journal_filename : str
+
+    ---------------
+
+    Methods
+
+    path(str) -> str
+
+    read() -> int || None
+
+    write(int)
+    """
+    SUFFIX = ".hwm"
+    _FORMAT = struct.Struct('<4sqqqqq')  # magic, mark, store mtime in ns, store size, journal mtime in ns, journal size
+    _MAGIC = b'TMH1'
+
+    def __init__(self, store_filename, journal_filename):
+        self.store_filename = str(store_filename)
+        self.journal_filename = str(journal_filename)
+
+    @staticmethod
+    def path(store_filename):
+        """
+        Returns the path of the sidecar belonging to a store
+        :param str store_filename: The csv store
+        :return str: The sidecar file path
+        """
+        return str(store_filename) + HighWaterMark.SUFFIX
+
+    def read(self):
+        """
+        Reads the mark
+        :return int or None: The highest id allocated, None if the sidecar is missing or out of date
+        """
+        try:
+            with open(HighWaterMark.path(self.store_filename), 'rb') as file:
+                data = file.read(self._FORMAT.size)
+        except OSError:
+            return None
+        if len(data) != self._FORMAT.size:
+            return None
+        magic, mark, *stamp = self._FORMAT.unpack(data)
+        if magic != self._MAGIC or tuple(stamp) != self._stamp():
+            return None
+        return mark
+
+    def write(self, mark):
+        """
+        Stores the mark, stamped with the current state of the store. Call it after the store has been written
+        :param int mark: The highest id allocated
+        """
+        path = HighWaterMark.path(self.store_filename)
+        temp_path = path + ".new"
+        with open(temp_path, 'wb') as file:
+            file.write(self._FORMAT.pack(self._MAGIC, mark, *self._stamp()))
+        os.replace(temp_path, path)  # Readers never see a partly written mark
+
+    def _stamp(self):
+        stamp = ()
+        for filename in self.store_filename, self.journal_filename:
+            try:
+                stat = os.stat(filename)
+                stamp += (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stamp += (-1, -1)
+        return stamp
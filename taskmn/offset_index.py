@@ -0,0 +1,215 @@
+import csv
+import io
+import locale
+import os
+import struct
+
+"""
+This Module contains the sidecar index which maps task ids to the byte offset and length of their row in a csv store,
+allowing single rows to be read, patched or deleted without scanning the store
+
+Classes
+OffsetIndex
+"""
+
+
+class OffsetIndex:
+    """
+    Class which maintains the id -> (offset, length) index of a csv store in a sidecar file.
+
+    The sidecar starts with a header holding the modification time and size of the store it describes, followed by
+    (id, offset, length) records. Later records replace earlier ones for the same id, a length of 0 marks a deleted
+    row. Changes append a record and rewrite the header, so keeping the index current costs O(1) per edit
+
+    --------------
+
+    Static Properties
+
+    SUFFIX : str
+    ENCODING : str
+        The encoding used by the csv store, the default encoding of open()
+
+    ---------------
+
+    Attributes
+
+    store_filename : str
+    rows : dict[int, (int, int)]
+        The offset and length of the row of each task
+    dead : int
+        The number of bytes in the store taken up by deleted rows
+
+    ---------------
+
+    Methods
+
+    open(str) -> OffsetIndex
+
+    matching(str, int, int) -> OffsetIndex || None
+
+    path(str) -> str
+
+    format_row(list[string]) -> bytes
+
+    build()
+
+    save()
+
+    record(int, int, int)
+
+    record_many(list[(int, int, int)])
+
+    seal()
+    """
+    SUFFIX = ".idx"
+    ENCODING = locale.getpreferredencoding(False)
+    _HEADER = struct.Struct('<4sqqq')  # magic, store mtime in ns, store size, dead bytes
+    _RECORD = struct.Struct('<qqq')  # id, offset, length
+    _MAGIC = b'TMI1'
+
+    def __init__(self, store_filename):
+        self.store_filename = str(store_filename)
+        self.rows = {}
+        self.dead = 0
+
+    @classmethod
+    def open(cls, store_filename):
+        """
+        Reads the index of a store, rebuilding and saving it if it is missing or does not match the store
+        :param str store_filename: The csv store
+        :return OffsetIndex: An index matching the current contents of the store
+        """
+        index = cls(store_filename)
+        if not index._read():
+            index.build()
+            index.save()
+        return index
+
+    @classmethod
+    def matching(cls, store_filename, size, mtime_ns):
+        """
+        Reads the index of a store as it was at a given size and modification time, without rebuilding it
+        :param str store_filename: The csv store
+        :param int size: The size of the store
+        :param int mtime_ns: The modification time of the store in ns
+        :return OffsetIndex or None: The index, None if it does not match the store at that time
+        """
+        index = cls(store_filename)
+        if not index._read((mtime_ns, size)):
+            return None
+        for task_id, (offset, length) in list(index.rows.items()):
+            if offset + length > size:  # Recorded by a write which was not committed at that time
+                del index.rows[task_id]
+        return index
+
+    @staticmethod
+    def path(store_filename):
+        """
+        Returns the path of the sidecar index belonging to a store
+        :param str store_filename: The csv store
+        :return str: The sidecar file path
+        """
+        return str(store_filename) + OffsetIndex.SUFFIX
+
+    @staticmethod
+    def format_row(row):
+        """
+        Returns the bytes csv.writer writes for a row
+        :param list[string] row: The row to format
+        :return bytes: The encoded row including its line terminator
+        """
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerow(row)
+        return buffer.getvalue().encode(OffsetIndex.ENCODING)
+
+    def build(self):
+        """
+        Scans the store, recording the position of every row
+        """
+        self.rows = {}
+        self.dead = 0
+        with open(self.store_filename, 'rb') as file:
+            offset = len(file.readline())  # Skip the header
+            record = b''
+            for line in file:
+                record += line
+                if record.count(b'"') % 2:  # A quoted field continues on the next line
+                    continue
+                row = next(csv.reader([record.decode(OffsetIndex.ENCODING)]), [])
+                if len(row) == 0:  # Padding rows and deleted rows
+                    self.dead += len(record)
+                else:
+                    self.rows[int(row[0])] = (offset, len(record))
+                offset += len(record)
+                record = b''
+
+    def save(self):
+        """
+        Writes the whole index to the sidecar file
+        """
+        with open(OffsetIndex.path(self.store_filename), 'wb') as file:
+            file.write(self._header())
+            file.write(b''.join(self._RECORD.pack(task_id, offset, length)
+                                for task_id, (offset, length) in self.rows.items()))
+
+    def record(self, task_id, offset, length):
+        """
+        Records the new position of a row, call seal() once the store has been written
+        :param int task_id: The id of the task
+        :param int offset: The byte offset of the row in the store
+        :param int length: The length of the row in bytes, 0 if the task was deleted
+        """
+        self.record_many([(task_id, offset, length)])
+
+    def record_many(self, entries):
+        """
+        Records the new positions of several rows in a single write of the sidecar, call seal() once the store has
+        been written
+        :param list[(int, int, int)] entries: The id, offset and length of each row, see record
+        """
+        for task_id, offset, length in entries:
+            if length == 0:
+                self.rows.pop(task_id, None)
+            else:
+                self.rows[task_id] = (offset, length)
+        with open(OffsetIndex.path(self.store_filename), 'ab') as file:
+            file.write(b''.join(self._RECORD.pack(*entry) for entry in entries))
+
+    def seal(self):
+        """
+        Marks the index as matching the current contents of the store
+        """
+        with open(OffsetIndex.path(self.store_filename), 'r+b') as file:
+            file.write(self._header())
+
+    def _header(self):
+        stat = os.stat(self.store_filename)
+        return self._HEADER.pack(self._MAGIC, stat.st_mtime_ns, stat.st_size, self.dead)
+
+    def _read(self, stamp=None):
+        """
+        Reads the sidecar file
+        :param (int, int) or None stamp: The modification time in ns and size the store must have had when the index
+            was sealed, its current ones if None
+        :return bool: False if the sidecar is missing or out of date
+        """
+        try:
+            with open(OffsetIndex.path(self.store_filename), 'rb') as file:
+                data = file.read()
+            if stamp is None:
+                stat = os.stat(self.store_filename)
+                stamp = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return False
+        if len(data) < self._HEADER.size:
+            return False
+        magic, mtime, size, self.dead = self._HEADER.unpack_from(data)
+        if magic != self._MAGIC or (mtime, size) != stamp:
+            return False
+        end = self._HEADER.size + (len(data) - self._HEADER.size) // self._RECORD.size * self._RECORD.size
+        for task_id, offset, length in self._RECORD.iter_unpack(data[self._HEADER.size:end]):
+            if length == 0:
+                self.rows.pop(task_id, None)
+            else:
+                self.rows[task_id] = (offset, length)
+        return True
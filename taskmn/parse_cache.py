@@ -0,0 +1,142 @@
+import marshal
+import os
+import struct
+import sys
+from array import array
+
+"""
+This Module contains the sidecar cache of a csv store's parsed rows and sort columns, which lets a store that has not
+changed since it was last read be loaded without parsing it again
+
+Classes
+ParseCache
+"""
+
+
+class ParseCache:
+    """
+    Class which keeps the parsed rows of a csv store, and the TaskColumns arrays of those rows, in a sidecar file.
+
+    The sidecar starts with the key of the store it was written for: the path of the store, the inode, size and
+    modification time of the store and of its journal, the header line of the store and the version in its lock file.
+    Every committed write changes the version and the files, and edits made by hand change the files, so a cache is
+    only used while its key matches the store. The rows are kept as one list per field and written with marshal,
+    which reads them back several times faster than csv.reader
+
+    --------------
+
+    Static Properties
+
+    SUFFIX : str
+
+    ---------------
+
+    Attributes
+
+    store_filename : str
+
+    ---------------
+
+    Methods
+
+    path(str) -> str
+
+    key(str, int) -> tuple
+
+    read(tuple) -> (int, list[list[string]], dict[str, array[int]]) || None
+
+    write(tuple, int, list[list[string]], dict[str, array[int]])
+
+    remove()
+    """
+    SUFFIX = ".cache"
+    _KEY_LENGTH = struct.Struct('<q')  # The key is read on its own, so a cache for another key is not read further
+    _FORMAT = (b'TMC1', marshal.version, sys.version_info[:2], sys.byteorder)  # Only read by the Python writing it
+
+    def __init__(self, store_filename):
+        self.store_filename = str(store_filename)
+
+    @staticmethod
+    def path(store_filename):
+        """
+        Returns the path of the cache belonging to a store
+        :param str store_filename: The csv store
+        :return str: The cache file path
+        """
+        return str(store_filename) + ParseCache.SUFFIX
+
+    def key(self, journal_filename, version):
+        """
+        Returns the key describing the current state of the store
+        :param str journal_filename: The journal of the store
+        :param int version: The StoreLock version of the store
+        :return tuple or None: The key, None if the store can not be read
+        """
+        try:
+            with open(self.store_filename, 'rb') as file:
+                store = _stamp(os.fstat(file.fileno()))
+                header = file.readline()
+        except OSError:
+            return None
+        try:
+            journal = _stamp(os.stat(journal_filename))
+        except FileNotFoundError:
+            journal = None
+        return ParseCache._FORMAT + (os.path.abspath(self.store_filename), store, journal, header, version)
+
+    def read(self, key):
+        """
+        Reads the cache if it was written for a key
+        :param tuple key: The key of the store as it is now
+        :return (int, list[list[string]], dict[str, array[int]]) or None: The maximum id, the rows and the columns of
+            the store, None if there is no cache for the key
+        """
+        try:
+            with open(ParseCache.path(self.store_filename), 'rb') as file:
+                length, = ParseCache._KEY_LENGTH.unpack(file.read(ParseCache._KEY_LENGTH.size))
+                if marshal.loads(file.read(length)) != key:
+                    return None
+                last_id, fields, columns = marshal.loads(file.read())  # marshal.load reads a file in small pieces
+        except (OSError, EOFError, ValueError, TypeError, struct.error):  # Missing, or left incomplete by a crash
+            return None
+        return last_id, list(map(list, zip(*fields))), {name: array(typecode, values)
+                                                        for name, (typecode, values) in columns.items()}
+
+    def write(self, key, last_id, rows, columns):
+        """
+        Replaces the cache. Readers write it without holding the StoreLock, the temporary file is unique to the
+        process and atomically renamed, so concurrent readers never see a partial cache
+        :param tuple key: The key of the store the rows were read from
+        :param int last_id: The maximum id of the store
+        :param list[list[string]] rows: The rows of the store
+        :param dict[str, array[int]] columns: The TaskColumns arrays of the rows
+        """
+        if len(set(map(len, rows))) > 1:  # Kept as one list per field, which needs rows of the same length
+            return
+        path = ParseCache.path(self.store_filename)
+        temp_path = f"{path}.{os.getpid()}.new"
+        try:
+            encoded_key = marshal.dumps(key)
+            with open(temp_path, 'wb') as file:
+                file.write(ParseCache._KEY_LENGTH.pack(len(encoded_key)) + encoded_key)
+                marshal.dump((last_id, tuple(zip(*rows)),
+                              {name: (values.typecode, values.tobytes()) for name, values in columns.items()}), file)
+            os.replace(temp_path, path)
+        except OSError:  # The store still loads without a cache, such as from a read only directory
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def remove(self):
+        """
+        Deletes the cache, once the store it describes is being changed
+        """
+        try:
+            os.remove(ParseCache.path(self.store_filename))
+        except FileNotFoundError:
+            pass
+
+
+def _stamp(stat):
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,214 @@
+import os
+import sys
+import threading
+import time
+
+"""
+This module records how long the phases of a command take, to find where a slow command spends its time.
+Recording is started by the global --profile and --profile-output options, or by the TASKMN_TRACE environment
+variable, and costs a function call per phase otherwise.
+
+    TASKMN_TRACE=1          Prints the phase summary to stderr when the command ends
+    TASKMN_TRACE=FILE       Writes FILE instead, see --profile-output
+
+Phases may be nested. The summary shows the wall and CPU time of each phase with and without the phases nested in it,
+and the rows the phase handled
+
+Constants
+
+TRACE_VARIABLE : str
+
+Classes
+
+Phase
+
+Functions
+
+start(bool, str) -> None
+start_from(list[str], Mapping[str, str]) -> list[str]
+phase(str) -> Phase
+active() -> bool
+finish() -> None
+"""
+TRACE_VARIABLE = "TASKMN_TRACE"
+_recorder = None
+
+
+class Phase:
+    """
+    A timed phase of a command, used as a context manager. Set rows inside it to record how many rows it handled
+
+    Attributes:
+        name : str
+        rows : int or None The number of rows, tasks or lines the phase handled
+        start : float The wall time it started at, from time.perf_counter()
+        wall : float Seconds it took
+        cpu : float Seconds of CPU time this process used during it
+        child_wall : float Seconds taken by the phases nested in it
+        child_cpu : float CPU seconds used by the phases nested in it
+    """
+
+    def __init__(self, name, recorder):
+        self.name = name
+        self.rows = None
+        self.start = self.wall = self.cpu = self.child_wall = self.child_cpu = 0.0
+        self._recorder = recorder
+        self._start_cpu = 0.0
+
+    def __enter__(self):
+        self._recorder.stack.append(self)
+        self._start_cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wall = time.perf_counter() - self.start
+        self.cpu = time.process_time() - self._start_cpu
+        stack = self._recorder.stack
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += self.wall
+            stack[-1].child_cpu += self.cpu
+        self._recorder.phases.append(self)
+
+
+class _NullPhase:
+    """
+    Stands in for a Phase while nothing is recorded
+    """
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def __setattr__(self, name, value):  # Shared by every caller, so nothing is kept
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Recorder:
+    """
+    The phases recorded by the command, and where to report them
+    """
+
+    def __init__(self, summary, output):
+        self.summary = summary
+        self.output = output
+        self.stack = []
+        self.phases = []
+        self.start = time.perf_counter()
+        self.thread = threading.get_ident()
+        self.profiler = None
+        if output is not None and not output.lower().endswith(".json"):
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def report(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.output)
+        elif self.output is not None:
+            self._write_trace()
+        if self.summary:
+            self._print_summary()
+
+    def _write_trace(self):
+        """
+        Writes the phases as complete events of the Chrome trace event format, which chrome://tracing and Perfetto open
+        """
+        import json
+        pid = os.getpid()
+        events = [{"name": phase.name, "ph": "X", "pid": pid, "tid": self.thread,
+                   "ts": round((phase.start - self.start) * 1e6, 3), "dur": round(phase.wall * 1e6, 3),
+                   "args": {"cpu_ms": round(phase.cpu * 1e3, 3), "rows": phase.rows}}
+                  for phase in sorted(self.phases, key=lambda phase: phase.start)]
+        with open(self.output, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def _print_summary(self):
+        totals = {}  # Phases of the same name are added up, in the order they first started
+        for phase in sorted(self.phases, key=lambda phase: phase.start):
+            total = totals.setdefault(phase.name, [0, 0.0, 0.0, 0.0, 0.0, None])
+            total[0] += 1
+            total[1] += phase.wall
+            total[2] += phase.wall - phase.child_wall
+            total[3] += phase.cpu
+            total[4] += phase.cpu - phase.child_cpu
+            if phase.rows is not None:
+                total[5] = (total[5] or 0) + phase.rows
+        lines = [f"{'phase':<12}{'calls':>7}{'wall ms':>11}{'self ms':>11}{'cpu ms':>11}{'self cpu':>11}{'rows':>10}"]
+        for name, (calls, wall, self_wall, cpu, self_cpu, rows) in totals.items():
+            lines.append(f"{name:<12}{calls:>7}{wall * 1e3:>11.2f}{self_wall * 1e3:>11.2f}{cpu * 1e3:>11.2f}"
+                         f"{self_cpu * 1e3:>11.2f}{'' if rows is None else rows:>10}")
+        lines.append(f"{'total':<12}{'':>7}{(time.perf_counter() - self.start) * 1e3:>11.2f}")
+        sys.stderr.write("\n".join(lines) + "\n")
+
+
+def start(summary=True, output=None):
+    """
+    Starts recording phases, unless they are already recorded
+    :param bool summary: Print the phase summary to stderr when the command ends
+    :param str or None output: A file to write when the command ends. A .json file receives the phases as a Chrome
+        trace, any other file the cProfile statistics of the command, to be read with pstats
+    """
+    global _recorder
+    if _recorder is None and (summary or output is not None):
+        _recorder = _Recorder(summary, None if output is None else str(output))
+
+
+def start_from(args, environment):
+    """
+    Starts recording as asked by the global profile options at the start of the arguments, or by TASKMN_TRACE
+    :param list[str] args: The command line arguments, without the program name
+    :param Mapping[str, str] environment: The environment variables
+    :return list[str]: The arguments without the profile options
+    """
+    trace = environment.get(TRACE_VARIABLE, "")
+    summary = trace.lower() in ("1", "true", "yes")
+    output = trace if trace and not summary and trace.lower() not in ("0", "false", "no") else None
+    while args:
+        if args[0] == "--profile":
+            summary, args = True, args[1:]
+        elif args[0] == "--profile-output" and len(args) > 1:
+            output, args = args[1], args[2:]
+        elif args[0].startswith("--profile-output="):
+            output, args = args[0].partition("=")[2], args[1:]
+        else:
+            break
+    start(summary, output)
+    return args
+
+
+def phase(name):
+    """
+    Returns a context manager timing a phase of the command
+    :param str name: The name of the phase, such as parse or render
+    :return Phase: The phase, or a stand in doing nothing when no recording was started
+    """
+    if _recorder is None or threading.get_ident() != _recorder.thread:
+        return _NULL_PHASE
+    return Phase(name, _recorder)
+
+
+def active():
+    """
+    Returns True while phases are recorded
+    :return bool: True if recording was started and has not finished
+    """
+    return _recorder is not None
+
+
+def finish():
+    """
+    Stops recording and reports the phases as asked when recording started. Does nothing if nothing is recorded
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.report()
@@ -0,0 +1,564 @@
+import heapq
+import itertools
+import marshal
+import math
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from taskmn import profiling
+from taskmn.exceptions import SearchError
+from taskmn.store_lock import StoreLock
+
+"""
+This Module contains the sidecar inverted index of the names and descriptions of a store's tasks, which answers the
+queries of "taskmn search" without reading or matching every task.
+
+A query is a list of words, all of which a task must contain. Words are matched ignoring case, a word ending in * also
+matches every longer word starting with it, and words in quotes must follow each other in that order:
+
+    report                      Tasks containing the word report
+    rep*                        report, repair, reply...
+    "quarterly report" draft    The phrase quarterly report, and the word draft
+
+Matching tasks are ranked by BM25 over their name and description, a word of the name counting NAME_WEIGHT times
+
+Constants
+NAME_WEIGHT : int
+
+Classes
+SearchIndex
+
+Functions
+parse_query(str) -> list[list[(str, bool)]]
+"""
+NAME_WEIGHT = 3
+_WORD = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]*)("?)|(\S+)')
+_DESCRIPTION = 1 << 30  # Position of the first word of the description, so phrases do not run on from the name
+_K1 = 1.2  # BM25 term frequency saturation
+_B = 0.75  # BM25 length normalization
+_MISSING = (-1, -1, -1)
+
+
+class SearchIndex:
+    """
+    Class which keeps an inverted index of the words in the name and description of every task in a sidecar file.
+
+    The sidecar starts with a header holding the key of the store it matches: the StoreLock version of the store and
+    the inode, size and modification time of the store and of its journal. The postings of every word follow, encoded
+    separately so a query only decodes the words it looks up, then the words of each task, which changes need to find
+    the postings a task is in. Writes to a csv store append the new name and description of the tasks they change
+    and rewrite the header, so keeping the index current costs O(1) per edit. The appended changes are applied when
+    the index is next read, and folded into the postings once they grow past 1 / COMPACT_FRACTION of them.
+    An index whose key does not match the store, such as after the store was edited by hand, is built anew
+
+    --------------
+
+    Static Properties
+
+    SUFFIX : str
+    COMPACT_FRACTION : int
+
+    ---------------
+
+    Attributes
+
+    store_filename : str
+    journal_filename : str or None
+
+    ---------------
+
+    Methods
+
+    open(str, Callable[[], Iterable[list[string]]], str) -> SearchIndex
+
+    path(str) -> str
+
+    key(int) -> tuple || None
+
+    read(tuple) -> bool
+
+    build(Iterable[list[string]])
+
+    save(tuple)
+
+    record(tuple, tuple, dict[str, list[string] || None])
+
+    remove()
+
+    update(dict[int, (str, str) || None])
+
+    search(str, int) -> list[(int, float)]
+    """
+    SUFFIX = ".search"
+    COMPACT_FRACTION = 4
+    _HEADER = struct.Struct('<4s11q')  # magic, format, key, length of the postings, length of the words
+    _LENGTH = struct.Struct('<q')
+    _MAGIC = b'TMX1'
+    _FORMAT = (marshal.version, sys.byteorder == 'little')  # Only read by the Python writing it
+
+    def __init__(self, store_filename, journal_filename=None):
+        self.store_filename = str(store_filename)
+        self.journal_filename = None if journal_filename is None else str(journal_filename)
+        self.__count = 0  # Tasks indexed
+        self.__total = 0  # Weighted words of every task
+        self.__postings = {}  # word -> encoded postings
+        self.__documents = {}  # id -> the words of the name, a newline and the words of the description
+        self.__encoded_documents = None  # __documents as read, decoded when they are first needed
+        self.__words = None  # The words of __postings in order, for prefixes
+        self.__postings_bytes = 0  # Size of the encoded postings in the sidecar
+        self.__changed_bytes = 0  # Size of the changes appended to the sidecar after the postings
+
+    @classmethod
+    def open(cls, store_filename, rows, journal_filename=None):
+        """
+        Reads the index of a store, building it from the rows of the store and saving it if it is missing or does not
+        match the store. The sidecar is only written while no other process writes to the store
+        :param str store_filename: The store
+        :param Callable[[], Iterable[list[string]]] rows: Reads the rows of the store
+        :param str or None journal_filename: The journal of a csv store
+        :return SearchIndex: An index matching the store
+        """
+        with profiling.phase("index") as phase:
+            lock = StoreLock(store_filename)
+            index = cls(store_filename, journal_filename)
+            key = index.key(lock.version())
+            if key is not None and not lock.busy() and index.read(key):
+                if index.__changed_bytes * SearchIndex.COMPACT_FRACTION <= index.__postings_bytes:
+                    phase.rows = index.__count
+                    return index
+            else:
+                index.build(rows())
+            if key is not None and index.key(lock.version()) == key and not lock.busy():  # Unchanged meanwhile
+                index.save(key)
+            phase.rows = index.__count
+        return index
+
+    @staticmethod
+    def path(store_filename):
+        """
+        Returns the path of the sidecar index belonging to a store
+        :param str store_filename: The store
+        :return str: The sidecar file path
+        """
+        return str(store_filename) + SearchIndex.SUFFIX
+
+    def key(self, version):
+        """
+        Returns the key describing the current state of the store
+        :param int version: The StoreLock version of the store
+        :return tuple or None: The key, None if the store can not be read
+        """
+        try:
+            store = _stamp(os.stat(self.store_filename))
+        except OSError:
+            return None
+        journal = _MISSING
+        if self.journal_filename is not None:
+            try:
+                journal = _stamp(os.stat(self.journal_filename))
+            except FileNotFoundError:
+                pass
+        return (version,) + store + journal
+
+    def read(self, key):
+        """
+        Reads the sidecar if it matches a key, applying the changes appended to it
+        :param tuple key: The key of the store as it is now
+        :return bool: False if the sidecar is missing, incomplete or does not match the key
+        """
+        try:
+            with open(SearchIndex.path(self.store_filename), 'rb') as file:
+                data = file.read()
+            stamp, postings_length, documents_length = SearchIndex._unpack(data[:SearchIndex._HEADER.size])
+            if stamp != key:
+                return False
+            start = SearchIndex._HEADER.size
+            self.__postings_bytes = postings_length
+            self.__count, self.__total, self.__postings = marshal.loads(data[start:start + postings_length])
+            start += postings_length
+            self.__encoded_documents = data[start:start + documents_length]
+            self.__documents = None
+            start += documents_length
+            self.__changed_bytes = len(data) - start
+            changes = {}
+            while start < len(data):
+                length, = SearchIndex._LENGTH.unpack_from(data, start)
+                start += SearchIndex._LENGTH.size
+                task_id, name, description = marshal.loads(data[start:start + length])
+                changes[task_id] = None if name is None else (name, description)
+                start += length
+        except (OSError, EOFError, ValueError, TypeError, struct.error):  # Missing, or left incomplete by a crash
+            return False
+        if changes:
+            self.update(changes)
+        return True
+
+    def build(self, rows):
+        """
+        Indexes every task of a store, replacing what the index held
+        :param Iterable[list[string]] rows: The rows of the store in the form of Task.to_list()
+        """
+        self.__documents = {int(row[0]): _document(row[1], row[2]) for row in rows}
+        self.__encoded_documents = None
+        entries = {}
+        total = 0
+        for task_id, document in self.__documents.items():
+            positions, length = _positions(document)
+            total += length
+            for word, word_positions in positions.items():
+                entries.setdefault(word, {})[task_id] = (length, word_positions)
+        self.__count, self.__total = len(self.__documents), total
+        self.__postings = {word: _Postings.encode(postings) for word, postings in entries.items()}
+        self.__words = None
+        self.__changed_bytes = 0
+
+    def save(self, key):
+        """
+        Replaces the sidecar with the index. The temporary file is unique to the process and atomically renamed, so
+        concurrent readers never see a partial index
+        :param tuple key: The key of the store the index matches
+        """
+        path = SearchIndex.path(self.store_filename)
+        temp_path = f"{path}.{os.getpid()}.new"
+        try:
+            postings = marshal.dumps((self.__count, self.__total, self.__postings))
+            documents = self.__encoded_documents
+            if documents is None:
+                documents = marshal.dumps(self.__documents)
+            with open(temp_path, 'wb') as file:
+                file.write(SearchIndex._pack(key, len(postings), len(documents)))
+                file.write(postings)
+                file.write(documents)
+            os.replace(temp_path, path)
+            self.__postings_bytes, self.__changed_bytes = len(postings), 0
+        except OSError:  # Searches still work without a sidecar, such as from a read only directory
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def record(self, previous_key, key, changes):
+        """
+        Appends the changes of a write to the sidecar and marks it as matching the store after the write, if it
+        matched the store before it. Called by writers holding the StoreLock, the index itself is not read
+        :param tuple previous_key: The key of the store before the write
+        :param tuple key: The key of the store after the write
+        :param dict[str, list[string] or None] changes: The new row of each task written, None for deleted tasks
+        """
+        try:
+            with open(SearchIndex.path(self.store_filename), 'r+b') as file:
+                stamp, postings_length, documents_length = SearchIndex._unpack(file.read(SearchIndex._HEADER.size))
+                if stamp != previous_key:
+                    return  # Out of date already, it is built anew by the next search
+                records = [marshal.dumps((int(task_id), None, None) if row is None else (int(task_id), row[1], row[2]))
+                           for task_id, row in changes.items()]
+                file.seek(0, os.SEEK_END)
+                file.write(b''.join(SearchIndex._LENGTH.pack(len(record)) + record for record in records))
+                file.seek(0)
+                file.write(SearchIndex._pack(key, postings_length, documents_length))
+        except (OSError, struct.error):  # Missing, or not matching the store after all
+            pass
+
+    def remove(self):
+        """
+        Deletes the sidecar, once the store it describes was replaced as a whole
+        """
+        try:
+            os.remove(SearchIndex.path(self.store_filename))
+        except FileNotFoundError:
+            pass
+
+    def update(self, changes):
+        """
+        Changes the indexed name and description of tasks, only the postings of their old and new words are rebuilt
+        :param dict[int, (str, str) or None] changes: The new name and description of each task, None for deleted
+            tasks
+        """
+        documents = self.__decoded_documents()
+        removed = {}
+        added = {}
+        for task_id, text in changes.items():
+            document = documents.pop(task_id, None)
+            if document is not None:
+                positions, length = _positions(document)
+                self.__total -= length
+                for word in positions:
+                    removed.setdefault(word, set()).add(task_id)
+            if text is not None:
+                document = documents[task_id] = _document(*text)
+                positions, length = _positions(document)
+                self.__total += length
+                for word, word_positions in positions.items():
+                    added.setdefault(word, {})[task_id] = (length, word_positions)
+        for word in removed.keys() | added.keys():
+            postings = _Postings(self.__postings.get(word)).changed(removed.get(word, ()), added.get(word, {}))
+            if postings is None:
+                del self.__postings[word]
+                self.__words = None
+            else:
+                if word not in self.__postings:
+                    self.__words = None
+                self.__postings[word] = postings
+        self.__count = len(documents)
+
+    def search(self, query, limit=None):
+        """
+        Returns the tasks matching a query, best ranked first
+        :param str query: The query, see the module documentation
+        :param int or None limit: (optional) The most tasks to return
+        :return list[(int, float)]: The id and score of each task, ties ordered by id
+        :exception SearchError: The query is not valid
+        """
+        clauses = parse_query(query)
+        with profiling.phase("search") as phase:
+            average = self.__total / self.__count if self.__count else 1
+            scores = None
+            for clause in sorted(clauses, key=self.__size):  # The rarest first, later ones only check its matches
+                matches = self.__match(clause, scores)
+                idf = math.log(1 + (self.__count - len(matches) + 0.5) / (len(matches) + 0.5))
+                clause_scores = {task_id: idf * frequency * (_K1 + 1) /
+                                 (frequency + _K1 * (1 - _B + _B * length / average))
+                                 for task_id, (length, frequency) in matches.items()}
+                if scores is None:
+                    scores = clause_scores
+                else:
+                    scores = {task_id: score + clause_scores[task_id] for task_id, score in scores.items()
+                              if task_id in clause_scores}
+                if not scores:
+                    break
+            ranked = ((-score, task_id) for task_id, score in scores.items())
+            ranked = sorted(ranked) if limit is None else heapq.nsmallest(limit, ranked)
+            phase.rows = len(scores)
+        return [(task_id, -score) for score, task_id in ranked]
+
+    @staticmethod
+    def _pack(key, postings_length, documents_length):
+        return SearchIndex._HEADER.pack(SearchIndex._MAGIC, *SearchIndex._FORMAT, *key, postings_length,
+                                        documents_length)
+
+    @staticmethod
+    def _unpack(header):
+        """
+        Returns the key, the length of the postings and the length of the words of a header, a key of None if the
+        sidecar was written in another format
+        """
+        magic, *fields = SearchIndex._HEADER.unpack(header)
+        if magic != SearchIndex._MAGIC or tuple(fields[:2]) != SearchIndex._FORMAT:
+            return None, 0, 0
+        return tuple(fields[2:-2]), fields[-2], fields[-1]
+
+    def __size(self, clause):
+        """
+        Estimates how many tasks a clause matches from the size of the postings of its rarest word
+        """
+        return min(sum(len(self.__postings[expanded]) for expanded in self.__expand(word, prefix))
+                   for word, prefix in clause)
+
+    def __match(self, clause, candidates):
+        """
+        Returns the tasks containing the words of a clause in order
+        :param list[(str, bool)] clause: The words of the clause, and whether each is a prefix
+        :param dict[int, float] or None candidates: Only match these tasks, all tasks if None
+        :return dict[int, (int, int)]: The weighted length of each matching task, and the weighted number of times
+            the clause appears in it
+        """
+        elements = [[_Postings(self.__postings[expanded]) for expanded in self.__expand(word, prefix)]
+                    for word, prefix in clause]
+        matches = {}
+        if len(elements) == 1:  # A single word is counted without looking at its positions
+            for postings in elements[0]:
+                for task_id, length, frequency in zip(postings.task_ids, postings.lengths, postings.frequencies):
+                    if candidates is None or task_id in candidates:
+                        matches[task_id] = (length, matches.get(task_id, (0, 0))[1] + frequency)
+            return matches
+        task_ids = None if candidates is None else set(candidates)
+        for element in sorted(elements, key=lambda element: sum(map(len, element))):  # Intersected rarest first
+            element_ids = set(itertools.chain.from_iterable(postings.task_ids for postings in element))
+            task_ids = element_ids if task_ids is None else task_ids & element_ids
+        for task_id in task_ids:
+            starts = None
+            for offset, element in enumerate(elements):
+                positions = {position - offset for postings in element for position in postings.positions_of(task_id)}
+                starts = positions if starts is None else starts & positions
+            if starts:
+                length = next(postings.length_of(task_id) for postings in elements[0] if task_id in postings)
+                matches[task_id] = (length, _frequency(sorted(starts)))
+        return matches
+
+    def __expand(self, word, prefix):
+        """
+        Returns the indexed words a word of a query matches
+        """
+        if not prefix:
+            return [word] if word in self.__postings else []
+        if self.__words is None:
+            self.__words = sorted(self.__postings)
+        expanded = []
+        for position in range(bisect_left(self.__words, word), len(self.__words)):
+            if not self.__words[position].startswith(word):
+                break
+            expanded.append(self.__words[position])
+        return expanded
+
+    def __decoded_documents(self):
+        if self.__documents is None:
+            self.__documents = marshal.loads(self.__encoded_documents)
+            self.__encoded_documents = None
+        return self.__documents
+
+
+def parse_query(query):
+    """
+    Splits a query into clauses, each a list of words which must follow each other and whether each is a prefix
+    :param str query: The query
+    :return list[list[(str, bool)]]: The clauses
+    :exception SearchError: The query is not valid
+    """
+    clauses = []
+    for match in _QUERY.finditer(query):
+        phrase, closed, text = match.groups()
+        if text is None:
+            if not closed:
+                raise SearchError(query, "A quote is not closed")
+            text = phrase
+        words = _WORD.findall(text.casefold())
+        if words:
+            clause = [(word, False) for word in words]
+            if text.rstrip().endswith("*"):
+                clause[-1] = (words[-1], True)
+            clauses.append(clause)
+    if not clauses:
+        raise SearchError(query, "The query has no words to search for")
+    return clauses
+
+
+def _document(name, description):
+    """
+    Returns the words of a task as they are kept by the index. Tasks without a description are stored with 'None'
+    """
+    words = " ".join(_WORD.findall(name.casefold()))
+    if description is None or description == 'None':
+        return words + "\n"
+    return words + "\n" + " ".join(_WORD.findall(description.casefold()))
+
+
+def _positions(document):
+    """
+    Returns the positions of each word of a task, and its length with the words of the name weighted
+    """
+    name, _, description = document.partition("\n")
+    positions = {}
+    name_words, description_words = name.split(), description.split()
+    for position, word in enumerate(name_words):
+        positions.setdefault(word, []).append(position)
+    for position, word in enumerate(description_words, _DESCRIPTION):
+        positions.setdefault(word, []).append(position)
+    return positions, NAME_WEIGHT * len(name_words) + len(description_words)
+
+
+class _Postings:
+    """
+    The postings of a word: the tasks containing it with their weighted length, the weighted number of times the word
+    appears in them and its positions in them, kept as arrays which decode straight from the bytes of the sidecar
+    """
+    _TYPECODES = ('q', 'i', 'i', 'i', 'i')  # ids, lengths, frequencies, number of positions, positions
+
+    def __init__(self, data=None):
+        """
+        :param bytes or None data: The postings as encoded by changed, None for a word which is not indexed
+        """
+        columns = [array(typecode) for typecode in _Postings._TYPECODES]
+        if data is not None:
+            for column, values in zip(columns, marshal.loads(data)):
+                column.frombytes(values)
+        self.task_ids, self.lengths, self.frequencies, self.counts, self.positions = columns
+        self.__index = None
+        self.__starts = None
+
+    @staticmethod
+    def encode(postings):
+        """
+        Encodes the postings of a word
+        :param dict[int, (int, list[int])] postings: The length of each task containing the word, and the positions
+            of the word in it, in increasing order
+        :return bytes: The postings
+        """
+        entries = postings.values()
+        return marshal.dumps((array('q', postings).tobytes(), array('i', [length for length, _ in entries]).tobytes(),
+                              array('i', [_frequency(positions) for _, positions in entries]).tobytes(),
+                              array('i', [len(positions) for _, positions in entries]).tobytes(),
+                              array('i', itertools.chain.from_iterable(positions for _, positions in entries))
+                              .tobytes()))
+
+    def __len__(self):
+        return len(self.task_ids)
+
+    def __contains__(self, task_id):
+        return task_id in self.__positions()
+
+    def length_of(self, task_id):
+        return self.lengths[self.__positions()[task_id]]
+
+    def positions_of(self, task_id):
+        """
+        Returns the positions of the word in a task, none if the task does not contain it
+        """
+        position = self.__positions().get(task_id)
+        if position is None:
+            return ()
+        start = self.__offsets()[position]
+        return self.positions[start:start + self.counts[position]]
+
+    def changed(self, removed, added):
+        """
+        Encodes the postings with tasks removed and added. The arrays are copied a slice at a time, so changing a few
+        tasks of a word many tasks contain stays quick
+        :param Iterable[int] removed: The ids of the tasks to remove
+        :param dict[int, (int, list[int])] added: The length and positions of the tasks to add
+        :return bytes or None: The postings, None if no task contains the word anymore
+        """
+        index = self.__positions()
+        offsets = self.__offsets()
+        columns = [array(typecode) for typecode in _Postings._TYPECODES]
+        task_ids, lengths, frequencies, counts, positions = columns
+        previous = 0
+        for position in sorted(index[task_id] for task_id in removed if task_id in index) + [len(self)]:
+            for column, values in zip(columns, (self.task_ids, self.lengths, self.frequencies, self.counts)):
+                column.extend(values[previous:position])
+            positions.extend(self.positions[offsets[previous]:offsets[position]])
+            previous = position + 1
+        for task_id, (length, word_positions) in added.items():
+            task_ids.append(task_id)
+            lengths.append(length)
+            frequencies.append(_frequency(word_positions))
+            counts.append(len(word_positions))
+            positions.extend(word_positions)
+        return marshal.dumps(tuple(column.tobytes() for column in columns)) if task_ids else None
+
+    def __positions(self):
+        if self.__index is None:
+            self.__index = dict(zip(self.task_ids, range(len(self.task_ids))))
+        return self.__index
+
+    def __offsets(self):
+        if self.__starts is None:
+            self.__starts = list(itertools.accumulate(self.counts, initial=0))
+        return self.__starts
+
+
+def _frequency(positions):
+    """
+    Returns the number of times a word appears in a task, weighted like its length, from its positions in increasing
+    order
+    """
+    in_name = bisect_left(positions, _DESCRIPTION)
+    return NAME_WEIGHT * in_name + len(positions) - in_name
+
+
+def _stamp(stat):
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,66 @@
+from taskmn.exceptions import SortError
+
+"""
+This module parses the sort specs of "taskmn list --sort", which order tasks by several fields in turn:
+
+    priority,deadline,-created
+
+Tasks are ordered by the first field, tasks equal in it by the second field, and so on. Tasks equal in every field
+keep the order they were loaded in. Each field sorts in its usual direction, priority from high to low and the others
+from small to large, with tasks without a deadline first and completed tasks last. A leading - reverses a field
+
+    key, id                     The id of the task
+    created, deadline           The creation time and the deadline
+    priority, completed         The priority and whether the task is completed
+
+Constants
+
+FIELDS : dict[str, str]
+    The TaskColumns column of each field name
+
+Classes
+
+SortSpec
+"""
+FIELDS = {"key": "ID", "id": "ID", "created": "Created", "deadline": "Deadline", "priority": "Priority",
+          "completed": "Completed"}
+_DESCENDING = ("Priority",)  # Columns sorted from largest to smallest unless reversed
+
+
+class SortSpec:
+    """
+    A parsed sort spec
+
+    Attributes:
+        spec : str The spec the keys were parsed from
+        keys : tuple[(str, bool)] The TaskColumns column of each field in order, and True if it sorts from largest to
+            smallest
+    """
+
+    def __init__(self, spec):
+        """
+        :param str spec: The sort spec
+        :exception SortError: The spec is not valid
+        """
+        self.spec = spec
+        self.keys = _parse(spec)
+
+
+def _parse(spec):
+    """
+    Returns the keys of a sort spec
+    """
+    keys = []
+    for field in spec.split(","):
+        field = field.strip()
+        reverse = field.startswith("-")
+        name = field[1:].strip().lower() if reverse else field.lower()
+        if not name:
+            raise SortError(spec, "A field is missing" if spec.strip() else "The spec is empty")
+        column = FIELDS.get(name)
+        if column is None:
+            raise SortError(spec, f"{name!r} is not a field, fields are {', '.join(FIELDS)}")
+        if column in (key for key, _ in keys):
+            raise SortError(spec, f"{name} is sorted by twice")
+        keys.append((column, (column in _DESCENDING) != reverse))
+    return tuple(keys)
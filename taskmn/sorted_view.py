@@ -0,0 +1,142 @@
+import bisect
+
+from taskmn.task_columns import TaskColumns
+
+"""
+This module contains the sorted views of a TaskManager, which keep the ids of its tasks in the order of a sort while
+tasks are added, edited and deleted, so a sorted list is read without sorting
+
+Classes
+
+SortedView
+"""
+
+
+class SortedView:
+    """
+    The ids of a list of tasks in the order of TaskColumns sort keys. Each task has an entry of its sort values and a
+    sequence number, numbered in the order the tasks were given and added, which keeps equal tasks in that order as
+    TaskColumns.argsort_keys does. A change to a task moves its entry, found by bisection, instead of sorting again.
+    Inserting into and deleting from a list still moves the entries after it, which is a memmove rather than a
+    comparison per task
+
+    --------------
+
+    Static Properties
+
+    REBUILD_FRACTION : int
+        remove_many filters the whole view instead of deleting single entries when more than 1 / REBUILD_FRACTION of
+        the tasks are removed
+
+    ---------------
+
+    Attributes
+
+    keys : tuple[(str, bool)]
+        The sort keys, see TaskColumns.argsort_keys
+    ids : list[int]
+        The ids of the tasks in order, not to be changed
+
+    ---------------
+
+    Methods
+
+    add(Task || list[str])
+
+    update(Task || list[str])
+
+    remove(int)
+
+    remove_many(Iterable[int])
+
+    between(int, int) -> list[int]
+    """
+    REBUILD_FRACTION = 64
+
+    def __init__(self, keys, columns):
+        """
+        :param tuple[(str, bool)] keys: The sort keys
+        :param TaskColumns columns: The columns of the tasks, whose positions are the sequence numbers of the tasks
+        """
+        self.keys = tuple(keys)
+        order = columns.argsort_keys(self.keys)
+        values = columns.sort_values(self.keys)
+        ids = columns.ids
+        self.__entries = [(values[position], position) for position in order]  # Sort values and sequence number
+        self.ids = list(map(ids.__getitem__, order))
+        self.__entry_of = {ids[position]: (values[position], position) for position in range(len(ids))}
+        self.__next = len(ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, task):
+        """
+        Adds a task after the tasks it is equal to
+        :param Task or list[string] task: The task, as a Task or a row in the form of Task.to_list()
+        """
+        task_id, values = self.__values(task)
+        entry = self.__entry_of[task_id] = (values, self.__next)
+        self.__next += 1
+        self.__insert(entry, task_id)
+
+    def update(self, task):
+        """
+        Moves a task which changed to its new place, it keeps its place among the tasks it is equal to
+        :param Task or list[string] task: The task, as a Task or a row in the form of Task.to_list()
+        """
+        task_id, values = self.__values(task)
+        entry = self.__entry_of[task_id]
+        if entry[0] == values:
+            return
+        self.__delete(entry)
+        entry = self.__entry_of[task_id] = (values, entry[1])
+        self.__insert(entry, task_id)
+
+    def remove(self, task_id):
+        """
+        Removes a task
+        :param int task_id: The id of the task
+        """
+        self.__delete(self.__entry_of.pop(task_id))
+
+    def remove_many(self, task_ids):
+        """
+        Removes several tasks, filtering the view once if they are many
+        :param Iterable[int] task_ids: The ids of the tasks
+        """
+        task_ids = set(task_ids)
+        if len(task_ids) * SortedView.REBUILD_FRACTION <= len(self.ids):
+            for task_id in task_ids:
+                self.remove(task_id)
+            return
+        kept = [index for index, task_id in enumerate(self.ids) if task_id not in task_ids]
+        self.__entries = list(map(self.__entries.__getitem__, kept))
+        self.ids = list(map(self.ids.__getitem__, kept))
+        for task_id in task_ids:
+            del self.__entry_of[task_id]
+
+    def between(self, low, high):
+        """
+        Returns the ids of the tasks whose value of the first sort key is in a range, found by bisection. The first
+        key must sort from smallest to largest
+        :param int low: The smallest value in the range
+        :param int high: The value after the largest value in the range
+        :return list[int]: The ids in order
+        """
+        start = bisect.bisect_left(self.__entries, ((low,),))  # Before every entry starting with low
+        return self.ids[start:bisect.bisect_left(self.__entries, ((high,),), start)]
+
+    def __values(self, task):
+        columns = TaskColumns([task])
+        return columns.ids[0], columns.sort_values(self.keys)[0]
+
+    def __insert(self, entry, task_id):
+        index = bisect.bisect_left(self.__entries, entry)
+        self.__entries.insert(index, entry)
+        self.ids.insert(index, task_id)
+
+    def __delete(self, entry):
+        index = bisect.bisect_left(self.__entries, entry)  # Entries are unique, their sequence numbers differ
+        del self.__entries[index]
+        del self.ids[index]
@@ -0,0 +1,217 @@
+import errno
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+from taskmn.exceptions import StoreWriteException, StoreReadException
+from taskmn.timestamps import to_text
+from taskmn.task_store import StoreBackend
+
+"""
+This Module contains a StoreBackend which keeps Tasks in an indexed SQLite database,
+so single tasks and sorted lists can be queried without loading the whole store
+
+Classes
+SQLiteTaskStore
+"""
+
+
+class SQLiteTaskStore(StoreBackend):
+    """
+    Class which manages the storage and loading of Tasks into a SQLite database.
+    Rows are exchanged in the same list[string] form as TaskStore
+
+    --------------
+
+    Static Properties
+
+    COLUMNS : dict[string, string]
+        Maps the names in TaskStore.DEFAULT_CSV_HEADER to the database columns
+
+    ---------------
+
+    Attributes
+
+    store_filename : str
+
+    ---------------
+
+    Methods
+
+    save(list[list[string]], string)
+
+    append(list[list[string]], string)
+
+    edit(int, list[list[string]], string)
+
+    edit_many(dict[int, list[string] || None], string)
+
+    load(string) -> (int, list[list[string]])
+
+    allocate_id(string, int) -> int
+
+    iter_rows(string) -> Iterator[list[string]]
+
+    load_row(int, string) -> list[string] || None
+
+    load_sorted(string, bool, string, int, int) -> list[list[string]]
+    """
+    indexed = True
+    COLUMNS = {'ID': 'id', 'Name': 'name', 'Description': 'description', 'Deadline': 'deadline',
+               'Priority': 'priority', 'Created': 'created', 'Completed': 'completed'}
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            deadline TEXT,
+            priority INTEGER NOT NULL,
+            created TEXT NOT NULL,
+            completed INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS tasks_deadline ON tasks (deadline, id);
+        CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (priority, id);
+        CREATE INDEX IF NOT EXISTS tasks_created ON tasks (created, id);
+        CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (completed, id);
+        CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    """
+    _SELECT = "SELECT id, name, description, deadline, priority, created, completed FROM tasks"
+
+    def save(self, data, filename=None):
+        filename = self._filename(filename)
+        try:
+            with closing(sqlite3.connect(filename)) as connection, connection:
+                connection.executescript(self._SCHEMA)
+                connection.execute("DELETE FROM tasks")
+                connection.execute("DELETE FROM metadata WHERE key = 'high_water_mark'")
+                connection.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                       [self._to_record(row) for row in data])
+        except sqlite3.Error:
+            raise StoreWriteException(Path(filename))
+
+    def append(self, data, filename=None):
+        filename = self._existing_filename(filename)
+        try:
+            with closing(sqlite3.connect(filename)) as connection, connection:
+                connection.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                       [self._to_record(row) for row in data])
+        except sqlite3.Error:
+            raise StoreWriteException(Path(filename))
+
+    def edit(self, task_id, data=None, filename=None):
+        filename = self._existing_filename(filename)
+        try:
+            with closing(sqlite3.connect(filename)) as connection, connection:
+                if data is None:
+                    connection.execute("DELETE FROM tasks WHERE id = ?", (int(task_id),))
+                else:
+                    record = self._to_record(data[0])
+                    connection.execute("UPDATE tasks SET id = ?, name = ?, description = ?, deadline = ?, "
+                                       "priority = ?, created = ?, completed = ? WHERE id = ?",
+                                       record + (int(task_id),))
+        except sqlite3.Error:
+            raise StoreWriteException(Path(filename))
+
+    def edit_many(self, changes, filename=None):
+        filename = self._existing_filename(filename)
+        try:
+            with closing(sqlite3.connect(filename)) as connection, connection:  # One transaction for every change
+                connection.executemany("DELETE FROM tasks WHERE id = ?",
+                                       [(int(task_id),) for task_id, row in changes.items() if row is None])
+                connection.executemany("UPDATE tasks SET id = ?, name = ?, description = ?, deadline = ?, "
+                                       "priority = ?, created = ?, completed = ? WHERE id = ?",
+                                       [self._to_record(row) + (int(task_id),) for task_id, row in changes.items()
+                                        if row is not None])
+        except sqlite3.Error:
+            raise StoreWriteException(Path(filename))
+
+    def load(self, filename=None):
+        rows = self._query(filename, self._SELECT + " ORDER BY id")
+        return (int(rows[-1][0]) if rows else 0), rows
+
+    def iter_rows(self, filename=None):
+        filename = self._existing_filename(filename)
+        try:
+            with closing(sqlite3.connect(filename)) as connection:
+                for record in connection.execute(self._SELECT + " ORDER BY id"):  # The cursor fetches rows as needed
+                    yield self._to_row(record)
+        except sqlite3.Error:
+            raise StoreReadException(Path(filename))
+
+    def allocate_id(self, filename=None, count=1):
+        """
+        Returns the first of count ids after the highest id allocated or stored, keeping it in the metadata table.
+        The highest stored id is read from the primary key's index
+        """
+        filename = self._existing_filename(filename)
+        try:
+            with closing(sqlite3.connect(filename)) as connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                with connection:
+                    connection.execute("BEGIN IMMEDIATE")  # Other processes allocate after this one
+                    last_id = connection.execute("SELECT MAX((SELECT IFNULL(MAX(id), 0) FROM tasks), (SELECT IFNULL("
+                                                 "MAX(value), 0) FROM metadata WHERE key = 'high_water_mark'))"
+                                                 ).fetchone()[0]
+                    connection.execute("INSERT OR REPLACE INTO metadata VALUES ('high_water_mark', ?)",
+                                       (last_id + count,))
+        except sqlite3.Error:
+            raise StoreWriteException(Path(filename))
+        return last_id + 1
+
+    def load_row(self, task_id, filename=None):
+        rows = self._query(filename, self._SELECT + " WHERE id = ?", (int(task_id),))
+        return rows[0] if rows else None
+
+    def load_sorted(self, column, reverse=False, filename=None, limit=None, offset=0):
+        """
+        Loads rows ordered by a column using its index. Missing deadlines sort first, as in TaskManager
+        :param string column: The name of the column in TaskStore.DEFAULT_CSV_HEADER to order by
+        :param bool reverse: Order from largest to smallest, ties are still ordered by increasing id
+        :param string filename: The store to load from
+        :param int or None limit: (optional) The most rows to return
+        :param int offset: (optional) The number of ordered rows to skip
+        :return list[list[string]]: The ordered rows
+        """
+        order = self.COLUMNS[column]
+        direction = 'DESC' if reverse else 'ASC'
+        if order == 'id':
+            sql = self._SELECT + f" ORDER BY id {direction}"
+        else:
+            sql = self._SELECT + f" ORDER BY {order} {direction}, id ASC"
+        return self._query(filename, sql + " LIMIT ? OFFSET ?", (-1 if limit is None else int(limit), int(offset)))
+
+    def _query(self, filename, sql, parameters=()):
+        filename = self._existing_filename(filename)
+        try:
+            with closing(sqlite3.connect(filename)) as connection:
+                return [self._to_row(record) for record in connection.execute(sql, parameters)]
+        except sqlite3.Error:  # Also raised when the file is not a task database
+            raise StoreReadException(Path(filename))
+
+    def _filename(self, filename):
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        return str(filename)
+
+    def _existing_filename(self, filename):
+        filename = self._filename(filename)
+        if not os.path.isfile(filename):  # sqlite3 would silently create an empty database
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        return filename
+
+    @staticmethod
+    def _to_record(row):
+        """
+        Converts a row in TaskStore form to the values of a database record, with times as text
+        """
+        return (int(row[0]), row[1], row[2], None if row[3] == 'None' else to_text(row[3]), int(row[4]),
+                to_text(row[5]), int(row[6]))
+
+    @staticmethod
+    def _to_row(record):
+        """
+        Converts a database record to a row in TaskStore form
+        """
+        return [str(record[0]), record[1], record[2], 'None' if record[3] is None else record[3], str(record[4]),
+                record[5], str(record[6])]
@@ -0,0 +1,170 @@
+import os
+import struct
+import time
+
+from taskmn.exceptions import StoreLockException
+
+try:
+    import fcntl
+except ImportError:  # No flock on this platform, writers are then not serialized
+    fcntl = None
+
+"""
+This Module contains the advisory lock which serializes the processes writing to a csv store,
+and the version number of the store kept in the lock file
+
+Classes
+StoreLock
+"""
+
+
+class StoreLock:
+    """
+    Class which holds an exclusive flock on a sidecar of a csv store while it is written, and counts the writes.
+
+    The lock file holds the version of the store, which every committed write increments. A process which remembers
+    the version its data was read at can tell whether another process wrote to the store since.
+    The lock is reentrant within a process, a write nested in another write reuses the held lock
+
+    --------------
+
+    Static Properties
+
+    SUFFIX : str
+    DEFAULT_TIMEOUT : float
+        Seconds to wait for the lock before giving up
+
+    ---------------
+
+    Attributes
+
+    store_filename : str
+    timeout : float
+    outermost : bool
+        True while this lock, and no enclosing one, holds the flock
+
+    ---------------
+
+    Methods
+
+    path(str) -> str
+
+    version() -> int
+
+    bump() -> int
+
+    held() -> bool
+
+    busy() -> bool
+    """
+    SUFFIX = ".lock"
+    DEFAULT_TIMEOUT = 10.0
+    _POLL_INTERVAL = 0.005
+    _VERSION = struct.Struct('<q')
+    _held = {}  # Lock file path -> [file descriptor, depth], for the locks this process holds
+
+    def __init__(self, store_filename, timeout=None):
+        self.store_filename = str(store_filename)
+        self.timeout = StoreLock.DEFAULT_TIMEOUT if timeout is None else timeout
+        self.outermost = False
+        self._path = os.path.abspath(StoreLock.path(self.store_filename))
+
+    @staticmethod
+    def path(store_filename):
+        """
+        Returns the path of the lock file belonging to a store
+        :param str store_filename: The csv store
+        :return str: The lock file path
+        """
+        return str(store_filename) + StoreLock.SUFFIX
+
+    def __enter__(self):
+        held = StoreLock._held.get(self._path)
+        if held is not None:
+            held[1] += 1
+            return self
+        descriptor = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._acquire(descriptor)
+        except BaseException:
+            os.close(descriptor)
+            raise
+        StoreLock._held[self._path] = [descriptor, 1]
+        self.outermost = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        held = StoreLock._held[self._path]
+        held[1] -= 1
+        if held[1] == 0:
+            del StoreLock._held[self._path]
+            self.outermost = False
+            os.close(held[0])  # Closing the descriptor releases the flock
+
+    def version(self):
+        """
+        Reads the version of the store, it does not need the lock to be held
+        :return int: The number of writes committed, 0 for a store which was never written under a lock
+        """
+        try:
+            with open(self._path, 'rb') as file:
+                data = file.read(StoreLock._VERSION.size)
+        except OSError:
+            return 0
+        return StoreLock._VERSION.unpack(data)[0] if len(data) == StoreLock._VERSION.size else 0
+
+    def bump(self):
+        """
+        Increments the version of the store, after a write has been committed. The lock must be held
+        :return int: The new version
+        """
+        version = self.version() + 1
+        descriptor = StoreLock._held[self._path][0]
+        os.lseek(descriptor, 0, os.SEEK_SET)
+        os.write(descriptor, StoreLock._VERSION.pack(version))  # A single small write, readers see all of it or none
+        return version
+
+    def held(self):
+        """
+        Returns True if this process holds the lock
+        :return bool: True while this process is writing to the store
+        """
+        return self._path in StoreLock._held
+
+    def busy(self):
+        """
+        Returns True if a process is writing to the store, without waiting for it
+        :return bool: True if the lock is held
+        """
+        if self.held():
+            return True
+        if fcntl is None:
+            return False
+        try:
+            descriptor = os.open(self._path, os.O_RDONLY)
+        except FileNotFoundError:  # Never locked
+            return False
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(descriptor)
+
+    def _acquire(self, descriptor):
+        """
+        Polls for the flock until the timeout has passed
+        :exception StoreLockException: Another process held the lock for longer than the timeout
+        """
+        if fcntl is None:
+            return
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise StoreLockException(self.store_filename, self.timeout)
+                time.sleep(StoreLock._POLL_INTERVAL)
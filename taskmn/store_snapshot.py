@@ -0,0 +1,291 @@
+import io
+import os
+import struct
+
+from taskmn.offset_index import OffsetIndex
+from taskmn.store_lock import StoreLock
+
+"""
+This Module contains the published generations of a csv store, which let readers read the store while it is being
+written without waiting for the writer and without seeing any of its changes before they are committed
+
+Classes
+StoreSnapshot
+PinnedStore
+"""
+
+
+class StoreSnapshot:
+    """
+    Class which describes the last committed generation of a csv store, kept in a sidecar file.
+
+    Writers only ever append to the store and its journal, replace them with os.replace, or patch rows in place when
+    the store has an offset index. A generation is therefore fully described by the files of the store and its journal
+    and their lengths: the bytes before those lengths do not change, except while a patch is in progress.
+    Writers publish a new snapshot as they commit, and mark the snapshot as patching before changing bytes in place.
+
+    --------------
+
+    Static Properties
+
+    SUFFIX : str
+
+    ---------------
+
+    Attributes
+
+    store_filename : str
+    generation : int
+        The StoreLock version of the store when it was published
+    patching : int
+        Counts the in place patches of the store, odd while a patch is in progress
+    store : (int, int, int)
+        The inode, size and modification time in ns of the store
+    journal : (int, int, int) or None
+        The inode, size and modification time in ns of the journal, None if there was no journal
+
+    ---------------
+
+    Methods
+
+    path(str) -> str
+
+    read(str) -> StoreSnapshot || None
+
+    publish(str, str, int)
+
+    begin_patch(str)
+
+    pin(str, str) -> PinnedStore || None
+    """
+    SUFFIX = ".snapshot"
+    _FORMAT = struct.Struct('<4sqqqqqqqq')  # magic, generation, patching, store and journal inode, size and mtime in ns
+    _MAGIC = b'TMS1'
+    _NO_FILE = (-1, -1, -1)
+
+    def __init__(self, store_filename, generation, patching, store, journal):
+        self.store_filename = str(store_filename)
+        self.generation = generation
+        self.patching = patching
+        self.store = store
+        self.journal = journal
+
+    @staticmethod
+    def path(store_filename):
+        """
+        Returns the path of the snapshot belonging to a store
+        :param str store_filename: The csv store
+        :return str: The snapshot file path
+        """
+        return str(store_filename) + StoreSnapshot.SUFFIX
+
+    @classmethod
+    def read(cls, store_filename):
+        """
+        Reads the snapshot of a store
+        :param str store_filename: The csv store
+        :return StoreSnapshot or None: The last published generation, None if none was published
+        """
+        try:
+            with open(StoreSnapshot.path(store_filename), 'rb') as file:
+                data = file.read(cls._FORMAT.size)
+        except OSError:
+            return None
+        if len(data) != cls._FORMAT.size:
+            return None
+        magic, generation, patching, *files = cls._FORMAT.unpack(data)
+        if magic != cls._MAGIC:
+            return None
+        journal = tuple(files[3:])
+        return cls(store_filename, generation, patching, tuple(files[:3]), None if journal == cls._NO_FILE else journal)
+
+    @classmethod
+    def publish(cls, store_filename, journal_filename, generation):
+        """
+        Publishes the current files of a store as a committed generation. The StoreLock of the store must be held
+        :param str store_filename: The csv store
+        :param str journal_filename: The journal of the store
+        :param int generation: The version of the store
+        """
+        previous = cls.read(store_filename)
+        patching = 0 if previous is None else previous.patching + previous.patching % 2  # A patch is now committed
+        cls(store_filename, generation, patching, _stamp(store_filename), _stamp(journal_filename))._write()
+
+    @classmethod
+    def begin_patch(cls, store_filename):
+        """
+        Marks the published generation as being patched in place, so readers of it retry once the patch is committed.
+        The StoreLock of the store must be held
+        :param str store_filename: The csv store
+        """
+        snapshot = cls.read(store_filename)
+        if snapshot is not None and snapshot.patching % 2 == 0:
+            snapshot.patching += 1
+            snapshot._write()
+
+    @classmethod
+    def pin(cls, store_filename, journal_filename):
+        """
+        Opens the files of the last committed generation of a store. Stores without a snapshot, or changed by
+        something other than a writer, and stores this process is writing, are opened as they are
+        :param str store_filename: The csv store
+        :param str journal_filename: The journal of the store
+        :return PinnedStore or None: The opened files, None if a writer replaced them while they were opened
+        :exception FileNotFoundError: The store does not exist
+        """
+        store = open(store_filename, 'rb')  # Opened before the snapshot is read, so their inodes can not be reused
+        try:
+            journal = open(journal_filename, 'rb')
+        except FileNotFoundError:
+            journal = None
+        pinned = PinnedStore(store, journal)
+        try:
+            lock = StoreLock(store_filename)
+            if lock.held():  # Reading the changes this process is writing
+                return pinned
+            snapshot = cls.read(store_filename)
+            store_stat = _stamp(store.fileno())
+            journal_stat = None if journal is None else _stamp(journal.fileno())
+            if snapshot is None:  # Never published
+                return pinned
+            if not snapshot._current(store_stat, journal_stat) and not lock.busy():
+                latest = cls.read(store_filename)
+                if latest is not None and latest.generation == snapshot.generation:  # Edited by hand since
+                    return pinned
+                pinned.close()  # A writer committed while the files were opened
+                return None
+            if snapshot.patching % 2 or not snapshot._describes(store_stat, journal_stat):
+                pinned.close()
+                return None
+            pinned.snapshot = snapshot
+            pinned.store_size = snapshot.store[1]
+            if snapshot.journal is None and journal is not None:  # Created after the generation
+                journal.close()
+                pinned.journal = None
+            elif journal is not None:
+                pinned.journal_size = snapshot.journal[1]
+            return pinned
+        except BaseException:
+            pinned.close()
+            raise
+
+    def _current(self, store_stat, journal_stat):
+        """
+        Returns True if the files are exactly as they were published
+        """
+        return self.store == store_stat and self.journal == journal_stat
+
+    def _describes(self, store_stat, journal_stat):
+        """
+        Returns True if the files are those of the snapshot, possibly with uncommitted bytes appended
+        """
+        if store_stat[0] != self.store[0] or store_stat[1] < self.store[1]:
+            return False
+        if self.journal is None:
+            return True
+        return journal_stat is not None and journal_stat[0] == self.journal[0] and journal_stat[1] >= self.journal[1]
+
+    def _write(self):
+        path = StoreSnapshot.path(self.store_filename)
+        temp_path = path + ".new"  # Only written under the StoreLock
+        with open(temp_path, 'wb') as file:
+            file.write(self._FORMAT.pack(self._MAGIC, self.generation, self.patching, *self.store,
+                                         *(self._NO_FILE if self.journal is None else self.journal)))
+        os.replace(temp_path, path)
+
+
+class PinnedStore:
+    """
+    The opened files of a store generation, read no further than the lengths the generation had
+
+    Attributes:
+        store : BinaryIO The store file
+        journal : BinaryIO or None The journal file, None if the generation has no journal
+        store_size : int or None The committed length of the store, None to read all of it
+        journal_size : int or None The committed length of the journal, None to read all of it
+        snapshot : StoreSnapshot or None The pinned generation, None if the files are read as they are
+
+    Methods:
+
+        store_text() -> TextIO
+        journal_text() -> TextIO
+        unchanged() -> bool
+        close() -> None
+    """
+
+    def __init__(self, store, journal):
+        self.store = store
+        self.journal = journal
+        self.store_size = None
+        self.journal_size = None
+        self.snapshot = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def store_text(self):
+        """
+        Returns the committed text of the store, to be read with csv.reader
+        :return TextIO: The store from its start
+        """
+        return _text(self.store, self.store_size)
+
+    def journal_text(self):
+        """
+        Returns the committed text of the journal, to be read with csv.reader
+        :return TextIO: The journal from its start
+        """
+        return _text(self.journal, self.journal_size)
+
+    def unchanged(self):
+        """
+        Returns True if no patch changed the pinned generation in place while it was read
+        :return bool: False if what was read may be torn and has to be read again
+        """
+        if self.snapshot is None:
+            return True
+        latest = StoreSnapshot.read(self.snapshot.store_filename)
+        return latest is not None and latest.patching == self.snapshot.patching
+
+    def close(self):
+        self.store.close()
+        if self.journal is not None:
+            self.journal.close()
+
+
+class _Bounded(io.RawIOBase):
+    """
+    Reads a binary file up to a length
+    """
+    def __init__(self, file, size):
+        self.file = file
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        with memoryview(buffer) as view:
+            count = self.file.readinto(view[:min(len(view), self.remaining)])
+        self.remaining -= count
+        return count
+
+
+def _text(file, size):
+    file.seek(0)
+    raw = file if size is None else io.BufferedReader(_Bounded(file, size))
+    return io.TextIOWrapper(raw, encoding=OffsetIndex.ENCODING, newline='')
+
+
+def _stamp(file):
+    """
+    Returns the inode, size and modification time of a file, given by path or descriptor
+    """
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
@@ -1,8 +1,11 @@
 from datetime import datetime
 
+from taskmn import timestamps
 from taskmn.exceptions import DateException, TaskNameError
 from taskmn.priority import Priority
 
+_STORED_PRIORITIES = {str(priority.value): priority for priority in Priority}  # Priority(int(value)) without parsing
+
 
 class Task:
     """
@@ -30,8 +33,10 @@ class Task:
     Methods
 
     load_from_data(str, str || None, str || datetime || None, Priority || int || None, int, str || datetime, bool)->Task
+    _from_row(list[str]) -> Task
     """
     last_id = 0
+    __slots__ = ("__name", "__description", "__deadline", "__priority", "__completed", "__id", "__created")
 
     def __init__(self, name, description=None, deadline=None, priority=None):
         """
@@ -69,11 +74,29 @@ class Task:
         if isinstance(created, datetime):  # Just don't pass any abd type mmk
             task.__created = created
         else:
-            task.__created = datetime.strptime(created, '%Y-%m-%d %H:%M:%S.%f')
+            task.__created = timestamps.parse_input_time(created)
         task.completed = completed
         Task.last_id -= 1  # As this should be an already existing task we do not need to update the last id
         return task
 
+    @classmethod
+    def _from_row(cls, row):
+        """
+        Creates a task from a row in the form of to_list(), such as those stored by TaskStore. The row is trusted,
+        the setters and their validation are skipped. Use load_from_data for anything else
+        :param list[str] row: The stored row
+        :return Task: Task object made from the row
+        """
+        task = cls.__new__(cls)
+        task.__id = int(row[0])
+        task.__name = row[1]
+        task.__description = row[2]
+        task.__deadline = None if row[3] == 'None' else timestamps.parse_date(row[3])  # Only keep the date
+        task.__priority = _STORED_PRIORITIES[row[4]]
+        task.__created = timestamps.parse_time(row[5])
+        task.__completed = row[6] != '0'
+        return task
+
     @property
     def name(self):
         return self.__name
@@ -105,8 +128,7 @@ class Task:
             elif isinstance(new_deadline, datetime):
                 self.__deadline = new_deadline
             else:
-                new_deadline_list = new_deadline.split(" ")  # Ignore time section is there is one
-                self.__deadline = datetime.strptime(new_deadline_list[0], '%Y-%m-%d')
+                self.__deadline = timestamps.parse_input_date(new_deadline)  # Ignore time section is there is one
         except ValueError:  # Handle exception further up
             raise DateException(new_deadline)
 
@@ -0,0 +1,279 @@
+import bisect
+import heapq
+import itertools
+import operator
+from array import array
+
+from taskmn.timestamps import NO_DEADLINE, date_microseconds, time_microseconds, to_microseconds
+
+"""
+This module contains a columnar view of tasks, keeping the fields used to sort and filter in parallel arrays of
+integers. Sorting or filtering a column compares plain integers, without creating Tasks from stored rows or
+calling a Python function per comparison. Sorting by several columns builds one tuple of integers per task and
+sorts the tuples once
+
+Constants
+
+NO_DEADLINE : int
+    The value stored for tasks without a deadline, smaller than any deadline, from timestamps
+
+Classes
+
+TaskColumns
+"""
+
+
+class TaskColumns:
+    """
+    Parallel arrays of the sortable fields of a list of tasks, position i of every array holding the i-th task.
+    Each array is built the first time it is used, so a sort only converts the field it sorts by.
+    Times are stored as microseconds since 1970-01-01. The Name and Description columns are lists of strings.
+    A column may also be indexed, keeping its positions in sorted order so ranges of values are found by bisection.
+    The order of all the tasks by a list of sort keys is kept once computed, until a task is appended
+
+    Static Properties:
+        NAMES : tuple[str] The names of the integer columns, as in TaskStore.DEFAULT_CSV_HEADER
+
+    Properties:
+        ids : array[int] The ids of the tasks
+        deadlines : array[int] The deadlines of the tasks, NO_DEADLINE for tasks without one
+        created : array[int] The creation times of the tasks
+        priorities : array[int] The priority values of the tasks
+        completed : array[int] 1 for completed tasks, 0 otherwise
+
+    Methods:
+
+        append(Task || list[str]) -> None
+        column(str) -> array[int] || list[str]
+        index(str) -> (array[int], list[int])
+        range_positions(str, int, int) -> list[int]
+        count_range(str, int, int) -> int
+        argsort(str, bool, Iterable[int]) -> list[int]
+        select(str, bool, int, Iterable[int]) -> list[int]
+        argsort_keys(tuple[(str, bool)], Iterable[int]) -> list[int]
+        select_keys(tuple[(str, bool)], int, Iterable[int]) -> list[int]
+        sort_values(tuple[(str, bool)], list[int]) -> list[tuple[int]]
+        completed_positions() -> list[int]
+    """
+
+    NAMES = ('ID', 'Deadline', 'Created', 'Priority', 'Completed')
+
+    def __init__(self, tasks=(), columns=None):
+        """
+        :param Iterable[Task or list[string]] tasks: The tasks, as Tasks or rows in the form of Task.to_list()
+        :param dict[str, array[int]] or None columns: Columns already built for the tasks, such as cached ones
+        """
+        self.__tasks = list(tasks)
+        self.__columns = {} if columns is None else dict(columns)
+        self.__indexes = {}
+        self.__orders = {}  # sort keys -> the positions of all the tasks in that order
+
+    def __len__(self):
+        return len(self.__tasks)
+
+    @property
+    def ids(self):
+        return self.column('ID')
+
+    @property
+    def deadlines(self):
+        return self.column('Deadline')
+
+    @property
+    def created(self):
+        return self.column('Created')
+
+    @property
+    def priorities(self):
+        return self.column('Priority')
+
+    @property
+    def completed(self):
+        return self.column('Completed')
+
+    def append(self, task):
+        """
+        Adds a task after the last position
+        :param Task or list[string] task: The task, as a Task or a row in the form of Task.to_list()
+        """
+        self.__tasks.append(task)
+        for name, values in self.__columns.items():
+            values.append(_FIELDS[name][1](task))
+        self.__indexes.clear()
+        self.__orders.clear()
+
+    def column(self, name):
+        """
+        Returns the array of a column
+        :param str name: The name of the column in TaskStore.DEFAULT_CSV_HEADER
+        :return array[int] or list[str]: The column, a list for the Name and Description columns
+        """
+        values = self.__columns.get(name)
+        if values is None:
+            typecode, convert = _FIELDS[name]
+            values = map(convert, self.__tasks)
+            values = self.__columns[name] = list(values) if typecode is None else array(typecode, values)
+        return values
+
+    def index(self, name):
+        """
+        Returns the index of an integer column, building it the first time it is used
+        :param str name: The name of the column in TaskStore.DEFAULT_CSV_HEADER
+        :return (array[int], list[int]): The values of the column in increasing order, and the position of each value
+        """
+        index = self.__indexes.get(name)
+        if index is None:
+            values = self.column(name)
+            order = self.argsort_keys(((name, False),))
+            index = self.__indexes[name] = (array(values.typecode, map(values.__getitem__, order)), order)
+        return index
+
+    def range_positions(self, name, low, high):
+        """
+        Returns the positions of the tasks whose value in an integer column is in a range, using its index
+        :param str name: The name of the column in TaskStore.DEFAULT_CSV_HEADER
+        :param int low: The smallest value in the range
+        :param int high: The value after the largest value in the range
+        :return list[int]: The positions ordered by their value
+        """
+        values, order = self.index(name)
+        return order[bisect.bisect_left(values, low):bisect.bisect_left(values, high)]
+
+    def count_range(self, name, low, high):
+        """
+        Returns the number of tasks whose value in an integer column is in a range, without listing them.
+        The index is used if it was built, otherwise the column is counted, which is quicker than building the index
+        :param str name: The name of the column in TaskStore.DEFAULT_CSV_HEADER
+        :param int low: The smallest value in the range
+        :param int high: The value after the largest value in the range
+        :return int: The number of tasks
+        """
+        if name not in self.__indexes:
+            return sum(map(range(low, high).__contains__, self.column(name)))
+        values = self.__indexes[name][0]
+        return max(0, bisect.bisect_left(values, high) - bisect.bisect_left(values, low))
+
+    def argsort(self, name, reverse=False, positions=None):
+        """
+        Returns the positions of the tasks ordered by a column. Equal values keep their order, as with sorted()
+        :param str name: The name of the column in TaskStore.DEFAULT_CSV_HEADER
+        :param bool reverse: Order from largest to smallest
+        :param Iterable[int] or None positions: (optional) Only order these positions, all positions if None
+        :return list[int]: The ordered positions
+        """
+        values = self.column(name)
+        return sorted(range(len(values)) if positions is None else positions, key=values.__getitem__,
+                      reverse=reverse)
+
+    def select(self, name, reverse, count, positions=None):
+        """
+        Returns the first positions of argsort(name, reverse) using a heap, without ordering the rest
+        :param str name: The name of the column in TaskStore.DEFAULT_CSV_HEADER
+        :param bool reverse: Order from largest to smallest
+        :param int count: The number of positions to return
+        :param Iterable[int] or None positions: (optional) Only select from these positions, all positions if None
+        :return list[int]: The ordered positions
+        """
+        values = self.column(name)
+        return (heapq.nlargest if reverse else heapq.nsmallest)(
+            count, range(len(values)) if positions is None else positions, key=values.__getitem__)
+
+    def argsort_keys(self, keys, positions=None):
+        """
+        Returns the positions of the tasks ordered by several columns, each task ordered by the first column it differs
+        in. Equal tasks keep their order, as with sorted(). The order of all positions is kept and returned again
+        until a task is appended, it must not be changed
+        :param tuple[(str, bool)] keys: The name of each column in TaskStore.DEFAULT_CSV_HEADER, and True to order it
+            from largest to smallest
+        :param Iterable[int] or None positions: (optional) Only order these positions, all positions if None
+        :return list[int]: The ordered positions
+        """
+        keys = tuple(keys)
+        if positions is not None:
+            return self.__argsort_keys(keys, list(positions))
+        order = self.__orders.get(keys)
+        if order is None:
+            order = self.__orders[keys] = self.__argsort_keys(keys, range(len(self)))
+        return order
+
+    def select_keys(self, keys, count, positions=None):
+        """
+        Returns the first positions of argsort_keys(keys) using a heap, without ordering the rest
+        :param tuple[(str, bool)] keys: The name of each column in TaskStore.DEFAULT_CSV_HEADER, and True to order it
+            from largest to smallest
+        :param int count: The number of positions to return
+        :param Iterable[int] or None positions: (optional) Only select from these positions, all positions if None
+        :return list[int]: The ordered positions
+        """
+        keys = tuple(keys)
+        if positions is None and keys in self.__orders:
+            return self.__orders[keys][:count]
+        if len(keys) == 1:
+            return self.select(keys[0][0], keys[0][1], count, positions)
+        positions = range(len(self)) if positions is None else list(positions)
+        values = self.sort_values(keys, positions)
+        return list(map(positions.__getitem__, heapq.nsmallest(count, range(len(positions)), key=values.__getitem__)))
+
+    def sort_values(self, keys, positions=None):
+        """
+        Returns the tuple of the values of the sort keys of each task, the values of keys ordered from largest to
+        smallest negated, so that the tuples of argsort_keys(keys) are in increasing order
+        :param tuple[(str, bool)] keys: The name of each column in TaskStore.DEFAULT_CSV_HEADER, and True to order it
+            from largest to smallest
+        :param list[int] or None positions: (optional) Only the tuples of these positions, all positions if None
+        :return list[tuple[int]]: The tuple of each position, in the order of the positions
+        """
+        positions = range(len(self)) if positions is None else positions
+        columns = []
+        for name, reverse in keys:
+            values = map(self.column(name).__getitem__, positions)
+            columns.append(map(operator.neg, values) if reverse else values)
+        return list(zip(*columns))
+
+    def completed_positions(self):
+        """
+        Returns the positions of the completed tasks
+        :return list[int]: The positions in increasing order
+        """
+        return list(itertools.compress(range(len(self)), self.completed))
+
+    def __argsort_keys(self, keys, positions):
+        if len(keys) == 1:  # Plain integers compare faster than tuples of one
+            return self.argsort(keys[0][0], keys[0][1], positions)
+        values = self.sort_values(keys, positions)
+        return list(map(positions.__getitem__, sorted(range(len(positions)), key=values.__getitem__)))
+
+
+# Fields are read from stored rows without creating their Task
+def _id(task):
+    return int(task[0]) if isinstance(task, list) else task.id
+
+
+def _name(task):
+    return task[1] if isinstance(task, list) else task.name
+
+
+def _description(task):
+    return task[2] if isinstance(task, list) else str(task.description)
+
+
+def _deadline(task):
+    if isinstance(task, list):  # Tasks only keep the date of a stored deadline
+        return date_microseconds(task[3])
+    return NO_DEADLINE if task.deadline is None else to_microseconds(task.deadline)
+
+
+def _created(task):
+    return time_microseconds(task[5]) if isinstance(task, list) else to_microseconds(task.created)
+
+
+def _priority(task):
+    return int(task[4]) if isinstance(task, list) else task.priority.value
+
+
+def _completed(task):
+    return int(task[6]) if isinstance(task, list) else int(task.completed)
+
+
+_FIELDS = {'ID': ('q', _id), 'Deadline': ('q', _deadline), 'Created': ('q', _created), 'Priority': ('b', _priority),
+           'Completed': ('b', _completed), 'Name': (None, _name), 'Description': (None, _description)}
@@ -0,0 +1,335 @@
+import datetime
+import itertools
+import re
+
+from taskmn import timestamps
+from taskmn.exceptions import FilterError
+from taskmn.priority import Priority
+from taskmn.task_columns import TaskColumns
+from taskmn.timestamps import NO_DEADLINE
+
+"""
+This module compiles the filter expressions of "taskmn list --where" into predicates over TaskColumns.
+
+An expression combines conditions with and, or, not and parentheses. A condition compares a field with a value:
+
+    priority>=high and not completed and deadline<2026-11-01
+    name~report or (description~"quarterly report" and created>=2026-01-01)
+    deadline=none
+
+    id, priority                The operators = != < <= > >=, priorities are low, normal, high or 0 to 2
+    deadline, created           The same operators, with dates as YYYY-MM-DD, today or now. A date compared with a
+                                creation time stands for the whole day. Tasks without a deadline only match
+                                deadline=none and deadline!=none
+    completed                   On its own, or = and != with yes, no, true, false, 1 or 0
+    name, description           ~ for text contained in the field ignoring case, = and != for the whole field
+
+Conditions on the integer fields are answered from the sorted indexes of TaskColumns. Of the conditions joined by
+and, only the one matching the fewest tasks is looked up, and the others are only checked for the tasks it found
+
+Classes
+
+TaskFilter
+"""
+_TOKEN = re.compile(r"""\s*(?:(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(?P<operator><=|>=|!=|==|=|<|>|~|\(|\))"""
+                    r"""|(?P<word>[^\s()<>=!~"']+))""")
+_FIELDS = {"id": "ID", "name": "Name", "description": "Description", "deadline": "Deadline", "created": "Created",
+           "priority": "Priority", "completed": "Completed"}
+_TEXT_FIELDS = ("Name", "Description")
+_ORDERING = ("<", "<=", ">", ">=")
+_SMALLEST = -(1 << 63)
+_LARGEST = 1 << 63
+_DAY = 86_400_000_000  # Microseconds
+_BOOLEANS = {"yes": 1, "true": 1, "1": 1, "no": 0, "false": 0, "0": 0}
+
+
+class TaskFilter:
+    """
+    A compiled filter expression
+
+    Attributes:
+        expression : str The expression the filter was compiled from
+
+    Methods:
+
+        positions(TaskColumns) -> list[int]
+        matches(Task || list[str]) -> bool
+    """
+
+    def __init__(self, expression):
+        """
+        :param str expression: The filter expression
+        :exception FilterError: The expression is not valid
+        """
+        self.expression = expression
+        self.__root = _Parser(expression).parse()
+
+    def positions(self, columns):
+        """
+        Returns the positions of the tasks matching the filter
+        :param TaskColumns columns: The columns of the tasks
+        :return list[int]: The positions in increasing order
+        """
+        return sorted(self.__root.positions(columns))
+
+    def matches(self, task):
+        """
+        Returns True if a single task matches the filter
+        :param Task or list[string] task: The task, as a Task or a row in the form of Task.to_list()
+        :return bool: True if it matches
+        """
+        return bool(self.__root.positions(TaskColumns([task])))
+
+
+class _Range:
+    """
+    A condition on an integer column, met by the values in any of its half open ranges
+    """
+
+    def __init__(self, column, ranges):
+        self.column = column
+        self.ranges = [(low, high) for low, high in ranges if low < high]
+
+    def count(self, columns):
+        return sum(columns.count_range(self.column, low, high) for low, high in self.ranges)
+
+    def positions(self, columns):
+        return set(itertools.chain.from_iterable(columns.range_positions(self.column, low, high)
+                                                 for low, high in self.ranges))
+
+    def test(self, columns):
+        values = columns.column(self.column)
+        ranges = [range(low, high) for low, high in self.ranges]  # Membership of a range is a pair of comparisons
+        if len(ranges) == 1:
+            return lambda position: values[position] in ranges[0]
+        return lambda position: any(values[position] in values_range for values_range in ranges)
+
+
+class _Text:
+    """
+    A condition on a text column, which is checked for every task
+    """
+
+    def __init__(self, column, operator, text):
+        self.column = column
+        self.operator = operator
+        self.text = text.casefold()
+
+    def count(self, columns):
+        return len(columns)
+
+    def positions(self, columns):
+        return set(itertools.compress(range(len(columns)), map(self._matches, columns.column(self.column))))
+
+    def test(self, columns):
+        values = columns.column(self.column)
+        return lambda position: self._matches(values[position])
+
+    def _matches(self, value):
+        if self.operator == "~":
+            return self.text in value.casefold()
+        return (value.casefold() == self.text) == (self.operator == "=")
+
+
+class _And:
+    def __init__(self, conditions):
+        self.conditions = conditions
+
+    def count(self, columns):
+        return min(condition.count(columns) for condition in self.conditions)
+
+    def positions(self, columns):
+        conditions = sorted(self.conditions, key=lambda condition: condition.count(columns))
+        tests = [condition.test(columns) for condition in conditions[1:]]
+        return {position for position in conditions[0].positions(columns) if all(test(position) for test in tests)}
+
+    def test(self, columns):
+        tests = [condition.test(columns) for condition in self.conditions]
+        return lambda position: all(test(position) for test in tests)
+
+
+class _Or:
+    def __init__(self, conditions):
+        self.conditions = conditions
+
+    def count(self, columns):
+        return min(len(columns), sum(condition.count(columns) for condition in self.conditions))
+
+    def positions(self, columns):
+        return set().union(*(condition.positions(columns) for condition in self.conditions))
+
+    def test(self, columns):
+        tests = [condition.test(columns) for condition in self.conditions]
+        return lambda position: any(test(position) for test in tests)
+
+
+class _Not:
+    def __init__(self, condition):
+        self.condition = condition
+
+    def count(self, columns):
+        return len(columns) - self.condition.count(columns)
+
+    def positions(self, columns):
+        return set(range(len(columns))).difference(self.condition.positions(columns))
+
+    def test(self, columns):
+        test = self.condition.test(columns)
+        return lambda position: not test(position)
+
+
+class _Parser:
+    """
+    Parses an expression by recursive descent, or binding looser than and, and looser than not
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = _TOKEN.match(expression, position)
+            if match is None or match.end() == position:
+                raise FilterError(self.expression, f"Unexpected text at {expression[position:].strip()!r}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "string":
+                value = re.sub(r"\\(.)", r"\1", value[1:-1])
+            self.tokens.append((kind, value))
+            position = match.end()
+        self.position = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise FilterError(self.expression, "The expression is empty")
+        condition = self._or()
+        if self.position < len(self.tokens):
+            raise FilterError(self.expression, f"Unexpected {self.tokens[self.position][1]!r}")
+        return condition
+
+    def _or(self):
+        conditions = [self._and()]
+        while self._accept_word("or"):
+            conditions.append(self._and())
+        return conditions[0] if len(conditions) == 1 else _Or(conditions)
+
+    def _and(self):
+        conditions = [self._not()]
+        while self._accept_word("and"):
+            conditions.append(self._not())
+        return conditions[0] if len(conditions) == 1 else _And(conditions)
+
+    def _not(self):
+        if self._accept_word("not"):
+            return _Not(self._not())
+        if self._accept("operator", "("):
+            condition = self._or()
+            if not self._accept("operator", ")"):
+                raise FilterError(self.expression, "A parenthesis is not closed")
+            return condition
+        return self._condition()
+
+    def _condition(self):
+        kind, word = self._next("a field")
+        field = _FIELDS.get(word.lower()) if kind == "word" else None
+        if field is None:
+            raise FilterError(self.expression, f"{word!r} is not a field, fields are {', '.join(_FIELDS)}")
+        operator = self._peek_operator()
+        if operator is None:
+            if field != "Completed":
+                raise FilterError(self.expression, f"{word} needs an operator and a value")
+            return _Range(field, [(1, 2)])
+        self.position += 1
+        operator = "=" if operator == "==" else operator
+        value = self._next(f"a value for {word}")[1]
+        if field in _TEXT_FIELDS:
+            if operator in _ORDERING:
+                raise FilterError(self.expression, f"{word} can only be compared with ~, = and !=")
+            return _Text(field, operator, value)
+        if operator == "~":
+            raise FilterError(self.expression, "~ only applies to name and description")
+        low, high = self._interval(field, word, operator, value)
+        return _Range(field, _compare(operator, low, high, field == "Deadline"))
+
+    def _interval(self, field, word, operator, value):
+        """
+        Returns the range of column values a value of a field stands for
+        """
+        lowered = value.lower()
+        try:
+            if field == "ID":
+                number = int(value)
+                return number, number + 1
+            if field == "Priority":
+                number = Priority[value.upper()].value if value.upper() in Priority.__members__ else int(value)
+                if number not in (0, 1, 2):
+                    raise ValueError(value)
+                return number, number + 1
+            if field == "Completed":
+                if operator in _ORDERING:
+                    raise FilterError(self.expression, f"{word} can only be compared with = and !=")
+                number = _BOOLEANS[lowered]
+                return number, number + 1
+            if field == "Deadline" and lowered == "none":
+                if operator in _ORDERING:
+                    raise FilterError(self.expression, f"{word} can only be compared with none using = and !=")
+                return NO_DEADLINE, NO_DEADLINE + 1
+            if lowered == "now":
+                now = timestamps.to_microseconds(datetime.datetime.now())
+                return now, now + 1
+            if lowered == "today":
+                start = timestamps.to_microseconds(datetime.datetime.combine(datetime.date.today(), datetime.time()))
+                return start, start + _DAY
+            if field == "Created" and " " in value.strip():
+                start = timestamps.to_microseconds(timestamps.parse_input_time(value.strip()))
+                return start, start + 1
+            start = timestamps.to_microseconds(timestamps.parse_input_date(value))
+            return start, start + _DAY
+        except (ValueError, KeyError):
+            raise FilterError(self.expression, f"{value!r} is not a valid value for {word}")
+
+    def _next(self, expected):
+        if self.position >= len(self.tokens):
+            raise FilterError(self.expression, f"Expected {expected} at the end")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _peek_operator(self):
+        if self.position < len(self.tokens):
+            kind, value = self.tokens[self.position]
+            if kind == "operator" and value not in "()":
+                return value
+        return None
+
+    def _accept(self, kind, value):
+        if self.position < len(self.tokens) and self.tokens[self.position] == (kind, value):
+            self.position += 1
+            return True
+        return False
+
+    def _accept_word(self, word):
+        if self.position < len(self.tokens) and self.tokens[self.position][0] == "word" and \
+                self.tokens[self.position][1].lower() == word:
+            self.position += 1
+            return True
+        return False
+
+
+def _compare(operator, low, high, deadline):
+    """
+    Returns the ranges of values which compare as asked with a value standing for the range [low, high)
+    """
+    smallest = NO_DEADLINE + 1 if deadline else _SMALLEST  # Tasks without a deadline are not ordered by it
+    if operator == "=":
+        return [(low, high)]
+    if operator == "!=":
+        return [(smallest, low), (high, _LARGEST)]
+    if operator == "<":
+        return [(smallest, low)]
+    if operator == "<=":
+        return [(smallest, high)]
+    if operator == ">":
+        return [(high, _LARGEST)]
+    return [(low, _LARGEST)]
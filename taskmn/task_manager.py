@@ -1,10 +1,20 @@
 import datetime
-import operator
+import functools
+import random
+import time
 from enum import Enum
 
-from taskmn.exceptions import TaskIDError
+from taskmn import profiling
+from taskmn.exceptions import StoreConflictException, TaskIDError
+from taskmn.search_index import parse_query
+from taskmn.sort_spec import SortSpec
+from taskmn.sorted_view import SortedView
+from taskmn.store_lock import StoreLock
 from taskmn.task import Task
-from taskmn.task_store import TaskStore
+from taskmn.task_columns import TaskColumns
+from taskmn.task_filter import TaskFilter
+from taskmn.task_store import TaskStore, open_store
+from taskmn.timestamps import NO_DEADLINE, to_microseconds
 
 """
 Module contains a task which controls and manages Task objects
@@ -27,6 +37,53 @@ class SortType(Enum):
     PRIORITY = 3
 
 
+SORT_COLUMNS = {SortType.KEY: 'ID', SortType.DATE: 'Created', SortType.DEADLINE: 'Deadline',
+                SortType.PRIORITY: 'Priority'}
+CONFLICT_BACKOFF = 0.002  # Seconds waited at most before the first redo of a conflicting write, doubled per conflict
+CONFLICT_BACKOFF_LIMIT = 0.1
+_LATEST = 1 << 63  # After every deadline
+
+
+def _retrying(method):
+    """
+    Redoes a TaskManager write on the tasks as they are now stored when another process wrote to the store after
+    the manager read it, so the write is not based on outdated tasks. Writers which keep conflicting wait a random,
+    growing time before redoing it, and give up once the lock timeout of the store has passed
+    """
+    @functools.wraps(method)
+    def retrying(self, *args, **kwargs):
+        deadline = time.monotonic() + self._lock_timeout
+        backoff = CONFLICT_BACKOFF
+        while True:
+            try:
+                return method(self, *args, **kwargs)
+            except StoreConflictException:
+                if time.monotonic() >= deadline:
+                    raise
+            time.sleep(random.uniform(0, backoff))  # Spread out, so the writers do not collide again
+            backoff = min(backoff * 2, CONFLICT_BACKOFF_LIMIT)
+            self._reload()
+    return retrying
+
+
+def _sort_keys(sort, reverse):
+    """
+    Returns the TaskColumns sort keys of a sort. Priority sorts high to low on default, reverse flips every key
+    :param SortType or int or str or SortSpec sort: The sort, a spec such as "priority,deadline,-created" if a string
+    :param bool reverse: Reverses the sort
+    :return tuple[(str, bool)]: The column of each key and whether it sorts from largest to smallest
+    :exception SortError: The sort spec is not valid
+    """
+    if isinstance(sort, str):
+        sort = SortSpec(sort)
+    if isinstance(sort, SortSpec):
+        keys = sort.keys
+    else:
+        sort = SortType(sort)
+        keys = ((SORT_COLUMNS[sort], sort == SortType.PRIORITY),)
+    return tuple((column, descending != reverse) for column, descending in keys)
+
+
 # Depreciated
 # def create_taskmanager_metadata():
 #   return [Task.last_id, str(datetime.datetime.now())]
@@ -37,31 +94,53 @@ class TaskManager:
     A class used to manage a list of Task objects
 
     Properties:
-        __tasks : List<Task> A list object which stores all the tasks
-        __store : TaskStore Object that manages storage and loading
+        __tasks : dict<int, Task || list[string]> Stores all the tasks keyed by id, in the order they were added or
+            loaded. After a lazy load a value stays the stored row until the task is first accessed
+        __store : StoreBackend Object that manages storage and loading
+        __loaded : bool True once the whole store has been loaded into __tasks
+        __columns : TaskColumns or None The sortable fields of __tasks in the same order, built when first needed
+        __views : dict[tuple[(str, bool)], SortedView] or None The SortedView of each sort read since the store was
+            loaded, kept in order as tasks change. None unless sorted_views is set
+        _lock_timeout : float Seconds a write conflicting with other processes is redone for
+        indexed : bool True if single tasks and sorted lists can be queried from the store without loading it
 
     Methods:
 
         show_all_tasks() -> None
         get_task(int) -> Task
-        get_tasks(SortType, bool) -> list
+        get_tasks(SortType || str || SortSpec, bool, str || TaskFilter) -> list
+        iter_tasks(SortType || str || SortSpec, bool, int, int, str || TaskFilter) -> Iterator[Task]
+        search(str, int) -> list[Task]
+        due(timedelta, int, bool) -> list[Task]
         delete_old_tasks() -> None
         delete_completed_tasks() -> None
         add_task(str, str, datetime || str, Priority || int) -> None
         edit_task(int, str, str,  datetime || str, Priority || int) -> None
         mark_complete(int) -> None
+        edit_tasks(list[int], str, str, datetime || str, Priority || int) -> list[Task]
+        delete_tasks(list[int]) -> None
+        toggle_completions(list[int]) -> list[Task]
         to_list() -> None
         save_to_file(string) -> None
         load_from_file(str || Path) -> None
     """
 
-    def __init__(self, tasks=None, loadfile=TaskStore.DEFAULT_TASK_STORE_PATH):
+    def __init__(self, tasks=None, loadfile=TaskStore.DEFAULT_TASK_STORE_PATH, journaled=False, offset_index=False,
+                 lock_timeout=None, epoch_times=False, parse_cache=False, sorted_views=False):
         self.loadfile = str(loadfile)
+        self._lock_timeout = StoreLock.DEFAULT_TIMEOUT if lock_timeout is None else lock_timeout
         if tasks is not None:
-            self.__tasks = tasks
+            self.__tasks = {task.id: task for task in tasks}
         else:
-            self.__tasks = []
-            self.__store = TaskStore(loadfile)
+            self.__tasks = {}
+            self.__store = open_store(loadfile, journaled, offset_index, lock_timeout, epoch_times, parse_cache)
+        self.__loaded = tasks is not None  # Provided tasks are used instead of a store
+        self.__columns = None
+        self.__views = {} if sorted_views else None  # For long-lived managers, which sort the same tasks repeatedly
+
+    @property
+    def indexed(self):
+        return self.__store.indexed
 
     def show_all_tasks(self):
         """
@@ -71,58 +150,205 @@ class TaskManager:
 
     def __str__(self):
         string = ''
-        for task in self.__tasks:
+        for task in self.__all_tasks():
             string += (str(task) + '\n')
         return string
 
     def get_task(self, task_id):
         """
-        Given an id returns the associated Task object
+        Given an id returns the associated Task object.
+        If the store is indexed and has not been loaded the task is queried from the store
 
         :param int task_id: (int) The id of the task to get
         :return: (Task) The task the user entered the id for
         :exception TaskIDError: raises TaskIDError if task's id does not exist in __tasks
         """
-        for task in self.__tasks:
-            if task.id == task_id:
+        task = self.__tasks.get(task_id)
+        if isinstance(task, list):  # Lazily loaded, build the Task on first access
+            task = self.__tasks[task_id] = self._task_from_row(task)
+        if task is not None:
+            return task
+        if not self.__loaded and self.indexed:
+            row = self.__store.load_row(task_id)
+            if row is not None:
+                task = self._task_from_row(row)
+                self.__tasks[task.id] = task
+                self.__columns = None
                 return task
-        raise TaskIDError(f"Task (id = {task_id}) does not exist")
+        raise TaskIDError(f"Task (id = {task_id}) does not exist", [task_id])
 
-    def get_tasks(self, sort: SortType = SortType.KEY, reverse: bool = False) -> list:
+    def get_tasks(self, sort: SortType = SortType.KEY, reverse: bool = False, where=None) -> list:
         """
-        Returns a list containing all stored Tasks. Optional parameters can be used to sort the produced list
+        Returns a list containing all stored Tasks. Optional parameters can be used to sort and filter the produced list
+        The order of all the tasks is kept until the tasks change, so sorting them the same way again is free
 
-        :param SortType or int sort: (optional) Provide a SortType to change the sorting method. Default is by ID
+        :param SortType or int or str or SortSpec sort: (optional) Provide a SortType to change the sorting method, or
+            a sort spec to sort by several fields, see sort_spec. Default is by ID
         :param bool reverse: (optional) reverses the sort method:
+        :param str or TaskFilter where: (optional) Only return the tasks matching a filter expression, see task_filter
         :return: Returns all stored tasks in list form
+        :exception FilterError: The filter expression is not valid
+        :exception SortError: The sort spec is not valid
         """
-        if SortType(sort) == SortType.KEY:
-            return sorted(self.__tasks, key=operator.attrgetter('id'), reverse=reverse)
-        elif SortType(sort) == SortType.DATE:
-            return sorted(self.__tasks, key=operator.attrgetter('created'), reverse=reverse)
-        elif SortType(sort) == SortType.DEADLINE:  # If deadline is None compare the smallest value we can get
-            return sorted(self.__tasks,
-                          key=lambda task: task.deadline or datetime.datetime(datetime.MINYEAR, 1, 1),
-                          reverse=reverse)
-        elif SortType(sort) == SortType.PRIORITY:  # Priority wll sort high to low on default because it seems better
-            return sorted(self.__tasks, key=operator.attrgetter('priority'), reverse=not reverse)
-        else:
-            return self.__tasks
-
+        keys = _sort_keys(sort, reverse)
+        if where is not None:
+            where = where if isinstance(where, TaskFilter) else TaskFilter(where)  # Invalid before anything is read
+            if not self.__loaded:  # Filters are answered from the columns of the loaded rows
+                self.load_from_file(lazy=True)
+        if not self.__loaded and self.indexed and len(keys) == 1:  # Let the store's indexes do the sorting
+            with profiling.phase("query") as phase:
+                rows = self.__store.load_sorted(*keys[0])
+                phase.rows = None if rows is None else len(rows)
+            if rows is not None:
+                with profiling.phase("materialize") as phase:
+                    phase.rows = len(rows)
+                    return [self._task_from_row(row) for row in rows]
+        if not self.__loaded and self.indexed:  # The store can only find single rows, or sort by one field
+            self.load_from_file(lazy=True)
+        positions = self.__filtered(where)
+        if positions is None and self.__viewed():
+            with profiling.phase("sort") as phase:
+                ids = self.__view(keys).ids
+                phase.rows = len(ids)
+            self.__all_tasks()  # Creates the Tasks of lazily loaded rows
+            return list(map(self.__tasks.__getitem__, ids))
+        with profiling.phase("sort") as phase:
+            order = self.__table().argsort_keys(keys, positions)
+            phase.rows = len(order)
+        if positions is not None:  # Only the Tasks of the matching rows are created
+            return [self.get_task(task_id) for task_id in map(list(self.__tasks).__getitem__, order)]
+        tasks = self.__all_tasks()
+        return [tasks[position] for position in order]
+
+    def iter_tasks(self, sort=SortType.KEY, reverse=False, offset=0, limit=None, where=None):
+        """
+        Yields a page of the list get_tasks would return. Only the page is selected when a limit is given, using a
+        heap over the TaskColumns of the tasks, and each Task is only created as it is yielded.
+        Loads the store lazily if it has not been loaded and can not sort or filter itself
+
+        :param SortType or int or str or SortSpec sort: (optional) Provide a SortType to change the sorting method, or
+            a sort spec to sort by several fields, see sort_spec. Default is by ID
+        :param bool reverse: (optional) reverses the sort method
+        :param int offset: (optional) The number of tasks to skip
+        :param int or None limit: (optional) The most tasks to yield, all remaining tasks if None
+        :param str or TaskFilter where: (optional) Only yield the tasks matching a filter expression, see task_filter
+        :return Iterator[Task]: The tasks of the page in order
+        :exception FilterError: The filter expression is not valid
+        :exception SortError: The sort spec is not valid
+        """
+        keys = _sort_keys(sort, reverse)
+        if where is not None:
+            where = where if isinstance(where, TaskFilter) else TaskFilter(where)  # Invalid before anything is read
+        if not self.__loaded and self.indexed and where is None and len(keys) == 1:
+            with profiling.phase("query") as phase:
+                rows = self.__store.load_sorted(*keys[0], limit=limit, offset=offset)
+                phase.rows = None if rows is None else len(rows)
+            if rows is not None:
+                for row in rows:
+                    yield self._task_from_row(row)
+                return
+        if not self.__loaded:
+            self.load_from_file(lazy=True)
+        positions = self.__filtered(where)
+        if positions is None and self.__viewed():
+            with profiling.phase("sort") as phase:
+                ids = self.__view(keys).ids
+                page = ids[offset:] if limit is None else ids[offset:offset + limit]
+                phase.rows = len(ids)
+            for task_id in page:
+                yield self.get_task(task_id)
+            return
+        with profiling.phase("sort") as phase:
+            columns = self.__table()
+            if limit is None:
+                page = columns.argsort_keys(keys, positions)[offset:]
+            else:  # Same order as argsort_keys, equal values keep their load order
+                page = columns.select_keys(keys, offset + limit, positions)[offset:]
+            phase.rows = len(columns) if positions is None else len(positions)
+        ids = list(self.__tasks)
+        for position in page:
+            yield self.get_task(ids[position])
+
+    def search(self, query, limit=None):
+        """
+        Returns the tasks whose name and description contain the words of a query, best matches first. The query is
+        answered by the SearchIndex of the store, which is built by the first search and kept current by the writes to
+        csv stores. Stores which have not been loaded and can not query single tasks are scanned once for the rows of
+        the matching tasks
+
+        :param str query: The words to search for, see search_index
+        :param int or None limit: (optional) The most tasks to return
+        :return list[Task]: The matching tasks
+        :exception SearchError: The query is not valid
+        """
+        parse_query(query)  # Invalid before anything is read
+        task_ids = [task_id for task_id, _ in self.__store.load_search_index().search(query, limit)]
+        if not self.__loaded and not self.indexed and task_ids:
+            with profiling.phase("query") as phase:
+                wanted = set(map(str, task_ids))
+                rows = {row[0]: row for row in self.__store.iter_rows() if row[0] in wanted}
+                phase.rows = len(rows)
+            return [self._task_from_row(rows[str(task_id)]) for task_id in task_ids if str(task_id) in rows]
+        tasks = []
+        for task_id in task_ids:
+            try:
+                tasks.append(self.get_task(task_id))
+            except TaskIDError:  # Deleted by another process since this manager loaded the store
+                pass
+        return tasks
+
+    def due(self, within=None, limit=None, overdue=False):
+        """
+        Returns the tasks which are not completed and due from today until a time from now, soonest due first.
+        The tasks are found as a range of the deadline order, loading the store lazily if it has not been loaded
+
+        :param timedelta or None within: (optional) The time from now until which tasks are returned, all tasks with
+            a deadline if None
+        :param int or None limit: (optional) The most tasks to return, the next ones due
+        :param bool overdue: (optional) Also return the tasks due before today
+        :return list[Task]: The tasks
+        """
+        if not self.__loaded:
+            self.load_from_file(lazy=True)
+        now = datetime.datetime.now()
+        low = NO_DEADLINE + 1 if overdue else to_microseconds(datetime.datetime.combine(now.date(), datetime.time()))
+        high = _LATEST if within is None else to_microseconds(now + within)
+        tasks = []
+        with profiling.phase("query") as phase:
+            for task_id in self.__deadline_ids(low, high):
+                task = self.get_task(task_id)
+                if not task.completed:
+                    tasks.append(task)
+                    if len(tasks) == limit:
+                        break
+            phase.rows = len(tasks)
+        return tasks
+
+    @_retrying
     def add_task(self, name, description=None, deadline=None, priority=None):
         """
-        Appends a new task to __tasks
+        Adds a new task to __tasks
 
         :param str name: The name of the task
         :param str or None description: (optional) a short description of the task
         :param datetime or str or None deadline: (optional) The deadline for the task
         :param Priority or int or None priority: (optional) The priority of the task
         """
-        task = Task(name, description, deadline, priority)
-        self.__tasks.append(task)
-        self.__store.append_to_csv([task.to_list()])
+        task = Task(name, description, deadline, priority)  # Validates the task before an id is allocated
+        try:  # Task.last_id may be behind the store, other processes may be adding too
+            Task.last_id = self.__store.allocate_id() - 1
+            task = Task(name, description, deadline, priority)
+        except FileNotFoundError:  # Reported by append below
+            pass
+        self.__store.append([task.to_list()])  # The task is kept only once it has been stored
+        self.__tasks[task.id] = task
+        if self.__columns is not None:
+            self.__columns.append(task)
+        for view in self.__views.values() if self.__views else ():
+            view.add(task)
         return task
 
+    @_retrying
     def edit_task(self, task_id, name=None, description=None, deadline=None, priority=None):
         """
             Edits a task given the task's id exists in __tasks
@@ -143,45 +369,61 @@ class TaskManager:
             task.deadline = deadline
         if priority is not None:
             task.priority = priority
-        self.__store.edit_csv(task_id, [task.to_list()])
+        self.__changed([task])
+        self.__store.edit(task_id, [task.to_list()])
         return task
 
+    @_retrying
     def delete_task(self, task_id):
         """
         Deletes task from __tasks
         :param int task_id:
         :exception TaskIDError: Throws TaskIDError if id does not exist in __tasks
         """
-        task = self.get_task(task_id)
-        self.__tasks.remove(task)
-        self.__store.edit_csv(task_id)
+        self.get_task(task_id)
+        del self.__tasks[task_id]
+        self.__removed([task_id])
+        self.__store.edit(task_id)
 
+    @_retrying
     def delete_old_tasks(self):
         """
-        Deletes all tasks which the deadline has passed the system time
+        Deletes all tasks which the deadline has passed the system time. The tasks are found as a range of the
+        deadline order, and only their rows are deleted from the store
         :return:
         """
-        self.__tasks[:] = [task for task in self.__tasks if
-                           not (task.deadline is not None and task.deadline < datetime.datetime.now())]
-        self.__store.save_to_csv(self.to_list())
-
+        if not self.__loaded:
+            self.load_from_file(lazy=True)
+        task_ids = self.__deadline_ids(NO_DEADLINE + 1, to_microseconds(datetime.datetime.now()))
+        if not task_ids:
+            return
+        for task_id in task_ids:
+            del self.__tasks[task_id]
+        self.__removed(task_ids)
+        self.__store.edit_many(dict.fromkeys(task_ids))
+
+    @_retrying
     def delete_completed_tasks(self):
         """
         Deletes all tasks marked as complete
         :return:
         """
-        self.__tasks[:] = [task for task in self.__tasks if not task.completed]
-        self.__store.save_to_csv(self.to_list())
+        self.__delete_positions(self.__table().completed_positions())
+        self.__store.save(self.to_list())
 
+    @_retrying
     def clear_tasks(self):
         """
         Clears all tasks from task storage
         :return:
         """
-        self.__store.save_to_csv([])
+        self.__store.save([])
         self.__tasks.clear()
+        self.__columns = None
+        self.__clear_views()
         Task.last_id = 0
 
+    @_retrying
     def toggle_completion(self, task_id):
         """
         This toggles the completion property of the selected task
@@ -191,19 +433,76 @@ class TaskManager:
         """
         task = self.get_task(task_id)
         task.completed = not task.completed
-        self.__store.edit_csv(task_id, [task.to_list()])
+        self.__changed([task])
+        self.__store.edit(task_id, [task.to_list()])
         return task
 
+    @_retrying
+    def edit_tasks(self, task_ids, name=None, description=None, deadline=None, priority=None):
+        """
+        Edits several tasks in the same way, writing all of them to the store at once
+
+        :param list[int] task_ids: The ids of the tasks to edit
+        :param str or None name: The name of the tasks
+        :param str or None description: (optional) a short description of the tasks
+        :param datetime or str or None deadline: (optional) The deadline for the tasks
+        :param Priority or int or None priority: (optional) The priority of the tasks
+        :return list[Task]: The edited tasks
+        :exception TaskIDError: Throws TaskIDError if any id does not exist in __tasks, no task is edited then
+        """
+        tasks = self.__get_many(task_ids)
+        for task in tasks:
+            if name is not None:
+                task.name = name
+            if description is not None:
+                task.description = description
+            if deadline is not None:
+                task.deadline = deadline
+            if priority is not None:
+                task.priority = priority
+        self.__changed(tasks)
+        self.__store.edit_many({task.id: task.to_list() for task in tasks})
+        return tasks
+
+    @_retrying
+    def delete_tasks(self, task_ids):
+        """
+        Deletes several tasks from __tasks, removing all of them from the store at once
+        :param list[int] task_ids: The ids of the tasks to delete
+        :exception TaskIDError: Throws TaskIDError if any id does not exist in __tasks, no task is deleted then
+        """
+        tasks = self.__get_many(task_ids)
+        for task in tasks:
+            del self.__tasks[task.id]
+        self.__removed([task.id for task in tasks])
+        self.__store.edit_many({task.id: None for task in tasks})
+
+    @_retrying
+    def toggle_completions(self, task_ids):
+        """
+        Toggles the completion property of several tasks, writing all of them to the store at once
+        :param list[int] task_ids: The ids of the tasks to toggle
+        :return list[Task]: The toggled tasks
+        :exception TaskIDError: Throws TaskIDError if any id does not exist in __tasks, no task is toggled then
+        """
+        tasks = self.__get_many(task_ids)
+        for task in tasks:
+            task.completed = not task.completed
+        self.__changed(tasks)
+        self.__store.edit_many({task.id: task.to_list() for task in tasks})
+        return tasks
+
     def to_list(self):
         """
         Returns this object in list[list[string]] form
         :return list[list[string]: __tasks with all tasks converted to list[string]
         """
         built_list = []
-        for task in self.__tasks:
-            built_list.append(task.to_list())
+        for task in self.__tasks.values():
+            built_list.append(task if isinstance(task, list) else task.to_list())  # Stored rows are already lists
         return built_list
 
+    @_retrying
     def save_to_file(self, filename=None):
         """
         Saves data to a specific csv file
@@ -211,24 +510,174 @@ class TaskManager:
         """
         if filename is None:
             filename = self.loadfile
-        self.__store.save_to_csv(self.to_list(), filename=filename)
+        self.__store.save(self.to_list(), filename=filename)
 
-    def load_from_file(self, filename=None):
+    def load_from_file(self, filename=None, lazy=False):
         """
-        Loads a list of stacks from the designated storage
+        Loads a list of stacks from the designated storage, replaying any journaled edits on top of it.
+        Stores opened with parse_cache load the rows and sort columns of an unchanged store from their ParseCache
         :param filename: File to load from
+        :param bool lazy: Keep the stored rows and only create a Task when it is accessed. Useful when few tasks
+            will be used, as parsing the dates of every row is avoided
         """
         if filename is None:
             filename = self.loadfile
-        load_tuple = self.__store.load_from_csv(filename)
-        Task.last_id = load_tuple[0]
+        with profiling.phase("parse") as phase:
+            last_id, rows, columns = self.__store.load_table(filename)
+            phase.rows = len(rows)
+        Task.last_id = last_id
         self.__tasks.clear()  # As all additions are immediately stored, not clearing will lead to duplicates
-        for task in load_tuple[1]:
-            self.__tasks.append(Task.load_from_data(task[1],  # Name
-                                                    task[2],  # Description
-                                                    task[3],  # Deadline
-                                                    int(task[4]),  # Priority
-                                                    int(task[0]),  # ID
-                                                    task[5],  # Created datetime
-                                                    bool(int(task[6]))  # Completed
-                                                    ))
+        with profiling.phase("materialize") as phase:
+            for task in rows:
+                if lazy:
+                    self.__tasks[int(task[0])] = task
+                else:
+                    task = self._task_from_row(task)
+                    self.__tasks[task.id] = task
+            phase.rows = 0 if lazy else len(self.__tasks)
+        self.__columns = columns if len(columns) == len(self.__tasks) else None  # Rows sharing an id are kept once
+        self.__clear_views()
+        self.__loaded = True
+
+    def _reload(self):
+        """
+        Discards the tasks read from the store after another process wrote to it, reading them again the way they
+        were read before
+        """
+        if self.__loaded:
+            self.load_from_file(lazy=True)
+            return
+        self.__tasks.clear()
+        self.__columns = None
+        self.__clear_views()
+        self.__store.version = None  # Tasks queried from the store from now on are current
+
+    def __get_many(self, task_ids):
+        """
+        Returns the tasks of several ids, each once and in the given order
+        :param list[int] task_ids: The ids of the tasks
+        :return list[Task]: The tasks
+        :exception TaskIDError: Throws TaskIDError naming every id which does not exist
+        """
+        tasks, missing = [], []
+        for task_id in dict.fromkeys(task_ids):
+            try:
+                tasks.append(self.get_task(task_id))
+            except TaskIDError:
+                missing.append(task_id)
+        if len(missing) == 1:
+            raise TaskIDError(f"Task (id = {missing[0]}) does not exist", missing)
+        if missing:
+            raise TaskIDError(f"Tasks (ids = {', '.join(map(str, missing))}) do not exist", missing)
+        return tasks
+
+    def __table(self):
+        """
+        Returns the TaskColumns of __tasks, building them if a change was made since they were last built
+        :return TaskColumns: The columns, position i holding the i-th task of __tasks
+        """
+        if self.__columns is None:
+            self.__columns = TaskColumns(self.__tasks.values())
+        return self.__columns
+
+    def __filtered(self, where):
+        """
+        Returns the positions in __tasks of the tasks matching a filter
+        :param TaskFilter or None where: The filter
+        :return list[int] or None: The positions in increasing order, None if there is no filter
+        """
+        if where is None:
+            return None
+        with profiling.phase("filter") as phase:
+            positions = where.positions(self.__table())
+            phase.rows = len(positions)
+        return positions
+
+    def __delete_positions(self, positions):
+        """
+        Removes tasks from __tasks by their position in it
+        :param list[int] positions: The positions of the tasks, as found with TaskColumns
+        """
+        ids = list(map(list(self.__tasks).__getitem__, positions))
+        for task_id in ids:
+            del self.__tasks[task_id]
+        self.__removed(ids)
+
+    def __viewed(self):
+        """
+        Returns True if sorted lists are read from SortedViews, which needs every task to be loaded
+        """
+        return self.__views is not None and self.__loaded
+
+    def __view(self, keys):
+        """
+        Returns the SortedView of a sort, building it from the TaskColumns of __tasks the first time
+        :param tuple[(str, bool)] keys: The sort keys
+        :return SortedView: The view
+        """
+        view = self.__views.get(keys)
+        if view is None:
+            view = self.__views[keys] = SortedView(keys, self.__table())
+        return view
+
+    def __deadline_ids(self, low, high):
+        """
+        Returns the ids of the tasks whose deadline is in a range, from the SortedView of the deadline order or the
+        index of the Deadline column
+        :param int low: The earliest deadline in the range, in microseconds
+        :param int high: The deadline after the range, in microseconds
+        :return list[int]: The ids ordered by deadline, equal deadlines in load order
+        """
+        if self.__viewed():
+            return self.__view(((SORT_COLUMNS[SortType.DEADLINE], False),)).between(low, high)
+        columns = self.__table()
+        return list(map(columns.ids.__getitem__, columns.range_positions("Deadline", low, high)))
+
+    def __changed(self, tasks):
+        """
+        Moves edited tasks to their new place in the sorted views, and drops the columns which are out of date
+        :param list[Task] tasks: The edited tasks
+        """
+        self.__columns = None
+        for view in self.__views.values() if self.__views else ():
+            for task in tasks:
+                view.update(task)
+
+    def __removed(self, task_ids):
+        """
+        Removes deleted tasks from the sorted views, and drops the columns which are out of date
+        :param list[int] task_ids: The ids of the deleted tasks
+        """
+        self.__columns = None
+        for view in self.__views.values() if self.__views else ():
+            view.remove_many(task_ids)
+
+    def __clear_views(self):
+        """
+        Drops the sorted views, once the tasks they were built from are replaced
+        """
+        if self.__views is not None:
+            self.__views.clear()
+
+    def __all_tasks(self):
+        """
+        Returns every task in __tasks, creating the Tasks of rows which were lazily loaded
+        :return list[Task]: All the tasks in load order
+        """
+        with profiling.phase("materialize") as phase:
+            created = 0
+            for task_id, task in self.__tasks.items():
+                if isinstance(task, list):
+                    self.__tasks[task_id] = self._task_from_row(task)  # Replacing a value keeps the dict's order
+                    created += 1
+            phase.rows = created
+            return list(self.__tasks.values())
+
+    @staticmethod
+    def _task_from_row(task):
+        """
+        Creates a Task from a row in the form produced by Task.to_list()
+        :param list[string] task: The stored row
+        :return Task: The task the row represents
+        """
+        return Task._from_row(task)
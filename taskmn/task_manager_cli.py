@@ -1,16 +1,18 @@
+import contextlib
 import datetime
+import itertools
+import os
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
-import click.exceptions
-import rich.table
 import typer
 from rich import print
-from rich.panel import Panel
 
-from taskmn import __app_name__, __version__, config, exceptions, task_store
+from taskmn import __app_name__, __version__, config, exceptions, task_store, task_transfer, daemon_client, profiling
 from taskmn.docs import app as docs_app
-from taskmn.task_manager import TaskManager, SortType
+from taskmn.sort_spec import SortSpec
+from taskmn.task_manager import TaskManager
 
 
 def _version_callback(value: bool):
@@ -24,14 +26,18 @@ def _version_callback(value: bool):
         raise typer.Exit()
 
 
-VALID_SORTS = ["key", "deadline", "created", "priority"]
+VALID_SORTS = ["key", "deadline", "created", "priority", "completed"]
 
 
 def _complete_sort_type(ctx, param, incomplete: str):
+    done, _, field = incomplete.rpartition(",")  # Only the last field of a spec is being typed
+    prefix = done + "," if done else ""
+    if field.startswith("-"):
+        prefix, field = prefix + "-", field[1:]
     completion = []
     for sort in VALID_SORTS:
-        if sort.startswith(incomplete):
-            completion.append(sort)
+        if sort.startswith(field):
+            completion.append(prefix + sort)
     return completion
 
 
@@ -41,6 +47,7 @@ def _exception_box(message: str):
     :param message:
     :return:
     """
+    from rich.panel import Panel  # Rendering modules are imported by the commands using them
     print(Panel.fit(message, title="Exception"))
 
 
@@ -50,6 +57,7 @@ def _info_box(message: str):
     :param message:
     :return:
     """
+    from rich.panel import Panel
     print(Panel.fit(message, title="Info"))
 
 
@@ -58,16 +66,24 @@ app.add_typer(docs_app, name="docs", help="Generate documentation")
 
 
 @app.callback()
-def run(version: Optional[bool] = typer.Option(
-    None,
-    "--version",
-    "-v",
-    help="Show the application's version and exit.",
-    callback=_version_callback,
-    is_eager=True
-)
+def run(ctx: typer.Context,
+        version: Optional[bool] = typer.Option(
+            None,
+            "--version",
+            "-v",
+            help="Show the application's version and exit.",
+            callback=_version_callback,
+            is_eager=True
+        ),
+        profile: bool = typer.Option(False, "--profile",
+                                     help="Print the time and rows of each phase of the command to stderr"),
+        profile_output: Path = typer.Option(None, "--profile-output", dir_okay=False,
+                                            help="Write a Chrome trace of the phases to a .json file, or cProfile "
+                                                 "statistics to any other file. Also set by $TASKMN_TRACE")
 ) -> None:
-    return
+    if profile or profile_output is not None:
+        profiling.start(profile, profile_output)  # Already started by __main__ unless the app is run directly
+        ctx.call_on_close(profiling.finish)
 
 
 @app.command(rich_help_panel="Files")
@@ -99,9 +115,11 @@ def init(store_path: str = typer.Option(
         _info_box(f"[green]The Store is at {store_path}.[green]")
 
 
-def get_manager():
+def get_manager(local=False):
     """
-    Creates a TaskManager object attached to the storage defined by init()
+    Creates a TaskManager object attached to the storage defined by init().
+    If a daemon is serving the store a RemoteTaskManager using it is returned instead
+    :param bool local: Always create a TaskManager in this process
     """
     if config.CONFIG_FILE_PATH.exists():
         store_path = task_store.get_storage_path(config.CONFIG_FILE_PATH)
@@ -109,12 +127,25 @@ def get_manager():
         _exception_box(f"[bold red]Configuration file not found. Run 'taskmn init' and try again[/bold red]")
         raise typer.Exit(1)
     if store_path.exists():
-        return TaskManager(loadfile=store_path)
+        remote = None if local else daemon_client.connect(store_path=store_path)
+        if remote is not None:
+            return remote
+        return TaskManager(loadfile=store_path, **task_store.get_store_options(config.CONFIG_FILE_PATH))
     else:
         _exception_box(f"[bold red]Store file not found. Run 'taskmn init' and try again[/bold red]")
         raise typer.Exit(1)
 
 
+def _load_unless_indexed(manager, lazy=False):
+    """
+    Loads the whole store, unless the store can answer queries for single tasks and sorted lists itself
+    :param TaskManager manager: The manager to load
+    :param bool lazy: Only create the Tasks which are accessed, for commands using few tasks
+    """
+    if not manager.indexed:
+        manager.load_from_file(lazy=lazy)
+
+
 @app.command()
 def add(
         name: str = typer.Argument(..., help="Name of the task"),
@@ -127,142 +158,345 @@ def add(
     """
     manager = get_manager()
     try:
-        manager.load_from_file()  # Get the list of Tasks from memory, in order to properly set the id of the new Task
-        task = manager.add_task(name, description, deadline, priority)
+        task = manager.add_task(name, description, deadline, priority)  # The store allocates the id, no load needed
     except Exception as e:
         _exception_box(f"[bold red]Adding task failed with {e}[/bold red]")
     else:
         _info_box(f"[green]Adding Task #{task.id} - {task.name} Complete![/green]")
 
 
+LIST_PAGE_SIZE = 20  # Tasks per page when --page is used without --limit
+LIST_CHUNK_SIZE = 500  # Tasks rendered and written at a time
+
+
 @app.command(rich_help_panel="List")
 def ls(
         sort: str = typer.Option("key", "--sort", "-s",
-                                 help="How to sort the list [key/deadline/created/priority]",
+                                 help="How to sort the list, fields separated by commas and - reversing a field "
+                                      "[key/deadline/created/priority/completed]",
                                  shell_complete=_complete_sort_type),
-        reverse: Optional[bool] = typer.Option(False, "--reverse", "-r", help="Reverses the outputted list")
+        reverse: Optional[bool] = typer.Option(False, "--reverse", "-r", help="Reverses the outputted list"),
+        limit: int = typer.Option(None, "--limit", "-n", min=1, help="Only list this many tasks"),
+        offset: int = typer.Option(0, "--offset", min=0, help="Skip this many tasks of the sorted list"),
+        page: int = typer.Option(None, "--page", min=1,
+                                 help=f"List a page of --limit tasks, {LIST_PAGE_SIZE} if no limit is given"),
+        plain: bool = typer.Option(False, "--plain", help="Print tab separated rows without styling"),
+        where: str = typer.Option(None, "--where", "-w",
+                                  help='Only list the tasks matching a filter, such as "priority>=high and not '
+                                       'completed and deadline<2026-11-01"')
 ):
     """
     Alias for list
     """
-    list_all(sort, reverse)
+    list_all(sort, reverse, limit, offset, page, plain, where)
 
 
 @app.command(name="list", rich_help_panel="List")
 def list_all(
         sort: str = typer.Option("key", "--sort", "-s",
-                                 help="How to sort the list [key/deadline/created/priority]",
+                                 help="How to sort the list, fields separated by commas and - reversing a field "
+                                      "[key/deadline/created/priority/completed]",
                                  shell_complete=_complete_sort_type),
-        reverse: Optional[bool] = typer.Option(False, "--reverse", "-r", help="Reverses the outputted list")
+        reverse: Optional[bool] = typer.Option(False, "--reverse", "-r", help="Reverses the outputted list"),
+        limit: int = typer.Option(None, "--limit", "-n", min=1, help="Only list this many tasks"),
+        offset: int = typer.Option(0, "--offset", min=0, help="Skip this many tasks of the sorted list"),
+        page: int = typer.Option(None, "--page", min=1,
+                                 help=f"List a page of --limit tasks, {LIST_PAGE_SIZE} if no limit is given"),
+        plain: bool = typer.Option(False, "--plain", help="Print tab separated rows without styling"),
+        where: str = typer.Option(None, "--where", "-w",
+                                  help='Only list the tasks matching a filter, such as "priority>=high and not '
+                                       'completed and deadline<2026-11-01"')
 ):
     """
     Lists all the stored tasks in a pretty table.
+
+    Several fields are sorted by in turn, for example -s priority,deadline,-created lists high priority tasks first,
+    those due soonest first among them, and the newest first among tasks due on the same day.
+
+    A filter combines conditions on id, name, description, deadline, created, priority and completed with and, or,
+    not and parentheses. Names and descriptions are searched with ~, for example name~report
     """
+    try:
+        sort = SortSpec(sort)
+    except exceptions.SortError as e:
+        from rich.markup import escape
+        _exception_box(f"[bold red]{escape(str(e))}[/bold red]")
+        raise typer.Exit(1)
+    if page is not None:
+        limit = limit or LIST_PAGE_SIZE
+        offset += (page - 1) * limit
+    if where is not None:
+        from taskmn.task_filter import TaskFilter
+        try:
+            where = TaskFilter(where)
+        except exceptions.FilterError as e:
+            from rich.markup import escape
+            _exception_box(f"[bold red]{escape(str(e))}[/bold red]")
+            raise typer.Exit(1)
+
     manager = get_manager()
-    manager.load_from_file()
-    match sort.strip().lower():
-        case "key":
-            task_list = manager.get_tasks(SortType.KEY, reverse)
-        case "created":
-            task_list = manager.get_tasks(SortType.DATE, reverse)
-        case "deadline":
-            task_list = manager.get_tasks(SortType.DEADLINE, reverse)
-        case "priority":
-            task_list = manager.get_tasks(SortType.PRIORITY, reverse)
-        case _:
-            _exception_box(f"[bold red]{sort} is not a valid option for -s [/bold red]"
-                           f"[bold green]\[key/deadline/created/priority][/bold green]")
+    tasks = manager.iter_tasks(sort, reverse, offset, limit, where)  # Loads the store lazily if needed
+    with profiling.phase("materialize"):
+        first = next(tasks, None)
+    if first is None:
+        if not plain:
+            _info_box("You have no tasks yet [yellow]:)[/yellow]" if where is None else "No tasks match the filter")
+        raise typer.Exit()
+    tasks = itertools.chain([first], tasks)
+    try:
+        _print_plain(tasks) if plain else _print_table(tasks)
+    except BrokenPipeError:  # The reader, like head, has all it wants
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())  # Don't fail flushing stdout at exit
+    raise typer.Exit()
+
+
+@app.command(rich_help_panel="List")
+def search(
+        query: List[str] = typer.Argument(..., show_default=False,
+                                          help='Words to search for, such as report, rep* or "quarterly report"'),
+        limit: int = typer.Option(None, "--limit", "-n", min=1, help="Only list this many tasks"),
+        plain: bool = typer.Option(False, "--plain", help="Print tab separated rows without styling")
+):
+    """
+    Lists the tasks whose name and description contain every word searched for, best matches first.
+
+    A word ending in * also matches longer words starting with it, and the words of a quoted argument must follow
+    each other. Searches use an index kept next to the store, which the first search builds
+    """
+    query = " ".join(f'"{words}"' if len(words.split()) > 1 and '"' not in words else words for words in query)
+    from taskmn.search_index import parse_query
+    try:
+        parse_query(query)
+    except exceptions.SearchError as e:
+        from rich.markup import escape
+        _exception_box(f"[bold red]{escape(str(e))}[/bold red]")
+        raise typer.Exit(1)
+
+    tasks = get_manager().search(query, limit)
+    if not tasks:
+        if not plain:
+            _info_box("No tasks match the search")
+        raise typer.Exit()
+    try:
+        _print_plain(tasks) if plain else _print_table(tasks)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    raise typer.Exit()
+
+
+DURATION_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+@app.command(rich_help_panel="List")
+def due(
+        within: str = typer.Option(None, "--within", "-w",
+                                   help="Only list tasks due before this long from now, such as 3d, 12h or 2w "
+                                        "[m/h/d/w]"),
+        limit: int = typer.Option(None, "--limit", "-n", min=1, help="Only list the next this many tasks due"),
+        overdue: bool = typer.Option(False, "--overdue", "-o", help="Also list the tasks due before today"),
+        plain: bool = typer.Option(False, "--plain", help="Print tab separated rows without styling")
+):
+    """
+    Lists the tasks which are not completed and due from today on, soonest due first.
+
+    For example, due --within 3d lists what is due in the next three days, and due -n 5 the next five tasks due
+    """
+    if within is not None:
+        amount, unit = within.strip()[:-1], within.strip()[-1:].lower()
+        if not amount.isdigit() or unit not in DURATION_UNITS:
+            _exception_box(f"[bold red]{within} is not a valid option for --within [/bold red]"
+                           f"[bold green]\\[a number followed by m/h/d/w][/bold green]")
             raise typer.Exit(1)
+        within = datetime.timedelta(**{DURATION_UNITS[unit]: int(amount)})
+
+    tasks = get_manager().due(within, limit, overdue)  # Loads the store lazily if needed
+    if not tasks:
+        if not plain:
+            _info_box("No tasks are due")
+        raise typer.Exit()
+    try:
+        _print_plain(tasks) if plain else _print_table(tasks)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    raise typer.Exit()
 
-    if len(task_list) == 0:
-        _info_box("You have no tasks yet [yellow]:)[/yellow]")
-    else:
-        table = rich.table.Table(title="Tasks", show_lines=True, show_edge=True)
-
-        for element in task_store.TaskStore.DEFAULT_CSV_HEADER:
-            table.add_column(element, min_width=len(element) if (len(element) < 25) else 25, max_width=50)
-        for task in task_list:
-            task2 = task.to_list(True)
-
-            # Style the outputted table
-            if task.completed:
-                task2[6] = f"[green]{task2[6]}[/green] :heavy_check_mark:"
-            if task.deadline is not None and task.deadline < datetime.datetime.now():
-                task2[3] = f"[bold red]{task2[3]}[/bold red]"
-            else:
-                task2[3] = f"[green]{task2[3]}[/green]"
-            match task.priority.value:
-                case 1:
-                    task2[4] = f"[yellow]{task2[4]}[/yellow]"
-                case 2:
-                    task2[4] = f"[green]{task2[4]}[/green]"
-            table.add_row(*task2)
 
-        print(table)
-    typer.Exit()
+def _print_table(tasks):
+    """
+    Prints tasks in pretty tables of LIST_CHUNK_SIZE rows, so the first rows show before the rest are created
+    :param Iterable[Task] tasks: The tasks to print
+    """
+    with profiling.phase("import"):
+        import rich.table
+    now = datetime.datetime.now()  # Deadlines passed while printing are not marked
+    for chunk_number, chunk in enumerate(_chunks(tasks)):
+        with profiling.phase("render") as phase:
+            phase.rows = len(chunk)
+            first = chunk_number == 0
+            table = rich.table.Table(title="Tasks" if first else None, show_header=first, show_lines=True,
+                                     show_edge=True)
+            for element in task_store.TaskStore.DEFAULT_CSV_HEADER:
+                table.add_column(element, min_width=len(element) if (len(element) < 25) else 25, max_width=50)
+            for task in chunk:
+                task2 = task.to_list(True)
+
+                # Style the outputted table
+                if task.completed:
+                    task2[6] = f"[green]{task2[6]}[/green] :heavy_check_mark:"
+                if task.deadline is not None and task.deadline < now:
+                    task2[3] = f"[bold red]{task2[3]}[/bold red]"
+                else:
+                    task2[3] = f"[green]{task2[3]}[/green]"
+                match task.priority.value:
+                    case 1:
+                        task2[4] = f"[yellow]{task2[4]}[/yellow]"
+                    case 2:
+                        task2[4] = f"[green]{task2[4]}[/green]"
+                table.add_row(*task2)
+
+            print(table)
+
+
+def _print_plain(tasks):
+    """
+    Writes the header and tasks as tab separated rows in their stored form, LIST_CHUNK_SIZE rows at a time
+    :param Iterable[Task] tasks: The tasks to print
+    """
+    sys.stdout.write("\t".join(task_store.TaskStore.DEFAULT_CSV_HEADER) + "\n")
+    for chunk in _chunks(tasks):
+        with profiling.phase("render") as phase:
+            phase.rows = len(chunk)
+            lines = ("\t".join(str(value).replace("\t", " ").replace("\n", " ") for value in task.to_list())
+                     for task in chunk)
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+
+
+def _chunks(tasks):
+    """
+    Splits tasks into lists of LIST_CHUNK_SIZE
+    :param Iterable[Task] tasks: The tasks to split
+    :return Iterator[list[Task]]: The chunks
+    """
+    tasks = iter(tasks)
+    while True:
+        with profiling.phase("materialize") as phase:
+            chunk = list(itertools.islice(tasks, LIST_CHUNK_SIZE))
+            phase.rows = len(chunk)
+        if not chunk:
+            return
+        yield chunk
+
+
+TASK_IDS_HELP = "Ranges such as 10-40 are accepted, - reads ids from stdin"
+
+
+def _parse_task_ids(values):
+    """
+    Expands the task ids given on the command line. Each value is an id, a range of ids such as 10-40, or - to read
+    ids and ranges separated by whitespace from stdin
+    :param list[str] values: The values given
+    :return list[int]: The ids in the given order
+    """
+    task_ids = []
+    for value in values:
+        if value == "-":
+            task_ids.extend(_parse_task_ids([value for value in sys.stdin.read().split() if value != "-"]))
+            continue
+        first, separator, last = value.partition("-")
+        if not first.isdigit() or (separator and not (last.isdigit() and int(first) <= int(last))):
+            _exception_box(f"[bold red]{value} is not a task id or a range of ids such as 10-40[/bold red]")
+            raise typer.Exit(1)
+        task_ids.extend(range(int(first), int(last if separator else first) + 1))
+    return task_ids
+
+
+def _missing_tasks_box(error):
+    """
+    Reports the tasks which do not exist
+    :param TaskIDError error: The error raised for them
+    """
+    missing = getattr(error, "attempted", None) or []
+    if len(missing) > 1:
+        _exception_box(f"[bold red]Tasks #{', #'.join(map(str, missing))} do not exist[/bold red]")
+    else:
+        _exception_box(f"[bold red]Task #{missing[0] if missing else ''} does not exist[/bold red]")
 
 
 @app.command()
 def complete(
-        task_id: int = typer.Argument(None, min=1, help="The id of the task to change the completion status")
+        task_ids: List[str] = typer.Argument(..., help="The ids of the tasks to change the completion status. "
+                                                       + TASK_IDS_HELP)
 ):
     """
-    Flips the completion status of the indicated task
+    Flips the completion status of the indicated tasks
     """
+    task_ids = _parse_task_ids(task_ids)
     manager = get_manager()
-    manager.load_from_file()
+    _load_unless_indexed(manager, lazy=True)
     try:
-        task = manager.toggle_completion(task_id)
-    except ValueError:
-        _exception_box(f"[bold red]Task #{task_id} does not exist[/bold red]")
+        tasks = manager.toggle_completions(task_ids)
+    except ValueError as e:
+        _missing_tasks_box(e)
         raise typer.Exit(1)
-    _info_box(f"Task #{task_id} - {task.name} [bold green]marked as complete[/bold green]") if task.completed else \
-        _info_box(f"Task #{task_id} - {task.name} [bold green]marked as incomplete[/bold green]")
+    if len(tasks) == 1:
+        task = tasks[0]
+        _info_box(f"Task #{task.id} - {task.name} [bold green]marked as complete[/bold green]") if task.completed \
+            else _info_box(f"Task #{task.id} - {task.name} [bold green]marked as incomplete[/bold green]")
+    else:
+        completed = sum(task.completed for task in tasks)
+        _info_box(f"{completed} tasks [bold green]marked as complete[/bold green], "
+                  f"{len(tasks) - completed} [bold green]marked as incomplete[/bold green]")
     raise typer.Exit()
 
 
 @app.command(rich_help_panel="Delete")
 def rm(
-        task_id: int = typer.Argument(..., min=0, help="The id of the task to delete."),
+        task_ids: List[str] = typer.Argument(..., help="The ids of the tasks to delete. " + TASK_IDS_HELP),
         force: bool = typer.Option(False, "--force", "-f", help="Skip confirmation dialog"),
 ):
     """
     Alias for delete
     """
-    delete(task_id, force)
+    delete(task_ids, force)
 
 
 @app.command(rich_help_panel="Delete")
 def delete(
-        task_id: int = typer.Argument(..., min=0, help="The id of the task to delete."),
+        task_ids: List[str] = typer.Argument(..., help="The ids of the tasks to delete. " + TASK_IDS_HELP),
         force: bool = typer.Option(False, "--force", "-f", help="Skip confirmation dialog"),
 ):
     """
-    Deletes the indicated task
+    Deletes the indicated tasks
     """
+    task_ids = _parse_task_ids(task_ids)
     manager = get_manager()
-    manager.load_from_file()
+    _load_unless_indexed(manager, lazy=True)
     try:
-        task = manager.get_task(task_id)
         if not force:
-            confirmation = typer.confirm(f"Are you sure you want to delete #{task_id} - {task.name}?")
+            if len(task_ids) == 1:
+                task = manager.get_task(task_ids[0])
+                confirmation = typer.confirm(f"Are you sure you want to delete #{task.id} - {task.name}?")
+            else:
+                confirmation = typer.confirm(f"Are you sure you want to delete {len(set(task_ids))} tasks?")
             if confirmation:
-                manager.delete_task(task_id)
+                manager.delete_tasks(task_ids)
             else:
                 _info_box("[bold red]Delete Aborted[/bold red]")
                 raise typer.Exit()
         else:
-            manager.delete_task(task_id)
-    except ValueError:
-        _exception_box(f"[bold red]Task #{task_id} does not exist[/bold red]")
+            manager.delete_tasks(task_ids)
+    except ValueError as e:
+        _missing_tasks_box(e)
         raise typer.Exit(1)
-    _info_box(f"Task #{task_id} [bold red]deleted[/bold red]")
+    _info_box(f"Task #{task_ids[0]} [bold red]deleted[/bold red]") if len(task_ids) == 1 else \
+        _info_box(f"{len(set(task_ids))} tasks [bold red]deleted[/bold red]")
     raise typer.Exit()
 
 
 @app.command()
 def edit(
-        task_id: int = typer.Argument(..., min=1, help="The id of the task to edit"),
+        task_ids: List[str] = typer.Argument(..., help="The ids of the tasks to edit. " + TASK_IDS_HELP),
         name: str = typer.Option(None, "--name", "-n", help="Name of the task"),
         description: str = typer.Option(None, "--description", "-desc", help="Description for the task"),
         deadline: str = typer.Option(None, "--deadline", "-dl", help="Deadline for the task (YYYY-MM-DD)"),
@@ -270,33 +504,38 @@ def edit(
         force: bool = typer.Option(False, "--force", "-f", help="Skip confirmation dialog")
 ):
     """
-    Edits the indicated task
+    Edits the indicated tasks
     """
     if name is None and description is None and deadline is None and priority is None:
         _exception_box("[bold red]At least one option is required for editing[/bold red]")
         raise typer.Exit(1)
+    task_ids = _parse_task_ids(task_ids)
     manager = get_manager()
-    manager.load_from_file()
+    _load_unless_indexed(manager, lazy=True)
     try:
-        task = manager.get_task(task_id)
         if not force:
-            confirmation = typer.confirm(f"Are you sure you want to edit #{task_id} - {task.name}?")
+            if len(task_ids) == 1:
+                task = manager.get_task(task_ids[0])
+                confirmation = typer.confirm(f"Are you sure you want to edit #{task.id} - {task.name}?")
+            else:
+                confirmation = typer.confirm(f"Are you sure you want to edit {len(set(task_ids))} tasks?")
             if confirmation:
-                manager.edit_task(task_id, name, description, deadline, priority)
+                tasks = manager.edit_tasks(task_ids, name, description, deadline, priority)
             else:
                 _info_box("[bold red]Edit Aborted[/bold red]")
                 raise typer.Exit()
         else:
-            manager.edit_task(task_id, name, description, deadline, priority)
-    except ValueError:
-        _exception_box(f"[bold red]Task #{task_id} does not exist[/bold red]")
+            tasks = manager.edit_tasks(task_ids, name, description, deadline, priority)
+    except ValueError as e:
+        _missing_tasks_box(e)
         raise typer.Exit(1)
-    except click.exceptions.Exit as e:  # Already printed details for typer.Exit()
+    except typer.Exit as e:  # Already printed details for typer.Exit()
         raise e
     except Exception as e:
         _exception_box(f"[bold red]Edit failed with {e}[/bold red]")
         raise typer.Exit(1)
-    _info_box(f"[bold green]Edited Task #{task_id} - {task.name}[/bold green]")
+    _info_box(f"[bold green]Edited Task #{tasks[0].id} - {tasks[0].name}[/bold green]") if len(tasks) == 1 else \
+        _info_box(f"[bold green]Edited {len(tasks)} tasks[/bold green]")
     raise typer.Exit()
 
 
@@ -347,7 +586,7 @@ def clear(force: bool = typer.Option(False, "--force", "-f", help="Skip confirma
     Clears multiple tasks depending on options. None specified clears all tasks.
     """
     manager = get_manager()
-    manager.load_from_file()
+    manager.load_from_file(lazy=True)  # Filtering uses the stored rows, Tasks are not needed
 
     if not force:
         _par_del_options(manager, del_completed, del_old, force)
@@ -364,6 +603,125 @@ def clear(force: bool = typer.Option(False, "--force", "-f", help="Skip confirma
     raise typer.Exit()
 
 
+@app.command(rich_help_panel="Files")
+def compact():
+    """
+    Folds the journal of the store back into the store file
+    """
+    manager = get_manager()
+    store = task_store.open_store(manager.loadfile, **task_store.get_store_options(config.CONFIG_FILE_PATH))
+    if not isinstance(store, task_store.TaskStore):
+        _info_box("[green]Only csv stores need compacting.[/green]")
+        raise typer.Exit()
+    try:
+        store.compact()
+    except OSError as e:
+        _exception_box(f"[bold red]Compacting the store failed with {e}[/bold red]")
+        raise typer.Exit(1)
+    _info_box("[green]The store has been compacted.[/green]")
+
+
+def _transfer_format(filename, file_format):
+    """
+    Returns the format to import or export with, from the --format option or the file's suffix
+    :param str filename: The file, - for stdin or stdout
+    :param str or None file_format: The format given with --format
+    :return str: One of task_transfer.FORMATS
+    """
+    if file_format is None:
+        return task_transfer.detect_format(filename)
+    if file_format.strip().lower() not in task_transfer.FORMATS:
+        _exception_box(f"[bold red]{file_format} is not a valid option for --format [/bold red]"
+                       f"[bold green]\\[{'/'.join(task_transfer.FORMATS)}][/bold green]")
+        raise typer.Exit(1)
+    return file_format.strip().lower()
+
+
+@app.command(name="import", rich_help_panel="Files")
+def import_tasks(
+        source: str = typer.Argument("-", help="The file to import, - reads stdin"),
+        file_format: str = typer.Option(None, "--format", "-F", show_default=False,
+                                        help="csv, jsonl or ndjson. Taken from the file suffix by default, else csv")
+):
+    """
+    Adds the tasks of a csv or JSON Lines file as new tasks. Only a name is required for each task
+    """
+    file_format = _transfer_format(source, file_format)
+    store = task_store.open_store(get_manager(local=True).loadfile,
+                                  **task_store.get_store_options(config.CONFIG_FILE_PATH))
+    imported = 0
+    try:
+        with (contextlib.nullcontext(sys.stdin) if source == "-" else open(source, "r", newline="")) as file:
+            for count in task_transfer.import_tasks(store, file, file_format):
+                imported += count
+    except exceptions.TaskImportError as e:
+        _exception_box(f"[bold red]{e}[/bold red]\n{imported} tasks were imported before it")
+        raise typer.Exit(1)
+    except OSError as e:
+        _exception_box(f"[bold red]Importing failed with {e}[/bold red]\n{imported} tasks were imported before it")
+        raise typer.Exit(1)
+    _info_box(f"[green]Imported {imported} tasks[/green]")
+    raise typer.Exit()
+
+
+@app.command(name="export", rich_help_panel="Files")
+def export_tasks(
+        destination: str = typer.Argument("-", help="The file to write, - writes to stdout"),
+        file_format: str = typer.Option(None, "--format", "-F", show_default=False,
+                                        help="csv, jsonl or ndjson. Taken from the file suffix by default, else csv")
+):
+    """
+    Writes every task to a csv or JSON Lines file, in stored order
+    """
+    file_format = _transfer_format(destination, file_format)
+    store = task_store.open_store(get_manager(local=True).loadfile,
+                                  **task_store.get_store_options(config.CONFIG_FILE_PATH))
+    try:
+        if destination == "-":
+            task_transfer.export_tasks(store, sys.stdout, file_format)
+            sys.stdout.flush()
+        else:
+            with open(destination, "w", newline="") as file:
+                exported = task_transfer.export_tasks(store, file, file_format)
+            _info_box(f"[green]Exported {exported} tasks to {destination}[/green]")
+    except BrokenPipeError:  # The reader, like head, has all it wants
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except OSError as e:
+        _exception_box(f"[bold red]Exporting failed with {e}[/bold red]")
+        raise typer.Exit(1)
+    raise typer.Exit()
+
+
+@app.command(rich_help_panel="Files")
+def serve(socket_path: Path = typer.Option(daemon_client.SOCKET_PATH, "--socket", show_default=False,
+                                           help="The unix socket to listen on. Defaults to $TASKMN_SOCKET or "
+                                                "taskmn.sock in the config directory"),
+          stop: bool = typer.Option(False, "--stop", help="Stop the running daemon")):
+    """
+    Runs a daemon which keeps the store loaded. Other commands use it while it runs
+    """
+    if stop:
+        remote = daemon_client.connect(socket_path)
+        if remote is None:
+            _exception_box(f"[bold red]No daemon is listening on {socket_path}[/bold red]")
+            raise typer.Exit(1)
+        remote.shutdown()
+        _info_box("[green]The daemon has stopped.[/green]")
+        raise typer.Exit()
+    manager = get_manager(local=True)
+    try:
+        from taskmn.daemon import TaskDaemon
+        server = TaskDaemon(socket_path, manager.loadfile, **task_store.get_store_options(config.CONFIG_FILE_PATH))
+    except (ImportError, AttributeError):  # No unix sockets on this platform
+        _exception_box("[bold red]The daemon needs unix domain sockets, which this platform lacks[/bold red]")
+        raise typer.Exit(1)
+    except OSError as e:
+        _exception_box(f"[bold red]Starting the daemon failed with {e}[/bold red]")
+        raise typer.Exit(1)
+    _info_box(f"[green]Serving {manager.loadfile} on {socket_path}[/green]")
+    server.serve()
+
+
 @app.command(name="config", rich_help_panel="Files")
 def modify_config(store_path: str = typer.Option(None,
                                                  "--modify-path",
@@ -373,7 +731,28 @@ def modify_config(store_path: str = typer.Option(None,
                                                  ),
                   want_path: Optional[bool] = typer.Option(False,
                                                            "--store-path", "-s",
-                                                           help="Print the current Task store name")
+                                                           help="Print the current Task store name"),
+                  journal: Optional[bool] = typer.Option(None,
+                                                         "--journal/--no-journal",
+                                                         help="Record edits in a journal instead of rewriting the "
+                                                              "store"),
+                  index: Optional[bool] = typer.Option(None,
+                                                       "--index/--no-index",
+                                                       help="Keep an index of row positions to edit the store in "
+                                                            "place"),
+                  epoch_times: Optional[bool] = typer.Option(None,
+                                                             "--epoch-times/--no-epoch-times",
+                                                             help="Write times as integers, which are quicker to "
+                                                                  "read"),
+                  parse_cache: Optional[bool] = typer.Option(None,
+                                                             "--parse-cache/--no-parse-cache",
+                                                             help="Cache the parsed store in a .cache file to "
+                                                                  "load it quicker while it is unchanged. Off by "
+                                                                  "default"),
+                  lock_timeout: Optional[float] = typer.Option(None,
+                                                               "--lock-timeout", min=0,
+                                                               help="Seconds to wait for another process writing "
+                                                                    "to the store")
                   ):
     """
     Provides some configuration options
@@ -381,8 +760,30 @@ def modify_config(store_path: str = typer.Option(None,
     if want_path:
         _info_box(f"The store location is '{task_store.get_storage_path(config.CONFIG_FILE_PATH)}'")
         raise typer.Exit()
+    for option, value, label in (("Journal", journal, "Journaled mode"), ("Index", index, "The row index"),
+                                 ("EpochTimes", epoch_times, "Writing epoch times"),
+                                 ("ParseCache", parse_cache, "The parse cache")):
+        if value is None:
+            continue
+        try:
+            config.set_store_option(option, value)
+        except exceptions.ConfigFileError:
+            _exception_box("[bold red]Modifying the configuration file has failed.[/bold red]")
+            raise typer.Exit(1)
+        _info_box(f"[green]{label} is now {'on' if value else 'off'}.[/green]")
+    if lock_timeout is not None:
+        try:
+            config.set_store_option("LockTimeout", lock_timeout)
+        except exceptions.ConfigFileError:
+            _exception_box("[bold red]Modifying the configuration file has failed.[/bold red]")
+            raise typer.Exit(1)
+        _info_box(f"[green]Writers now wait up to {lock_timeout:g}s for the store.[/green]")
+    if store_path is None and any(option is not None for option in (journal, index, epoch_times, parse_cache,
+                                                                   lock_timeout)):
+        raise typer.Exit()
     if store_path is None:
-        _exception_box("[bold red]An option is required (-s, -m)[/bold red]")
+        _exception_box("[bold red]An option is required (-s, -m, --journal, --index, --epoch-times, "
+                       "--parse-cache, --lock-timeout)[/bold red]")
         raise typer.Exit(1)
     elif store_path.isspace() or store_path == "":
         _exception_box(f'[bold red]Must enter a store path "{store_path}" is invalid[/bold red]')
@@ -390,8 +791,8 @@ def modify_config(store_path: str = typer.Option(None,
 
     try:
         old_store = str(task_store.get_storage_path(config.CONFIG_FILE_PATH))
-        store = task_store.TaskStore(old_store)
-        store.copy_csv(old_store, store_path)
+        store = task_store.open_store(old_store)
+        store.copy(old_store, store_path)
 
     except FileNotFoundError:
         _exception_box(f'[bold red]Store file not found, try running "taskmn init".[/bold red]')
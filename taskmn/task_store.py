@@ -1,22 +1,41 @@
+import abc
 import configparser
+import contextlib
 import csv
 import errno
 import os
+import stat
+import tempfile
 from pathlib import Path
 
-from taskmn.exceptions import StoreWriteException, StoreReadException, StoreCopyException
+from taskmn.exceptions import StoreWriteException, StoreReadException, StoreCopyException, StoreConflictException, \
+    StoreLockException
+from taskmn import profiling, timestamps
+from taskmn.high_water_mark import HighWaterMark
+from taskmn.offset_index import OffsetIndex
+from taskmn.parse_cache import ParseCache
+from taskmn.search_index import SearchIndex
+from taskmn.store_lock import StoreLock
+from taskmn.store_snapshot import StoreSnapshot
+from taskmn.task_columns import TaskColumns
 
 """
 This Module will contain a class to manage the saving and loading of a TaskManager object to and from a .csv file
 
 Classes
+StoreBackend
 TaskStore 
 
 Methods
 get_storage_path(Path)
+get_store_options(Path) -> dict
 init_storage(Path)
+open_store(Path, bool, bool, float, bool, bool) -> StoreBackend
 """
 
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+BINARY_SUFFIXES = ('.tmb',)
+
 
 # noinspection GrazieInspection
 def get_storage_path(config_file: Path) -> Path:
@@ -25,9 +44,28 @@ def get_storage_path(config_file: Path) -> Path:
     :param Path config_file: Path to the config file
     :return Path: Path as to which the task store will be located
     """
-    config_parser = configparser.ConfigParser()
-    config_parser.read(config_file)
-    return Path(config_parser["General"]["Storage"])
+    with profiling.phase("config"):
+        config_parser = configparser.ConfigParser()
+        config_parser.read(config_file)
+        return Path(config_parser["General"]["Storage"])
+
+
+def get_store_options(config_file: Path) -> dict:
+    """
+    Reads the config file and gets the options the store is opened with. Every option is off unless the config file
+    turns it on, as with TaskStore, and the lock timeout is StoreLock.DEFAULT_TIMEOUT unless it is set
+    :param Path config_file: Path to the config file
+    :return dict: The keyword arguments for open_store, journaled, offset_index, lock_timeout, epoch_times and
+        parse_cache
+    """
+    with profiling.phase("config"):
+        config_parser = configparser.ConfigParser()
+        config_parser.read(config_file)
+        return {"journaled": config_parser.getboolean("General", "Journal", fallback=False),
+                "offset_index": config_parser.getboolean("General", "Index", fallback=False),
+                "lock_timeout": config_parser.getfloat("General", "LockTimeout", fallback=None),
+                "epoch_times": config_parser.getboolean("General", "EpochTimes", fallback=False),
+                "parse_cache": config_parser.getboolean("General", "ParseCache", fallback=False)}
 
 
 def init_storage(store_path: Path):
@@ -38,17 +76,285 @@ def init_storage(store_path: Path):
     :param store_path: The path to which the filestore will be created
     :return:
     """
+    store = open_store(store_path)
+    if not isinstance(store, TaskStore):
+        store.save([])
+        return
     try:
-        with open(store_path, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(TaskStore.DEFAULT_CSV_HEADER)
+        with StoreLock(store_path) as lock:
+            with _replacing(store_path) as file:
+                writer = csv.writer(file)
+                writer.writerow(TaskStore.DEFAULT_CSV_HEADER)
+            for sidecar in (TaskStore.journal_path(store_path), OffsetIndex.path(store_path),
+                            HighWaterMark.path(store_path), ParseCache.path(store_path),
+                            SearchIndex.path(store_path)):
+                if os.path.isfile(sidecar):  # Sidecars left over from an old store would be applied to the new one
+                    os.remove(sidecar)
+            StoreSnapshot.publish(store_path, TaskStore.journal_path(store_path), lock.bump())
+    except StoreLockException:
+        raise
     except OSError:
         raise StoreWriteException(store_path)
 
 
-class TaskStore:
+def open_store(store_path, journaled=False, offset_index=False, lock_timeout=None, epoch_times=False,
+               parse_cache=False):
+    """
+    Creates the store backend matching the file type of a store path.
+    .db, .sqlite and .sqlite3 files are SQLite stores, .tmb files binary stores, everything else is a csv store
+    :param Path or str store_path: The path of the store
+    :param bool journaled: Whether a csv store records edits in a journal
+    :param bool offset_index: Whether a csv store keeps a sidecar index of the position of every row
+    :param float or None lock_timeout: Seconds a csv store waits for another writer, StoreLock.DEFAULT_TIMEOUT if None
+    :param bool epoch_times: Whether a csv store writes times as integers of microseconds since 1970-01-01
+    :param bool parse_cache: Whether a csv store keeps a ParseCache of its parsed rows for load_table
+    :return StoreBackend: The backend managing the store
+    """
+    if Path(store_path).suffix.lower() in SQLITE_SUFFIXES:
+        from taskmn.sqlite_store import SQLiteTaskStore  # Only pay for sqlite3 when it is used
+        return SQLiteTaskStore(str(store_path))
+    if Path(store_path).suffix.lower() in BINARY_SUFFIXES:
+        from taskmn.binary_store import BinaryTaskStore
+        return BinaryTaskStore(str(store_path), lock_timeout)
+    return TaskStore(str(store_path), journaled, offset_index, lock_timeout, epoch_times, parse_cache)
+
+
+@contextlib.contextmanager
+def _replacing(filename, mode='w'):
+    """
+    Opens a uniquely named temporary file next to a file for writing. Once the block completes the temporary file is
+    flushed to disk and atomically replaces the file, so readers see either the old or the new contents
+    :param string filename: The file to replace
+    :param str mode: The mode to open the temporary file with, 'w' or 'wb'
+    :return TextIO or BinaryIO: The temporary file
+    """
+    directory, name = os.path.split(os.path.abspath(filename))
+    descriptor, temp_filename = tempfile.mkstemp(prefix=name + ".", suffix=".new", dir=directory)
+    try:
+        try:
+            permissions = stat.S_IMODE(os.stat(filename).st_mode)
+        except FileNotFoundError:  # A new file gets the permissions open would give it
+            umask = os.umask(0o022)  # The umask can only be read by setting it
+            os.umask(umask)
+            permissions = 0o666 & ~umask
+        os.chmod(temp_filename, permissions)  # mkstemp creates the file readable by its owner only
+        with open(descriptor, mode, newline=None if 'b' in mode else '') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, filename)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_filename)
+        raise
+    with contextlib.suppress(OSError, AttributeError):  # Directories can not be opened on every platform
+        directory_descriptor = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_descriptor)  # Makes the rename itself durable
+        finally:
+            os.close(directory_descriptor)
+
+
+class StoreBackend(abc.ABC):
+    """
+    Interface for the classes which store and load Tasks in list[string] form,
+    each row being ordered like TaskStore.DEFAULT_CSV_HEADER. Backends implement save, append, edit and load, the
+    other methods have defaults built on them
+
+    --------------
+
+    Static Properties
+
+    indexed : bool
+        True if the backend can answer load_row and load_sorted without reading the whole store
+
+    ---------------
+
+    Methods
+
+    save(list[list[string]], string)
+
+    append(list[list[string]], string)
+
+    edit(int, list[list[string]], string)
+
+    edit_many(dict[int, list[string] || None], string)
+
+    load(string) -> (int, list[list[string]])
+
+    load_table(string) -> (int, list[list[string]], TaskColumns)
+
+    load_search_index(string) -> SearchIndex
+
+    allocate_id(string, int) -> int
+
+    iter_rows(string) -> Iterator[list[string]]
+
+    load_row(int, string) -> list[string] || None
+
+    load_sorted(string, bool, string, int, int) -> list[list[string]] || None
+
+    copy(string, string)
+    """
+    indexed = False
+
+    def __init__(self, filename: str):
+        self.store_filename = filename
+
+    @abc.abstractmethod
+    def save(self, data, filename=None):
+        """
+        Replaces the contents of the store with data
+        :param list[list[string]] data: The rows to store
+        :param string filename: The store to write to
+        :exception StoreWriteException: Writing to the store failed
+        """
+
+    @abc.abstractmethod
+    def append(self, data, filename=None):
+        """
+        Adds rows to the store
+        :param list[list[string]] data: The rows to add
+        :param string filename: The store to write to
+        :exception FileNotFoundError: The store does not exist
+        :exception StoreWriteException: Writing to the store failed
+        """
+
+    @abc.abstractmethod
+    def edit(self, task_id, data=None, filename=None):
+        """
+        Replaces the row of a task with data, or deletes it if data is None
+        :param int task_id: The id of the task to edit
+        :param list[list[string]] data: The data to replace the task with, if None the task is deleted
+        :param string filename: The store to edit
+        :exception FileNotFoundError: The store does not exist
+        """
+
+    def edit_many(self, changes, filename=None):
+        """
+        Replaces or deletes the rows of several tasks. Backends apply the changes in one write where they can
+        :param dict[int, list[string] or None] changes: The new row of each task to edit, None to delete the task
+        :param string filename: The store to edit
+        :exception FileNotFoundError: The store does not exist
+        """
+        for task_id, row in changes.items():
+            self.edit(task_id, None if row is None else [row], filename)
+
+    @abc.abstractmethod
+    def load(self, filename=None):
+        """
+        Loads every row of the store
+        :param string filename: The store to load
+        :return (int, list[list[string]]): A tuple containing the maximum id, and the store's data
+        :exception FileNotFoundError: The store does not exist
+        :exception StoreReadException: Reading the store failed
+        """
+
+    def load_table(self, filename=None):
+        """
+        Loads every row of the store along with the TaskColumns of the rows. Backends which keep the columns of
+        unchanged stores return them already built
+        :param string filename: The store to load
+        :return (int, list[list[string]], TaskColumns): The maximum id, the store's data and its columns
+        :exception FileNotFoundError: The store does not exist
+        :exception StoreReadException: Reading the store failed
+        """
+        last_id, rows = self.load(filename)
+        return last_id, rows, TaskColumns(rows)
+
+    def load_search_index(self, filename=None):
+        """
+        Returns the SearchIndex of the names and descriptions of the tasks in the store, read from its sidecar while it
+        matches the store and built from the rows of the store otherwise. Backends which keep the sidecar current as
+        they write only build it once
+        :param string filename: The store to search
+        :return SearchIndex: The index
+        :exception FileNotFoundError: The store does not exist
+        :exception StoreReadException: Reading the store failed
+        """
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        return SearchIndex.open(filename, lambda: self.iter_rows(filename))
+
+    def allocate_id(self, filename=None, count=1):
+        """
+        Returns the first of count consecutive ids which no task in the store has, for tasks about to be appended.
+        Backends which persist the highest id handed out do not read the store, and do not hand out the ids again,
+        even once their tasks are deleted. Everything adding new tasks takes their ids from here
+        :param string filename: The store the tasks will be appended to
+        :param int count: The number of ids to allocate
+        :return int: The first new id
+        :exception FileNotFoundError: The store does not exist
+        """
+        return self.load(filename)[0] + 1
+
+    def iter_rows(self, filename=None):
+        """
+        Yields every row of the store in stored order. Backends which can read their rows one at a time do not hold
+        the whole store in memory
+        :param string filename: The store to load
+        :return Iterator[list[string]]: The rows
+        :exception FileNotFoundError: The store does not exist
+        :exception StoreReadException: Reading the store failed
+        """
+        yield from self.load(filename)[1]
+
+    def load_row(self, task_id, filename=None):
+        """
+        Loads the row of a single task
+        :param int task_id: The id of the task to load
+        :param string filename: The store to load from
+        :return list[string] or None: The row of the task, None if it does not exist
+        """
+        for row in self.load(filename)[1]:
+            if row[0] == str(task_id):
+                return row
+        return None
+
+    def load_sorted(self, column, reverse=False, filename=None, limit=None, offset=0):
+        """
+        Loads every row of the store ordered by a column, ties being ordered by id.
+        Backends which can not sort without loading everything return None
+        :param string column: The name of the column in DEFAULT_CSV_HEADER to order by
+        :param bool reverse: Order from largest to smallest
+        :param string filename: The store to load from
+        :param int or None limit: (optional) The most rows to return
+        :param int offset: (optional) The number of ordered rows to skip
+        :return list[list[string]] or None: The ordered rows
+        """
+        return None
+
+    def copy(self, filename=None, new_filename=None):
+        """
+        Copies a store to a new location, converting it to the format matching new_filename
+        :param string filename: The store to copy from
+        :param string new_filename: The store to copy to
+
+        :exception FileNotFoundError: The file does not exist
+        :exception FileExistsError: Attempt to copy to the same file
+        :exception StoreCopyException: Copying the store failed
+        """
+        if filename is None or filename.isspace() or filename == '':
+            filename = self.store_filename
+
+        if new_filename is None or new_filename.isspace() or new_filename == '':
+            raise StoreWriteException(Path(str(new_filename)))
+
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+
+        if os.path.abspath(filename) == os.path.abspath(new_filename):
+            raise FileExistsError("Can not copy a path to itself")
+        try:
+            open_store(new_filename).save(self.load(filename)[1])
+        except OSError:
+            raise StoreCopyException(Path(filename), Path(str(new_filename)))
+
+
+class TaskStore(StoreBackend):
     """
-    Class which manages the storage and loading of Tasks into csv format
+    Class which manages the storage and loading of Tasks into csv format.
+    Implements StoreBackend through the csv specific methods
 
     --------------
 
@@ -62,6 +368,22 @@ class TaskStore:
     Attributes
 
     filename : str
+    version : int or None
+        The StoreLock version of the store when it was read, edits and saves fail with StoreConflictException once
+        another process has written since. None until the store is read
+    lock_timeout : float or None
+        Seconds to wait for another process writing to the store, StoreLock.DEFAULT_TIMEOUT if None
+    journaled : bool
+        If True edits, deletes and appends are recorded in a journal next to the store instead of rewriting it
+    offset_index : bool
+        If True an OffsetIndex of the store is maintained, single rows are then read, patched and deleted in place.
+        An edited row which changes length moves to the end of the file, so rows are no longer stored in id order
+    epoch_times : bool
+        If True created times and deadlines are written as integers of microseconds since 1970-01-01, which are
+        quicker to read. Stores may hold both forms, rows are read the same way whatever they hold
+    parse_cache : bool
+        If True load_table keeps the rows and columns it parses in a ParseCache, and loads them from it while the
+        store is unchanged
 
     ---------------
 
@@ -73,16 +395,153 @@ class TaskStore:
 
     edit_csv(int, list[string], string)
 
+    edit_many_csv(dict[int, list[string] || None], string)
+
     load_from_csv(string)
 
+    load_table(string) -> (int, list[list[string]], TaskColumns)
+
+    load_search_index(string) -> SearchIndex
+
     copy_csv(self, filename:  str = None, new_filename: str = None):
 
+    compact(string)
+
+    journal_path(string) -> str
+
+    allocate_id(string, int) -> int
+
+    load_row(int, string) -> list[string] || None
+
     """
     DEFAULT_CSV_HEADER = ['ID', 'Name', 'Description', 'Deadline', 'Priority', 'Created', 'Completed']
     DEFAULT_TASK_STORE_PATH = Path.home().stem + "_tasks.csv"
+    JOURNAL_SUFFIX = ".journal"
+    JOURNAL_COMPACT_SIZE = 1 << 20  # Fold the journal into the store once it grows past this many bytes
+    JOURNAL_APPEND = 'A'
+    JOURNAL_EDIT = 'E'
+    JOURNAL_DELETE = 'D'
+    SNAPSHOT_RETRIES = 5  # Times a read is redone after a writer patched or replaced the files before taking the lock
 
-    def __init__(self, filename: str):
-        self.store_filename = filename
+    def __init__(self, filename: str, journaled: bool = False, offset_index: bool = False, lock_timeout=None,
+                 epoch_times: bool = False, parse_cache: bool = False):
+        super().__init__(filename)
+        self.journaled = journaled
+        self.offset_index = offset_index
+        self.indexed = offset_index
+        self.lock_timeout = lock_timeout
+        self.epoch_times = epoch_times
+        self.parse_cache = parse_cache
+        self.version = None
+
+    def save(self, data, filename=None):
+        self.save_to_csv(data, filename=filename)
+
+    def append(self, data, filename=None):
+        self.append_to_csv(data, filename)
+
+    def edit(self, task_id, data=None, filename=None):
+        self.edit_csv(task_id, data, filename)
+
+    def edit_many(self, changes, filename=None):
+        self.edit_many_csv(changes, filename)
+
+    def allocate_id(self, filename=None, count=1):
+        """
+        Returns the first of count ids after the highest id allocated or stored, keeping it in a HighWaterMark sidecar.
+        The store is only read when the sidecar is missing or out of date
+        :param string filename: The store the tasks will be appended to
+        :param int count: The number of ids to allocate
+        :return int: The first new id
+        :exception FileNotFoundError: The store does not exist
+        """
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        with StoreLock(filename, self.lock_timeout):  # Other processes must not hand out the same id
+            mark = HighWaterMark(filename, TaskStore.journal_path(filename))
+            last_id = mark.read()
+            if last_id is None:
+                version = self.version
+                last_id = self.load_from_csv(filename)[0]
+                self.version = version  # Only the max id was used, the rows held are as old as they were
+            mark.write(last_id + count)  # Reserve the ids, so they are not handed out twice before they are appended
+        return last_id + 1
+
+    def load(self, filename=None):
+        return self.load_from_csv(filename)
+
+    def load_table(self, filename=None):
+        if not self.parse_cache:
+            return super().load_table(filename)
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        lock, cache, journal = StoreLock(filename), ParseCache(filename), TaskStore.journal_path(filename)
+        version = lock.version()
+        key = cache.key(journal, version)
+        if key is not None and not lock.busy():  # The files of a store being written may not be committed yet
+            cached = cache.read(key)
+            if cached is not None:
+                last_id, rows, columns = cached
+                self._keep_version(filename, version, full=True)
+                return last_id, rows, TaskColumns(rows, columns)
+        last_id, rows = self.load_from_csv(filename)
+        columns = TaskColumns(rows)
+        if key is not None and cache.key(journal, lock.version()) == key and not lock.busy():  # Unchanged meanwhile
+            cache.write(key, last_id, rows, {name: columns.column(name) for name in TaskColumns.NAMES})
+        return last_id, rows, columns
+
+    def load_search_index(self, filename=None):
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        return SearchIndex.open(filename, lambda: self.iter_rows(filename), TaskStore.journal_path(filename))
+
+    def iter_rows(self, filename=None):
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        # Replaying the journal needs every row, and rows patched in place can only be checked once all are read
+        if os.path.isfile(TaskStore.journal_path(filename)) or os.path.isfile(OffsetIndex.path(filename)):
+            yield from self.load_from_csv(filename)[1]
+            return
+        version = StoreLock(filename).version()
+        pinned = None
+        for _ in range(TaskStore.SNAPSHOT_RETRIES):
+            pinned = StoreSnapshot.pin(filename, TaskStore.journal_path(filename))
+            if pinned is not None:
+                break
+        if pinned is None or pinned.journal is not None:  # Written to a lot, or journaled since
+            if pinned is not None:
+                pinned.close()
+            yield from self.load_from_csv(filename)[1]
+            return
+        with pinned:
+            self._keep_version(filename, version if pinned.snapshot is None else pinned.snapshot.generation)
+            try:
+                reader = csv.reader(pinned.store_text())
+                if TaskStore.DEFAULT_CSV_HEADER != next(reader, None):
+                    raise StoreReadException(Path(filename))
+                for row in reader:
+                    if len(row) != 0:  # skip padding rows
+                        yield row
+            except OSError:
+                raise StoreReadException(Path(filename))
+
+    def copy(self, filename=None, new_filename=None):
+        self.copy_csv(filename, new_filename)
+
+    @staticmethod
+    def journal_path(filename):
+        """
+        Returns the path of the journal belonging to a store
+        :param string filename: The store file
+        :return str: The journal file path
+        """
+        return str(filename) + TaskStore.JOURNAL_SUFFIX
 
     def save_to_csv(self, data, header=None, filename=None):
         """
@@ -95,18 +554,27 @@ class TaskStore:
         """
         if filename is None:
             filename = self.store_filename
-        try:
-            with open(filename, 'w', newline='') as file:
-                writer = csv.writer(file)
-                # Write header
-                if header is None:
-                    header = TaskStore.DEFAULT_CSV_HEADER
-                writer.writerow(header)
-                # Write data
-                if len(data) > 0:
-                    writer.writerows(data)
-        except OSError:
-            raise StoreWriteException(Path(filename))
+        data = self._stored(data)
+        with self._writing(filename, create=True):
+            try:
+                with _replacing(filename) as file:
+                    writer = csv.writer(file)
+                    # Write header
+                    if header is None:
+                        header = TaskStore.DEFAULT_CSV_HEADER
+                    writer.writerow(header)
+                    # Write data
+                    if len(data) > 0:
+                        writer.writerows(data)
+                self._remove_journal(filename)  # The file now holds the full state, older operations are obsolete
+                if self.offset_index:
+                    index = OffsetIndex(filename)
+                    index.build()
+                    index.save()
+                HighWaterMark(filename, TaskStore.journal_path(filename)).write(
+                    max((int(row[0]) for row in data), default=0))
+            except OSError:
+                raise StoreWriteException(Path(filename))
 
     def append_to_csv(self, data, filename=None):
         """
@@ -121,17 +589,37 @@ class TaskStore:
             filename = self.store_filename
         if not os.path.isfile(filename):
             raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
-        try:
-            with open(filename, 'a', newline='') as file:
-                writer = csv.writer(file)
-                if len(data) > 0:
-                    writer.writerows(data)
-        except OSError:
-            raise StoreWriteException(Path(filename))
+        data = self._stored(data)
+        with self._writing(filename, data):
+            if self.journaled:  # Appends are journaled too so they stay ordered with deletes of reused ids
+                self._append_journal(filename, [[TaskStore.JOURNAL_APPEND] + row for row in data])
+                return
+            try:
+                if self.offset_index:
+                    index = OffsetIndex.open(filename)
+                    entries = []
+                    offset = os.path.getsize(filename)
+                    encoded_rows = list(map(OffsetIndex.format_row, data))
+                    for row, encoded in zip(data, encoded_rows):
+                        entries.append((int(row[0]), offset, len(encoded)))
+                        offset += len(encoded)
+                    with open(filename, 'ab') as file:
+                        file.write(b''.join(encoded_rows))
+                    index.record_many(entries)
+                    index.seal()
+                    return
+                with open(filename, 'a', newline='') as file:
+                    writer = csv.writer(file)
+                    if len(data) > 0:
+                        writer.writerows(data)
+            except OSError:
+                raise StoreWriteException(Path(filename))
 
     def edit_csv(self, task_id, data=None, filename:  str = None):
         """
-        This will edit an existing csv file, replacing with data or deleting a row if data is None
+        This will edit an existing csv file, replacing with data or deleting a row if data is None.
+        In journaled mode the edit is appended to the journal instead of rewriting the file,
+        with an offset index the row is patched in place
         :param int task_id: The id of the task to edit
         :param list[list[string]] data: The data to replace the task with, if None the task is deleted
         :param string filename: The file to edit
@@ -144,32 +632,96 @@ class TaskStore:
 
         if not os.path.isfile(filename):
             raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        if data is not None:
+            data = self._stored(data)
+
+        with self._writing(filename, changes={str(task_id): None if data is None else data[0]}):
+            if self.journaled:
+                if data is None:
+                    self._append_journal(filename, [[TaskStore.JOURNAL_DELETE, str(task_id)]])
+                else:
+                    self._append_journal(filename, [[TaskStore.JOURNAL_EDIT] + data[0]])
+                return
+            if os.path.isfile(TaskStore.journal_path(filename)):  # Pending operations must be applied before rewriting
+                self.compact(filename)
+            if self.offset_index:
+                try:
+                    self._edit_in_place(filename, int(task_id), data)
+                except OSError:
+                    raise StoreWriteException(Path(filename))
+                return
+
+            self._rewrite_csv(filename, {str(task_id): None if data is None else data[0]})
+
+    def edit_many_csv(self, changes, filename=None):
+        """
+        Edits the rows of several tasks, in a single journal write in journaled mode, otherwise in a single rewrite
+        of the file
+        :param dict[int, list[string] or None] changes: The new row of each task to edit, None to delete the task
+        :param string filename: The file to edit
+
+        :exception FileNotFoundError: The file does not exist
+        :exception StoreCopyException: Copying the store failed
+        :exception StoreWriteException: Writing the journal or the offset index failed
+        """
+        if filename is None or filename.isspace() or filename == '':
+            filename = self.store_filename
+
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        if len(changes) == 0:
+            return
+        if self.epoch_times:
+            changes = {task_id: None if row is None else self._stored([row])[0] for task_id, row in changes.items()}
+        with self._writing(filename, changes={str(task_id): row for task_id, row in changes.items()}):
+            if len(changes) == 1:  # A single row can be patched in place with an offset index
+                task_id, row = next(iter(changes.items()))
+                self.edit_csv(task_id, None if row is None else [row], filename)
+                return
+
+            if self.journaled:
+                self._append_journal(filename, [[TaskStore.JOURNAL_DELETE, str(task_id)] if row is None else
+                                                [TaskStore.JOURNAL_EDIT] + row for task_id, row in changes.items()])
+                return
+            if os.path.isfile(TaskStore.journal_path(filename)):  # Pending operations must be applied before rewriting
+                self.compact(filename)
+            self._rewrite_csv(filename, {str(task_id): row for task_id, row in changes.items()})
+            if self.offset_index:  # Every row after the first change has moved
+                try:
+                    index = OffsetIndex(filename)
+                    index.build()
+                    index.save()
+                except OSError:
+                    raise StoreWriteException(Path(filename))
 
-        temp_filename = str(filename) + ".new"
-        temp_file = open(temp_filename, "w", newline='')
+    def _rewrite_csv(self, filename, changes):
+        """
+        Copies the store to a temporary file with rows replaced or skipped, then atomically replaces the store with
+        the copy
+        :param string filename: The store to rewrite
+        :param dict[str, list[string] or None] changes: The new row of each task id to change, None to delete the task
+        :exception StoreCopyException: Copying the store failed
+        """
         try:
-            with open(filename, 'r', newline='') as file, temp_file:
+            with open(filename, 'r', newline='') as file, _replacing(filename) as temp_file:
                 reader = csv.reader(file)
                 writer = csv.writer(temp_file)
 
-                for row in reader:  # Copy data to temp file, editing the specific task
+                for row in reader:  # Copy data to temp file, editing the specific tasks
                     if len(row) == 0:  # skip padding rows
                         continue
-                    if row[0] == str(task_id):
-                        if data is None:  # Delete the file by skipping it in the copy
+                    if row[0] in changes:
+                        row = changes[row[0]]
+                        if row is None:  # Delete the task by skipping it in the copy
                             continue
-                        else:
-                            row = data[0]  # replace the original data with teh entered data
                     writer.writerow(row)
-
-            os.remove(filename)
-            os.rename(temp_filename, filename)
         except OSError:
-            raise StoreCopyException(Path(filename), Path(temp_filename))
+            raise StoreCopyException(Path(filename), Path(str(filename) + ".new"))
 
     def load_from_csv(self, filename=None):
         """
-        Loads the data from a csv file and returns it as a tuple
+        Loads the data from a csv file and returns it as a tuple. Any journal is replayed on top of the file.
+        Only the last committed generation is read, a write in progress is neither waited for nor seen
 
         :param string filename: The file to load
         :return (int, list[list[string]]: A tuple containing the maximum id, and the file's data
@@ -182,28 +734,30 @@ class TaskStore:
         if not os.path.isfile(filename):
             raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
 
-        task_list = []
-        max_id = 0
-        try:
-            with open(filename, 'r', newline='') as file:
-                reader = csv.reader(file)
-                if TaskStore.DEFAULT_CSV_HEADER != next(reader):  # If the header does not match, the file is invalid
-                    raise StoreReadException(Path(filename))
-
-                for row in reader:
-                    if len(row) == 0:
-                        continue
+        def read(pinned):
+            task_list = []
+            reader = csv.reader(pinned.store_text())
+            if TaskStore.DEFAULT_CSV_HEADER != next(reader, None):  # If the header does not match, the file is invalid
+                raise StoreReadException(Path(filename))
+            for row in reader:
+                if len(row) != 0:
                     task_list.append(row)
-                    if int(row[0]) > max_id:  # Calculate the max id
-                        max_id = int(row[0])
+            if pinned.journal is not None:
+                task_list = self._replay_journal(pinned.journal_text(), task_list)
+            return task_list
+
+        try:
+            task_list = self._read_pinned(filename, read, full=True)
+        except StoreLockException:
+            raise
         except OSError:
             raise StoreReadException(Path(filename))
-
-        return max_id, task_list
+        return max((int(row[0]) for row in task_list), default=0), task_list
 
     def copy_csv(self, filename:  str = None, new_filename: str = None):
         """
-        This will copy an existing csv file, to a specified file. This will not remove the data in the old file
+        This will copy an existing csv file, to a specified file. This will not remove the data in the old file.
+        A new_filename of another store type, such as a .tmb or .db file, receives the tasks converted to its format
         :param str new_filename: The file to copy to
         :param string filename: The file to copy from
 
@@ -223,14 +777,272 @@ class TaskStore:
         if filename == os.path.abspath(new_filename):
             raise FileExistsError("Can not copy a path to itself")
         try:
-            with open(filename, 'r', newline='') as file, open(new_filename, 'w', newline='') as new_file:
-                reader = csv.reader(file)
-                writer = csv.writer(new_file)
+            target = open_store(new_filename, lock_timeout=self.lock_timeout)
+            if not isinstance(target, TaskStore):
+                target.save(self.load_from_csv(filename)[1])
+                return
+            if os.path.isfile(TaskStore.journal_path(filename)):  # Copy the replayed state rather than the snapshot
+                TaskStore(new_filename).save_to_csv(self.load_from_csv(filename)[1])
+            else:
+                def copy(pinned):
+                    with open(new_filename, 'w', newline='') as new_file:
+                        writer = csv.writer(new_file)
+                        for row in csv.reader(pinned.store_text()):  # Copy data to new file
+                            if len(row) == 0:  # skip padding rows
+                                continue
+                            writer.writerow(row)
 
-                for row in reader:  # Copy data to new file
-                    if len(row) == 0:  # skip padding rows
-                        continue
-                    writer.writerow(row)
+                self._read_pinned(filename, copy)
+            self._remove_journal(new_filename)  # The copy holds the full state
+            if self.offset_index or os.path.isfile(OffsetIndex.path(filename)):  # Rows moved, index the copy anew
+                index = OffsetIndex(new_filename)
+                index.build()
+                index.save()
             self.store_filename = new_filename
+            self.version = None  # Nothing has been read from the copy yet
         except OSError:
             raise StoreCopyException(Path(filename), Path(str(new_filename)))
+
+    def compact(self, filename=None):
+        """
+        Rewrites the store, folding the journal into it and dropping the space of rows deleted in place
+        :param string filename: The store to compact
+
+        :exception FileNotFoundError: The file does not exist
+        :exception StoreReadException: Reading the store or its journal failed
+        :exception StoreWriteException: Writing the compacted store failed
+        """
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        with self._writing(filename):
+            self.save_to_csv(self.load_from_csv(filename)[1], filename=filename)
+
+    def load_row(self, task_id, filename=None):
+        """
+        Loads the row of a single task, seeking straight to it when an offset index is kept
+        :param int task_id: The id of the task to load
+        :param string filename: The store to load from
+        :return list[string] or None: The row of the task, None if it does not exist
+        :exception FileNotFoundError: The specified file does not exist
+        :exception StoreReadException: Reading the data from the Store failed
+        """
+        if not self.offset_index:
+            return super().load_row(task_id, filename)
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+
+        def read(pinned):
+            if pinned.snapshot is None:
+                index = OffsetIndex.open(filename)
+            else:  # The index as it was sealed for the pinned generation
+                index = OffsetIndex.matching(filename, pinned.snapshot.store[1], pinned.snapshot.store[2])
+                if index is None:
+                    return None
+            row = None
+            location = index.rows.get(int(task_id))
+            if location is not None:
+                pinned.store.seek(location[0])
+                row = next(csv.reader([pinned.store.read(location[1]).decode(OffsetIndex.ENCODING)]))
+            rows = [] if row is None else [row]
+            if pinned.journal is not None:
+                rows = self._replay_journal(pinned.journal_text(), rows, str(task_id))
+            return rows
+
+        try:
+            rows = self._read_pinned(filename, read)
+        except StoreLockException:
+            raise
+        except (OSError, ValueError, StopIteration):
+            raise StoreReadException(Path(filename))
+        if rows is None:  # The index was rebuilt after the pinned generation, a writer will save it anew
+            return super().load_row(task_id, filename)
+        return rows[0] if rows else None
+
+    def _edit_in_place(self, filename, task_id, data):
+        """
+        Overwrites the row of a task using the offset index. A row which changes length, or is deleted, is blanked
+        out and an edited row is appended to the end of the file, so the rows of an indexed store are not kept in id
+        order and are loaded in the order they were last written. The store is compacted once over half of it is
+        blank
+        :param string filename: The store to edit
+        :param int task_id: The id of the task to edit
+        :param list[list[string]] data: The data to replace the task with, if None the task is deleted
+        """
+        index = OffsetIndex.open(filename)
+        location = index.rows.get(task_id)
+        if location is None:  # Nothing to edit
+            return
+        offset, length = location
+        encoded = None if data is None else OffsetIndex.format_row(data[0])
+        StoreSnapshot.begin_patch(filename)  # Readers of the committed generation read it again once this is committed
+        with open(filename, 'r+b') as file:
+            file.seek(offset)
+            if encoded is not None and len(encoded) == length:
+                file.write(encoded)
+            else:
+                file.write(b'\n' * length)  # Blank lines are skipped as padding rows by every reader
+                index.dead += length
+                entries = [(task_id, 0, 0)]
+                if encoded is not None:
+                    end = file.seek(0, os.SEEK_END)
+                    file.write(encoded)
+                    entries.append((int(data[0][0]), end, len(encoded)))
+                index.record_many(entries)
+        index.seal()
+        if index.dead > os.path.getsize(filename) // 2:
+            self.compact(filename)
+
+    def _append_journal(self, filename, records):
+        """
+        Appends operation records to the journal of the store, compacting it if it has grown too large
+        :param string filename: The store the operations apply to
+        :param list[list[string]] records: Operation records, the first element of each being the operation type
+        :exception StoreWriteException: Writing to the journal failed
+        """
+        journal = TaskStore.journal_path(filename)
+        try:
+            with open(journal, 'a', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerows(records)
+            journal_size = os.path.getsize(journal)
+        except OSError:
+            raise StoreWriteException(Path(journal))
+        if journal_size > TaskStore.JOURNAL_COMPACT_SIZE:
+            self.compact(filename)
+
+    @staticmethod
+    def _replay_journal(journal, task_list, task_id=None):
+        """
+        Applies the operations recorded in the journal of a store to the rows loaded from it
+        :param TextIO journal: The journal of the store
+        :param list[list[string]] task_list: Rows read from the store file
+        :param string task_id: Only apply the operations on this task
+        :return list[list[string]]: The rows with every journaled operation applied
+        """
+        rows = {row[0]: row for row in task_list}
+        with journal as file:
+            for record in csv.reader(file):
+                if len(record) < 2:  # skip padding rows and records cut short by an interrupted write
+                    continue
+                operation, row = record[0], record[1:]
+                if task_id is not None and row[0] != task_id:
+                    continue
+                if operation == TaskStore.JOURNAL_DELETE:
+                    rows.pop(row[0], None)
+                elif operation == TaskStore.JOURNAL_EDIT:
+                    if row[0] in rows:
+                        rows[row[0]] = row
+                elif operation == TaskStore.JOURNAL_APPEND:
+                    rows[row[0]] = row
+        return list(rows.values())
+
+    @contextlib.contextmanager
+    def _writing(self, filename, data=(), create=False, changes=None):
+        """
+        Holds the StoreLock of the store across a write. The outermost write of this process checks that no other
+        process wrote since the store was read, then counts the write in the store version and keeps the high water
+        mark trusted, raising it to the ids of appended rows. Appends are not checked, the ids of new tasks are
+        allocated so they cannot overwrite another process' write, and neither are compactions, which read the rows
+        they write under the lock. They leave the version the rows were read at, so the next edit is still checked.
+        A mark which was already out of date is left for allocate_id to rebuild. The ParseCache of the store is
+        removed, and the changed rows are recorded in its SearchIndex if it has one
+        :param string filename: The store being written
+        :param list[list[string]] data: The rows being appended
+        :param bool create: The write replaces the whole store, which may not exist yet, and sets its own mark
+        :param dict[str, list[string] or None] changes: The new row of each task being edited, None for deleted tasks
+        :exception FileNotFoundError: The store does not exist, and is not being created
+        :exception StoreLockException: Another process held the lock for longer than lock_timeout
+        :exception StoreConflictException: Another process wrote to the store after it was read, and the write is not
+            an append or a compaction
+        """
+        if filename is None or str(filename).isspace() or filename == '':
+            filename = self.store_filename
+        if not create and not os.path.isfile(filename):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), filename)
+        with profiling.phase("write") as phase, StoreLock(filename, self.lock_timeout) as lock:
+            if not lock.outermost:
+                yield
+                return
+            phase.rows = len(data)
+            own = self._is_store(filename)
+            outdated = own and self.version is not None and lock.version() != self.version
+            if outdated and (create or changes is not None):
+                raise StoreConflictException(Path(filename))
+            mark = HighWaterMark(filename, TaskStore.journal_path(filename))
+            last_id = None if create else mark.read()
+            ParseCache(filename).remove()  # Removed before the store changes, a cache is never newer than the store
+            search = SearchIndex(filename, TaskStore.journal_path(filename))
+            search_key = search.key(lock.version()) if os.path.isfile(SearchIndex.path(filename)) else None
+            yield
+            version = lock.bump()
+            StoreSnapshot.publish(filename, TaskStore.journal_path(filename), version)
+            if search_key is not None:
+                if create:  # Indexed anew by the next search
+                    search.remove()
+                else:
+                    changed = {row[0]: row for row in data}
+                    changed.update(changes or {})
+                    search.record(search_key, search.key(version), changed)
+            if own and not outdated:
+                self.version = version
+            if last_id is not None:
+                mark.write(max([last_id] + [int(row[0]) for row in data]))
+
+    def _stored(self, rows):
+        """
+        Returns rows in the form this store writes them, with epoch times if epoch_times is set
+        :param list[list[string]] rows: Rows in the form of Task.to_list()
+        :return list[list[string]]: The rows to write
+        """
+        if not self.epoch_times:
+            return rows
+        to_epoch = timestamps.to_epoch
+        return [row[:3] + [to_epoch(row[3]), row[4], to_epoch(row[5])] + row[6:] for row in rows]
+
+    def _read_pinned(self, filename, read, full=False):
+        """
+        Calls read with the files of the last committed generation of the store, calling it again if a writer patched
+        them in place meanwhile. The StoreLock is only waited for when writers keep replacing or patching the store
+        :param string filename: The store to read
+        :param Callable[[PinnedStore], T] read: Reads the pinned files
+        :param bool full: read reads the whole store, so the rows held are now of the pinned generation
+        :return T: What read returned
+        """
+        version = StoreLock(filename).version()  # The version of stores which are read as they are
+        for _ in range(TaskStore.SNAPSHOT_RETRIES):
+            pinned = StoreSnapshot.pin(filename, TaskStore.journal_path(filename))
+            if pinned is None:
+                continue
+            with pinned:
+                result = read(pinned)
+            if pinned.unchanged():
+                self._keep_version(filename, version if pinned.snapshot is None else pinned.snapshot.generation, full)
+                return result
+        with StoreLock(filename, self.lock_timeout) as lock:  # Files read while the lock is held are not pinned
+            with StoreSnapshot.pin(filename, TaskStore.journal_path(filename)) as pinned:
+                result = read(pinned)
+            self._keep_version(filename, lock.version(), full)
+        return result
+
+    def _keep_version(self, filename, version, full=False):
+        """
+        Remembers the version rows were read at, unless rows of an earlier version are already held
+        :param string filename: The store which was read
+        :param int version: The version of the rows
+        :param bool full: Every row was read, none of an earlier version is held anymore
+        """
+        if self._is_store(filename) and (full or self.version is None):
+            self.version = version
+
+    def _is_store(self, filename):
+        return os.path.abspath(filename) == os.path.abspath(self.store_filename)
+
+    @staticmethod
+    def _remove_journal(filename):
+        journal = TaskStore.journal_path(filename)
+        if os.path.isfile(journal):
+            os.remove(journal)
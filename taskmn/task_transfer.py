@@ -0,0 +1,161 @@
+import csv
+import datetime
+import itertools
+import json
+import os
+
+from taskmn.exceptions import DateException, TaskImportError, TaskNameError
+from taskmn.task import Task
+from taskmn.task_store import TaskStore
+from taskmn.timestamps import to_text
+
+"""
+This module imports tasks into a store from csv or JSON Lines streams, and exports a store to them. Both directions
+work on iterators, so only a chunk of an import, and no more than a row of an export, is held in memory
+
+Constants
+
+FORMATS : tuple[str]
+    The formats which can be read and written. JSON Lines and NDJSON are the same format under two names
+IMPORT_CHUNK_SIZE : int
+
+Functions
+
+detect_format(str, str) -> str
+read_records(TextIO, str) -> Iterator[(int, dict)]
+to_row(dict, int, int) -> list[str]
+import_tasks(StoreBackend, TextIO, str, int) -> Iterator[int]
+export_tasks(StoreBackend, TextIO, str) -> int
+"""
+FORMATS = ("csv", "jsonl", "ndjson")
+IMPORT_CHUNK_SIZE = 1000  # Records validated and written at a time
+
+
+def detect_format(filename, default="csv"):
+    """
+    Returns the format of a file from its suffix
+    :param str filename: The name of the file
+    :param str default: The format of files without a known suffix
+    :return str: One of FORMATS
+    """
+    suffix = os.path.splitext(str(filename))[1].lower().lstrip(".")
+    return suffix if suffix in FORMATS else default
+
+
+def read_records(file, file_format):
+    """
+    Reads the records of a stream one at a time. Field names are lower cased, so both the store's csv header and
+    the keys written by export_tasks are accepted
+    :param TextIO file: The stream to read
+    :param str file_format: One of FORMATS
+    :return Iterator[(int, dict)]: The line each record ends on, and the record
+    :exception TaskImportError: A line is not a json object
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, {str(key).strip().lower(): value for key, value in record.items() if key is not None}
+        return
+    for line_number, line in enumerate(file, 1):
+        if line.strip() == "":
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise TaskImportError(line_number, "The line is not valid json")
+        if not isinstance(record, dict):
+            raise TaskImportError(line_number, "The line is not a json object")
+        yield line_number, {str(key).lower(): value for key, value in record.items()}
+
+
+def to_row(record, task_id, line):
+    """
+    Validates a record as Task.load_from_data does and converts it to a stored row with a new id.
+    Only a name is required, creation defaults to now
+    :param dict record: The record read by read_records
+    :param int task_id: The id to give the task
+    :param int line: The line of the record, for errors
+    :return list[str]: The row in the form of Task.to_list()
+    :exception TaskImportError: The record is not a valid task
+    """
+    def field(name):
+        value = record.get(name)
+        return None if value is None or value == "" or value == "None" else value
+
+    try:
+        priority = field("priority")
+        task = Task.load_from_data(field("name"), field("description"), field("deadline"),
+                                   None if priority is None else int(priority), task_id,
+                                   field("created") or datetime.datetime.now(), _to_bool(field("completed")))
+    except (TaskNameError, DateException) as e:
+        raise TaskImportError(line, str(e))
+    except (AttributeError, TypeError, ValueError):
+        raise TaskImportError(line, 'Priority must be 0, 1 or 2, and created "YYYY-MM-DD HH:MM:SS.ffffff"')
+    return task.to_list()
+
+
+def import_tasks(store, file, file_format, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Adds the records of a stream to a store as new tasks. Each chunk is validated entirely, then takes its ids from
+    the allocator of the store and is appended with a single write, so tasks added by other processes meanwhile keep
+    their ids and the ids of deleted tasks are not reused
+    :param StoreBackend store: The store to add to
+    :param TextIO file: The stream to read
+    :param str file_format: One of FORMATS
+    :param int chunk_size: The number of records to write at a time
+    :return Iterator[int]: The number of tasks written by each chunk
+    :exception TaskImportError: A record is not a valid task, the chunks before it have been written
+    :exception StoreException: Writing a chunk failed, the chunks before it have been written
+    """
+    records = read_records(file, file_format)
+    while chunk := list(itertools.islice(records, chunk_size)):
+        rows = [to_row(record, 0, line) for line, record in chunk]  # Ids are only allocated for valid chunks
+        first_id = store.allocate_id(count=len(rows))
+        for number, row in enumerate(rows):
+            row[0] = str(first_id + number)
+        store.append(rows)
+        yield len(rows)
+
+
+def export_tasks(store, file, file_format):
+    """
+    Writes every task of a store to a stream as they are read from the store
+    :param StoreBackend store: The store to export
+    :param TextIO file: The stream to write
+    :param str file_format: One of FORMATS
+    :return int: The number of tasks written
+    """
+    exported = 0
+
+    def rows():
+        nonlocal exported
+        for row in store.iter_rows():
+            exported += 1
+            yield row
+
+    if file_format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(TaskStore.DEFAULT_CSV_HEADER)
+        writer.writerows(row[:3] + [to_text(row[3]), row[4], to_text(row[5])] + row[6:] for row in rows())
+    else:
+        file.writelines(json.dumps(_to_record(row)) + "\n" for row in rows())
+    return exported
+
+
+def _to_record(row):
+    """
+    Converts a stored row to a json record with typed values
+    """
+    return {"id": int(row[0]), "name": row[1], "description": None if row[2] == 'None' else row[2],
+            "deadline": None if row[3] == 'None' else to_text(row[3])[:10], "priority": int(row[4]),
+            "created": to_text(row[5]),
+            "completed": row[6] != '0'}
+
+
+def _to_bool(value):
+    """
+    Reads a completion flag written as a json boolean or number, or as 1/0, true/false or yes/no
+    """
+    if value is None or isinstance(value, (bool, int)):
+        return bool(value)
+    return str(value).strip().lower() in ("1", "true", "yes")
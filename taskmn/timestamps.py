@@ -0,0 +1,167 @@
+import datetime
+import functools
+
+"""
+This module converts the dates and times of tasks to and from the text they are stored as.
+
+Stores keep a time either as text in the layout str() gives a datetime, "YYYY-MM-DD HH:MM:SS.ffffff" with the
+fraction left out when it is 0, or as an integer of microseconds since 1970-01-01 when the store writes epoch times.
+Every reader of stored rows accepts both, so existing stores keep working. Dates and times given by users are read
+with parse_input_date and parse_input_time, which do not take integers for epoch times, so a mistyped date such as
+20251231 is rejected instead of being read as a time in 1970. The fixed layouts are parsed with fromisoformat, and
+other text is left to strptime as it was before. Deadlines only keep their date, and as tasks share few of them their
+parsed dates are memoized
+
+Constants
+
+EPOCH : datetime
+NO_DEADLINE : int
+    The microseconds used for tasks without a deadline, smaller than any deadline
+
+Functions
+
+parse_time(str) -> datetime
+parse_date(str) -> datetime
+parse_input_time(str) -> datetime
+parse_input_date(str) -> datetime
+to_microseconds(datetime) -> int
+from_microseconds(int) -> datetime
+time_microseconds(str) -> int
+date_microseconds(str) -> int
+to_epoch(str) -> str
+to_text(str) -> str
+"""
+EPOCH = datetime.datetime(1970, 1, 1)
+NO_DEADLINE = -(1 << 63)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_DATE_CACHE_SIZE = 4096
+
+
+def parse_time(text):
+    """
+    Parses a stored creation time
+    :param str text: "YYYY-MM-DD HH:MM:SS.ffffff", "YYYY-MM-DD HH:MM:SS" or microseconds since 1970-01-01
+    :return datetime: The time
+    :exception ValueError: The text is not a time
+    """
+    if (len(text) == 26 or len(text) == 19) and text[10] == ' ':
+        return datetime.datetime.fromisoformat(text)
+    if _is_epoch(text):
+        return from_microseconds(int(text))
+    return datetime.datetime.strptime(text, '%Y-%m-%d %H:%M:%S.%f')
+
+
+def parse_date(text):
+    """
+    Parses a deadline, any time after the date is ignored
+    :param str text: "YYYY-MM-DD", optionally followed by a space and a time, or microseconds since 1970-01-01
+    :return datetime: Midnight of the date
+    :exception ValueError: The text is not a date
+    """
+    return _parse_date(text.split(" ", 1)[0])
+
+
+def parse_input_time(text):
+    """
+    Parses a creation time given by a user
+    :param str text: "YYYY-MM-DD HH:MM:SS.ffffff" or "YYYY-MM-DD HH:MM:SS"
+    :return datetime: The time
+    :exception ValueError: The text is not a time
+    """
+    if _is_epoch(text):
+        raise ValueError(f"{text!r} is not a time")
+    return parse_time(text)
+
+
+def parse_input_date(text):
+    """
+    Parses a deadline given by a user, any time after the date is ignored
+    :param str text: "YYYY-MM-DD", optionally followed by a space and a time
+    :return datetime: Midnight of the date
+    :exception ValueError: The text is not a date
+    """
+    date = text.split(" ", 1)[0]
+    if _is_epoch(date):
+        raise ValueError(f"{text!r} is not a date")
+    return _parse_date(date)
+
+
+@functools.lru_cache(maxsize=_DATE_CACHE_SIZE)
+def _parse_date(text):
+    if len(text) == 10 and text[4] == '-' and text[7] == '-':
+        return datetime.datetime.fromisoformat(text)
+    if _is_epoch(text):
+        time = from_microseconds(int(text))
+        return datetime.datetime(time.year, time.month, time.day)
+    return datetime.datetime.strptime(text, '%Y-%m-%d')
+
+
+def to_microseconds(time):
+    """
+    Converts a naive datetime to microseconds since 1970-01-01
+    :param datetime time: The time
+    :return int: The microseconds
+    """
+    return (time - EPOCH) // _MICROSECOND
+
+
+def from_microseconds(microseconds):
+    """
+    Converts microseconds since 1970-01-01 to a naive datetime
+    :param int microseconds: The microseconds
+    :return datetime: The time
+    """
+    return EPOCH + _MICROSECOND * microseconds
+
+
+def time_microseconds(text):
+    """
+    Returns the microseconds since 1970-01-01 of a stored creation time
+    :param str text: The time as accepted by parse_time
+    :return int: The microseconds
+    """
+    return int(text) if _is_epoch(text) else to_microseconds(parse_time(text))
+
+
+def date_microseconds(text):
+    """
+    Returns the microseconds since 1970-01-01 of a stored deadline, NO_DEADLINE if there is none
+    :param str text: The deadline as accepted by parse_date, or 'None'
+    :return int: The microseconds of midnight of the date
+    """
+    return NO_DEADLINE if text == 'None' else _date_microseconds(text.split(" ", 1)[0])
+
+
+@functools.lru_cache(maxsize=_DATE_CACHE_SIZE)
+def _date_microseconds(text):
+    return to_microseconds(_parse_date(text))
+
+
+def to_epoch(text):
+    """
+    Converts a stored time or deadline to the text of its microseconds since 1970-01-01, for stores writing epoch
+    times. Deadlines keep their time, which Tasks ignore
+    :param str text: The stored time, 'None' is kept
+    :return str: The integer text
+    """
+    if text == 'None' or _is_epoch(text):
+        return text
+    return str(to_microseconds(parse_time(text)))
+
+
+def to_text(text):
+    """
+    Converts a stored time or deadline to the layout str() gives a datetime, for readers which need dates as text
+    :param str text: The stored time, 'None' is kept
+    :return str: The time as text
+    """
+    if text == 'None' or not _is_epoch(text):
+        return text
+    return str(from_microseconds(int(text)))
+
+
+def _is_epoch(text):
+    """
+    Returns True for the integer text of epoch times, which unlike dates has no dash after its fourth character
+    """
+    return text.isdigit() or (text[:1] == '-' and text[1:].isdigit())